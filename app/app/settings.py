@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -21,12 +23,18 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-$0m8v4m*uyfoon91d+49m8d)5)=d8)%xc^4()!o)^%$7o7to%-'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-$0m8v4m*uyfoon91d+49m8d)5)=d8)%xc^4()!o)^%$7o7to%-',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = bool(int(os.environ.get('DJANGO_DEBUG', 0)))
 
 ALLOWED_HOSTS = []
+ALLOWED_HOSTS.extend(
+    filter(None, os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(','))
+)
 
 
 # Application definition
@@ -47,7 +55,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,17 +89,79 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+#
+# Connections are kept open for DB_CONN_MAX_AGE seconds and health checked
+# at the start of each request that reuses them, see core.backends.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
     }
 }
 
+# DB_POOL_MODE chooses how connections are shared:
+#
+# - `none`: each thread keeps its own connection for DB_CONN_MAX_AGE.
+# - `local`: the threads of a process check connections out of a pool of
+#   at most DB_POOL_MAX_SIZE and return them after each request, see
+#   core.pool.
+# - `pgbouncer`: connect through pgbouncer in transaction pooling mode.
+#   Server-side cursors are disabled since they outlive a transaction.
+
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'none')
+
+if DB_POOL_MODE == 'local':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['POOL'] = {
+        'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+    }
+elif DB_POOL_MODE == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DB_POOL_MODE != 'none':
+    raise ImproperlyConfigured(f'Unknown DB_POOL_MODE {DB_POOL_MODE!r}.')
+
+# Read replicas
+#
+# DB_REPLICA_HOSTS lists replica hosts, comma separated, reached with the
+# primary's name and credentials. GET requests read from them round-robin,
+# see core.routers and core.middleware. For a local try, point it at the
+# primary itself.
+
+DATABASE_REPLICAS = []
+
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')),
+    start=1,
+):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': {
+            'connect_timeout': int(
+                os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 2)
+            ),
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a client reads from the primary after writing.
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+# Seconds an unreachable replica is skipped before it is tried again.
+REPLICA_RETRY_SECONDS = int(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -110,6 +182,47 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+#
+# PASSWORD_HASHER picks the hasher for new passwords: argon2, bcrypt or
+# pbkdf2. The others stay listed so existing hashes still verify, and a
+# password is rehashed with the chosen hasher and cost on its next
+# successful login, see core.hashers.
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+
+_PASSWORD_HASHERS = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(f'Unknown PASSWORD_HASHER {PASSWORD_HASHER!r}.')
+
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(
+        hasher for name, hasher in _PASSWORD_HASHERS.items()
+        if name != PASSWORD_HASHER
+    ),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# The OWASP minimum for Argon2id: 19 MiB, two passes, one lane.
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST_KIB', 19456))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+
+# Under ASGI, threads per worker that serve the endpoints hashing
+# passwords, see core.async_views.
+PASSWORD_HASHING_THREADS = int(
+    os.environ.get('PASSWORD_HASHING_THREADS', os.cpu_count() or 1)
+)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -138,4 +251,102 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON is read and written with orjson when it is installed, see
+    # core.renderers and core.parsers.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        # Token logins per address and account, see user.throttling. Set
+        # LOGIN_THROTTLE_RATE to an empty string to turn it off.
+        'login': os.environ.get('LOGIN_THROTTLE_RATE', '10/min') or None,
+    },
 }
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+#
+# Point CACHE_BACKEND and CACHE_LOCATION at a shared server in production,
+# for example django_redis.cache.RedisCache and redis://redis:6379/0.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+}
+
+# Token authentication cache, see core.authentication. User IDs are only
+# kept in CACHE when it is shared by every process, not in locmem.
+TOKEN_AUTH_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 300)),
+    'LOCAL_MAXSIZE': int(os.environ.get('TOKEN_AUTH_LOCAL_MAXSIZE', 10000)),
+    'LOCAL_TIMEOUT': int(os.environ.get('TOKEN_AUTH_LOCAL_TIMEOUT', 5)),
+}
+
+# Response cache for the container and tag lists, see core.cache.
+# RESPONSE_CACHE_BACKEND is `local` (an LRU per process), `shared` (the
+# default cache) or `none`. Versions are always kept in the default cache,
+# and nothing is cached unless it is shared by every process.
+RESPONSE_CACHE = {
+    'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'local'),
+    'CACHE': 'default',
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+    'LOCAL_MAXSIZE': int(
+        os.environ.get('RESPONSE_CACHE_LOCAL_MAXSIZE', 1000)
+    ),
+    # Seconds after a write before responses are cached again, while the
+    # replicas catch up.
+    'MIN_AGE': REPLICA_PIN_SECONDS if DATABASE_REPLICAS else 0,
+}
+
+if RESPONSE_CACHE['BACKEND'] not in ('local', 'shared', 'none'):
+    raise ImproperlyConfigured(
+        f'Unknown RESPONSE_CACHE_BACKEND {RESPONSE_CACHE["BACKEND"]!r}.'
+    )
+
+
+# Delta sync, see container.sync. Transactions open for more than
+# SYNC_MAX_LAG seconds stop holding syncs back and are logged, and their
+# changes are missed. Tombstones of deleted rows are kept for
+# TOMBSTONE_RETENTION_DAYS, run `prune_tombstones` daily; older tokens get
+# 410 Gone and the client syncs in full.
+SYNC_MAX_LAG = int(os.environ.get('SYNC_MAX_LAG', 300))
+TOMBSTONE_RETENTION_DAYS = int(
+    os.environ.get('TOMBSTONE_RETENTION_DAYS', 30)
+)
+
+
+# Async views
+#
+# Under ASGI (app.asgi) the hot read endpoints run their views on a thread
+# pool instead of Django's single shared thread, see core.async_views.
+# ASYNC_VIEWS_THREADS also bounds the database connections per worker.
+
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+ASYNC_VIEWS_THREADS = int(os.environ.get('DJANGO_ASYNC_VIEWS_THREADS', 32))
+
+
+# Metrics
+#
+# Request latency and SQL metrics are served at /metrics, see
+# core.metrics. Set METRICS_TOKEN to require it as a bearer token, and
+# PROMETHEUS_MULTIPROC_DIR when running several worker processes.
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Requests at least this slow log their slowest SQL queries.
+SLOW_REQUEST_THRESHOLD_MS = int(
+    os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500)
+)
+SLOW_REQUEST_QUERIES = int(os.environ.get('SLOW_REQUEST_QUERIES', 5))
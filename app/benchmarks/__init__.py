@@ -0,0 +1,10 @@
+"""
+Benchmarks for the bin track API.
+
+Each module is a script run from the `app` directory, for example:
+
+    python -m benchmarks.list_latency --rows 10000 100000
+
+Benchmarks run against a throwaway test database created on the
+configured database server, so they never touch real data.
+"""
@@ -0,0 +1,124 @@
+"""
+Shared helpers for the benchmarks.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    """Configure Django for a standalone benchmark script."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Run the body against a freshly migrated test database."""
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0,
+        autoclobber=True,
+        keepdb=keepdb,
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name,
+            verbosity=0,
+            keepdb=keepdb,
+        )
+        teardown_test_environment()
+
+
+def create_user(email, password='benchpass123'):
+    """Create and return a benchmark user."""
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def seed_containers(user, count, batch_size=5000, start=0):
+    """Insert `count` synthetic containers for `user`."""
+    from core.models import Container
+
+    bin_types = ['Open Skip', 'Compactor', 'Unipack', 'Roll On Roll Off']
+    bin_sizes = ['6m', '8m', '15m', '32m']
+    for offset in range(start, start + count, batch_size):
+        stop = min(offset + batch_size, start + count)
+        Container.objects.bulk_create([
+            Container(
+                user=user,
+                bin_id=f'B{i:08d}',
+                bin_type=bin_types[i % len(bin_types)],
+                bin_size=bin_sizes[(i // len(bin_types)) % len(bin_sizes)],
+                description=f'Synthetic container {i}',
+            )
+            for i in range(offset, stop)
+        ])
+
+
+def seed_tags(user, count, per_container=2, batch_size=5000):
+    """Create `count` tags for `user` and spread them over its containers."""
+    from core.models import (
+        Container,
+        Tag,
+    )
+
+    tags = Tag.objects.bulk_create([
+        Tag(user=user, name=f'Tag {i}') for i in range(count)
+    ])
+    Through = Container.tags.through
+    container_ids = Container.objects.filter(user=user).order_by('id') \
+        .values_list('id', flat=True)
+    links = []
+    for i, container_id in enumerate(container_ids.iterator()):
+        for offset in range(min(per_container, count)):
+            tag = tags[(i + offset) % count]
+            links.append(Through(container_id=container_id, tag_id=tag.id))
+        if len(links) >= batch_size:
+            Through.objects.bulk_create(links)
+            links = []
+    Through.objects.bulk_create(links)
+
+
+def measure(func, repeat, warmup=3):
+    """Call `func` repeatedly and return the durations in milliseconds."""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return samples
+
+
+def percentile(samples, pct):
+    """Return the `pct` percentile of `samples`."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Return summary statistics for a list of durations."""
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+    }
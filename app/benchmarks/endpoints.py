@@ -0,0 +1,298 @@
+"""
+Latency, throughput and query counts for every API endpoint.
+
+Seeds `--users` other users sharing `--containers` containers and `--tags`
+tags each, plus a benchmark user with the same fleet, then calls each
+endpoint of the container and user APIs in process as the benchmark user
+and reports p50/p95/p99 latency, requests per second and the number of
+SQL queries per request.
+
+    python -m benchmarks.endpoints --containers 10000 --json after.json
+
+Write results to JSON and pass an earlier run to --compare to see what
+changed between commits. The script exits non-zero when a case got
+slower by more than --tolerance or runs more queries than before.
+
+    python -m benchmarks.endpoints --compare before.json
+"""
+import argparse
+import datetime
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    seed_containers,
+    seed_tags,
+    setup_django,
+    summarize,
+)
+
+
+PASSWORD = 'benchpass123'
+
+
+def build_cases(user, token):
+    """Return `{name: (client, request)}` for every benchmarked endpoint.
+
+    Each request makes one API call and returns the response. Cases that
+    create or delete rows use a fresh bin ID or container on every call.
+    """
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from core.models import (
+        Container,
+        Tag,
+    )
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    anonymous = APIClient()
+
+    containers_url = reverse('container:container-list')
+    tags_url = reverse('container:tag-list')
+    me_url = reverse('user:me')
+    containers = Container.objects.filter(user=user).order_by('id')
+    container = containers.first()
+    tags = list(Tag.objects.filter(user=user).order_by('id')[:2])
+    detail_url = reverse('container:container-detail', args=[container.id])
+    tag_url = reverse('container:tag-detail', args=[tags[0].id])
+    counter = itertools.count()
+    doomed = iter(containers.reverse().values_list('id', flat=True))
+
+    def container_payload():
+        return {
+            'bin_id': f'N{next(counter):08d}',
+            'bin_size': '8m',
+            'bin_type': 'Compactor',
+            'tags': [{'name': tag.name} for tag in tags],
+        }
+
+    return {
+        'container_list': lambda: client.get(containers_url),
+        'container_list_filtered': lambda: client.get(
+            containers_url,
+            {'bin_type': 'Compactor', 'tags': str(tags[0].id)},
+        ),
+        'container_search': lambda: client.get(
+            containers_url,
+            {'search': 'synthetic 42'},
+        ),
+        'container_retrieve': lambda: client.get(detail_url),
+        'container_create': lambda: client.post(
+            containers_url,
+            container_payload(),
+            format='json',
+        ),
+        'container_update': lambda: client.put(
+            detail_url,
+            {**container_payload(), 'description': 'Updated'},
+            format='json',
+        ),
+        'container_partial_update': lambda: client.patch(
+            detail_url,
+            {'description': f'Patched {next(counter)}'},
+            format='json',
+        ),
+        'container_delete': lambda: client.delete(reverse(
+            'container:container-detail',
+            args=[next(doomed)],
+        )),
+        'container_stats': lambda: client.get(
+            reverse('container:container-stats'),
+        ),
+        'tag_list': lambda: client.get(tags_url),
+        'tag_update': lambda: client.patch(
+            tag_url,
+            {'name': f'Tag {next(counter)}'},
+            format='json',
+        ),
+        'sync': lambda: client.get(reverse('container:sync')),
+        'user_create': lambda: anonymous.post(reverse('user:create'), {
+            'email': f'new{next(counter)}@example.com',
+            'password': PASSWORD,
+            'name': 'New user',
+        }),
+        'token_login': lambda: anonymous.post(reverse('user:token'), {
+            'email': user.email,
+            'password': PASSWORD,
+        }),
+        'user_me': lambda: client.get(me_url),
+        'user_me_update': lambda: client.patch(
+            me_url,
+            {'name': f'Bench {next(counter)}'},
+        ),
+    }
+
+
+def run_case(request, repeat):
+    """Time `request` and count the queries of each call."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    queries = []
+
+    def call():
+        with CaptureQueriesContext(connection) as context:
+            res = request()
+        assert res.status_code < 400, (res.status_code, res.data)
+        queries.append(len(context))
+
+    stats = summarize(measure(call, repeat))
+    stats['ops_per_s'] = round(1000 / stats['mean_ms'], 1)
+    stats['queries'] = statistics.median_low(queries)
+    return stats
+
+
+def run(args):
+    from django.db import connection
+    from rest_framework.authtoken.models import Token
+
+    for i in range(args.users):
+        other = create_user(f'other{i}@example.com', PASSWORD)
+        seed_containers(other, args.containers)
+        seed_tags(other, args.tags)
+    user = create_user('bench@example.com', PASSWORD)
+    seed_containers(user, args.containers)
+    seed_tags(user, args.tags)
+    token = Token.objects.create(user=user)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    cases = build_cases(user, token.key)
+    results = {}
+    for name, request in cases.items():
+        if args.cases and name not in args.cases:
+            continue
+        stats = run_case(request, args.repeat)
+        results[name] = stats
+        print(
+            f'{name:<25} '
+            f'{stats["ops_per_s"]:7.1f} req/s  '
+            f'p50 {stats["p50_ms"]:7.2f} ms  '
+            f'p95 {stats["p95_ms"]:7.2f} ms  '
+            f'p99 {stats["p99_ms"]:7.2f} ms  '
+            f'{stats["queries"]:3} queries'
+        )
+
+    return results
+
+
+def describe(args):
+    """Return what the results were measured against."""
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'postgres': connection.pg_version,
+        'users': args.users,
+        'containers': args.containers,
+        'tags': args.tags,
+        'repeat': args.repeat,
+    }
+
+
+def compare(before, after, tolerance):
+    """Print the change of every case and return the regressed ones."""
+    regressions = []
+    for name, stats in after.items():
+        old = before.get(name)
+        if old is None:
+            continue
+        change = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+        queries = stats['queries'] - old['queries']
+        slower = change > tolerance
+        if slower or queries > 0:
+            regressions.append(name)
+        print(
+            f'{name:<25} '
+            f'p50 {old["p50_ms"]:7.2f} -> {stats["p50_ms"]:7.2f} ms '
+            f'({change:+6.1f}%)  '
+            f'queries {old["queries"]:3} -> {stats["queries"]:3}'
+            f'{"  REGRESSED" if name in regressions else ""}'
+        )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--users',
+        type=int,
+        default=10,
+        help='Other users, each with their own containers and tags.',
+    )
+    parser.add_argument(
+        '--containers',
+        type=int,
+        default=10000,
+        help='Containers per user.',
+    )
+    parser.add_argument('--tags', type=int, default=20, help='Tags per user.')
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument(
+        '--cases',
+        nargs='+',
+        help='Only run these cases.',
+    )
+    parser.add_argument('--json', help='Write results to this file.')
+    parser.add_argument(
+        '--compare',
+        help='Compare against the results in this file.',
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=10,
+        help='Allowed p50 slowdown in percent before --compare fails.',
+    )
+    args = parser.parse_args()
+    if args.tags < 2:
+        parser.error('--tags must be at least 2.')
+    if args.containers < args.repeat + 4:
+        parser.error('--containers must exceed --repeat for the deletes.')
+
+    setup_django()
+    with benchmark_database():
+        results = run(args)
+        meta = describe(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)
+        print(f'\nCompared with {before["meta"]["commit"]}:')
+        if compare(before['results'], results, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
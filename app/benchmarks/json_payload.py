@@ -0,0 +1,103 @@
+"""
+JSON rendering and parsing time and peak memory for large payloads.
+
+Serializes `--rows` containers with two tags each the way the container
+list does, then renders the result with DRF's `JSONRenderer` and with
+`core.renderers.ORJSONRenderer`, and parses it back with `JSONParser`
+and `core.parsers.ORJSONParser`. Peak memory is the most traced by
+`tracemalloc` during one call, which includes the output but not memory
+orjson allocates outside the Python allocator.
+
+    python -m benchmarks.json_payload --rows 10000
+"""
+import argparse
+import io
+import json
+import tracemalloc
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    seed_containers,
+    seed_tags,
+    setup_django,
+    summarize,
+)
+
+
+def peak_kib(func):
+    """Return the peak traced memory of one call of `func` in KiB."""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def run(rows, repeat):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from container.serializers import ContainerSerializer
+    from core.models import Container
+    from core.parsers import ORJSONParser
+    from core.renderers import ORJSONRenderer
+
+    user = create_user('bench@example.com')
+    seed_containers(user, rows)
+    seed_tags(user, 20)
+    queryset = Container.objects.filter(user=user).order_by('-id') \
+        .prefetch_related('tags')
+    data = {
+        'next': None,
+        'previous': None,
+        'results': list(ContainerSerializer(queryset, many=True).data),
+    }
+    content = JSONRenderer().render(data)
+    assert ORJSONRenderer().render(data) == content
+    print(f'{rows} containers, {len(content) / 1024 / 1024:.1f} MiB of JSON')
+
+    cases = {
+        'render_json': lambda: JSONRenderer().render(data),
+        'render_orjson': lambda: ORJSONRenderer().render(data),
+        'parse_json': lambda: JSONParser().parse(io.BytesIO(content)),
+        'parse_orjson': lambda: ORJSONParser().parse(io.BytesIO(content)),
+    }
+    results = []
+    for name, func in cases.items():
+        stats = summarize(measure(func, repeat))
+        stats.update(case=name, rows=rows, peak_kib=peak_kib(func))
+        results.append(stats)
+        print(
+            f'{name:<14} '
+            f'p50 {stats["p50_ms"]:8.2f} ms  '
+            f'p95 {stats["p95_ms"]:8.2f} ms  '
+            f'peak {stats["peak_kib"]:10.1f} KiB'
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args.rows, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Container list latency at increasing fleet sizes.
+
+Seeds one user with each requested number of containers and times the
+first page, a page near the end of the fleet and a page sorted by bin ID.
+Pass --without-indexes to drop the (user, id) index and the (user,
+bin_id) unique constraint first and compare against a plain user_id
+index, like the foreign key had, and --other-rows to share the table
+with other users.
+
+    python -m benchmarks.list_latency --rows 10000 100000 1000000
+"""
+import argparse
+import json
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    seed_containers,
+    setup_django,
+    summarize,
+)
+
+
+def drop_indexes():
+    """Swap the indexes added for the list endpoint for one on user_id."""
+    from django.db import connection
+
+    from core.models import Container
+
+    with connection.schema_editor() as editor:
+        for index in Container._meta.indexes:
+            editor.remove_index(Container, index)
+        for constraint in Container._meta.constraints:
+            editor.remove_constraint(Container, constraint)
+        editor.execute(
+            'CREATE INDEX core_container_user_id ON core_container (user_id)'
+        )
+
+
+def run(rows, repeat, page_size, without_indexes, other_rows):
+    from django.db import connection
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from container.pagination import encode_cursor
+    from core.models import Container
+
+    if without_indexes:
+        drop_indexes()
+
+    url = reverse('container:container-list')
+    others = [create_user(f'other{i}@example.com') for i in range(10)]
+    for other in others:
+        seed_containers(other, other_rows // len(others))
+    user = create_user('bench@example.com')
+    client = APIClient()
+    client.force_authenticate(user)
+    results = []
+    seeded = 0
+    for count in sorted(rows):
+        seed_containers(user, count - seeded, start=seeded)
+        seeded = count
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_container')
+
+        oldest = Container.objects.filter(user=user).order_by('id')[
+            page_size:page_size + 1
+        ].get()
+        deep_cursor = encode_cursor('-id', [user.id, oldest.id])
+        cases = {
+            'first_page': {'page_size': page_size},
+            'last_page': {'page_size': page_size, 'cursor': deep_cursor},
+            'by_bin_id': {'page_size': page_size, 'ordering': 'bin_id'},
+        }
+        for name, params in cases.items():
+            def request():
+                res = client.get(url, params)
+                assert res.status_code == 200, res.status_code
+
+            stats = summarize(measure(request, repeat))
+            stats.update(rows=count, case=name)
+            results.append(stats)
+            print(
+                f'{count:>9} rows  {name:<11} '
+                f'p50 {stats["p50_ms"]:8.2f} ms  '
+                f'p95 {stats["p95_ms"]:8.2f} ms  '
+                f'p99 {stats["p99_ms"]:8.2f} ms'
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--rows',
+        type=int,
+        nargs='+',
+        default=[10000, 100000, 1000000],
+        help='Fleet sizes to measure.',
+    )
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--without-indexes', action='store_true')
+    parser.add_argument(
+        '--other-rows',
+        type=int,
+        default=0,
+        help='Containers owned by other users.',
+    )
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(
+            args.rows,
+            args.repeat,
+            args.page_size,
+            args.without_indexes,
+            args.other_rows,
+        )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
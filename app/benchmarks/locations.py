@@ -0,0 +1,149 @@
+"""
+Radius and bounding box queries over a large fleet of located containers.
+
+Seeds one user with `--rows` containers spread evenly over greater London
+and times the container list filtered with `near` and `radius` and with
+`bbox`, first with the location index and then without it.
+
+    python -m benchmarks.locations --rows 1000000
+"""
+import argparse
+import json
+import os
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    seed_containers,
+    setup_django,
+    summarize,
+)
+
+
+# Greater London, about 58 by 47 km.
+AREA = {'south': 51.28, 'north': 51.70, 'west': -0.51, 'east': 0.33}
+CENTRE = (51.5074, -0.1278)
+
+CASES = {
+    'near_500m': {'near': '%s,%s' % CENTRE, 'radius': '500'},
+    'near_2km': {'near': '%s,%s' % CENTRE, 'radius': '2000'},
+    # Roughly a phone's map view at street level.
+    'bbox_viewport': {'bbox': '-0.1378,51.5024,-0.1178,51.5124'},
+}
+
+SET_LOCATIONS = """
+UPDATE core_container
+SET latitude = %(south)s + random() * (%(north)s - %(south)s),
+    longitude = %(west)s + random() * (%(east)s - %(west)s)
+"""
+
+
+def seed_locations():
+    """Give every container a random location in `AREA`."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT setseed(0.5)')
+        cursor.execute(SET_LOCATIONS, AREA)
+        cursor.execute('VACUUM ANALYZE core_container')
+
+
+def drop_location_index():
+    """Drop the location index, leaving the user indexes."""
+    from django.db import connection
+
+    from core.models import Container
+
+    with connection.schema_editor() as editor:
+        for index in Container._meta.indexes:
+            if index.name == 'container_location_idx':
+                editor.remove_index(Container, index)
+
+
+def explain(user, latitude, longitude, radius):
+    """Print the plan of a radius query like the one the view runs."""
+    from core.geo import (
+        distance_to,
+        in_boxes,
+        radius_boxes,
+    )
+    from core.models import Container
+
+    queryset = Container.objects.filter(
+        user_id__gte=user.id,
+        user_id__lte=user.id,
+    ).filter(
+        in_boxes(radius_boxes(latitude, longitude, radius)),
+    ).annotate(
+        distance=distance_to(latitude, longitude),
+    ).filter(distance__lte=radius).order_by('distance', 'id')
+    print(queryset[:100].explain(analyze=True))
+
+
+def run(rows, repeat, page_size, show_plans):
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    url = reverse('container:container-list')
+    user = create_user('bench@example.com')
+    seed_containers(user, rows)
+    seed_locations()
+    client = APIClient()
+    client.force_authenticate(user)
+
+    results = []
+    for indexed in (True, False):
+        if not indexed:
+            drop_location_index()
+        if show_plans:
+            explain(user, *CENTRE, 500)
+        for name, params in CASES.items():
+            params = dict(params, page_size=page_size)
+            matched = len(client.get(url, params).data['results'])
+
+            def request():
+                res = client.get(url, params)
+                assert res.status_code == 200, res.status_code
+
+            stats = summarize(measure(request, repeat))
+            stats.update(rows=rows, case=name, indexed=indexed,
+                         results=matched)
+            results.append(stats)
+            print(
+                f'{name:<14} {"index" if indexed else "no index":<8} '
+                f'{matched:>4} results  '
+                f'p50 {stats["p50_ms"]:8.2f} ms  '
+                f'p95 {stats["p95_ms"]:8.2f} ms  '
+                f'p99 {stats["p99_ms"]:8.2f} ms'
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument(
+        '--explain',
+        action='store_true',
+        help='Print the plan of a 500 m radius query.',
+    )
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    # Time the queries rather than repeated hits on the response cache.
+    os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+    setup_django()
+    with benchmark_database():
+        results = run(args.rows, args.repeat, args.page_size, args.explain)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Token login throughput for each password hasher.
+
+Logs a user in through the token endpoint with each hasher preferred in
+turn. Every case runs on 1 or more threads (--threads) and reports logins
+per second, logins per second per core used and latency. Hashing
+releases the GIL, so threads scale with cores until the rest of the
+request becomes the bottleneck. The login throttle and slow request
+logging are turned off.
+
+    python -m benchmarks.login --threads 1 2 4
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    setup_django,
+    summarize,
+)
+
+
+PASSWORD = 'benchpass123'
+HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+}
+
+
+def drive(request, threads, repeat):
+    """Call `request` `repeat` times on each of `threads` threads."""
+    from django.db import connection
+
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            durations = measure(request, repeat, warmup=1)
+        finally:
+            connection.close()
+        with lock:
+            samples.extend(durations)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return samples, len(samples) / elapsed
+
+
+def run(args):
+    from django.test import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    url = reverse('user:token')
+    user = create_user('bench@example.com', PASSWORD)
+    payload = {'email': user.email, 'password': PASSWORD}
+    cores = os.cpu_count() or 1
+
+    def login(client):
+        def request():
+            res = client.post(url, payload)
+            assert res.status_code == 200, res.status_code
+        return request
+
+    cases = {}
+    for name in args.hashers:
+        cases[name] = (name, APIClient())
+
+    results = []
+    for name, (hasher, client) in cases.items():
+        preferred = [HASHERS[hasher]] + [
+            path for other, path in HASHERS.items() if other != hasher
+        ]
+        with override_settings(PASSWORD_HASHERS=preferred):
+            user.set_password(PASSWORD)
+            user.save()
+            for threads in args.threads:
+                samples, throughput = drive(
+                    login(client),
+                    threads,
+                    args.repeat,
+                )
+                stats = summarize(samples)
+                stats.update(
+                    case=name,
+                    threads=threads,
+                    logins_per_s=round(throughput, 1),
+                    per_core=round(throughput / min(threads, cores), 1),
+                )
+                results.append(stats)
+                print(
+                    f'{name:<12} {threads:>2} threads  '
+                    f'{stats["logins_per_s"]:7.1f} logins/s  '
+                    f'{stats["per_core"]:7.1f} per core  '
+                    f'p50 {stats["p50_ms"]:7.2f} ms  '
+                    f'p99 {stats["p99_ms"]:7.2f} ms'
+                )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--hashers',
+        nargs='+',
+        choices=list(HASHERS),
+        default=list(HASHERS),
+    )
+    parser.add_argument('--threads', type=int, nargs='+', default=[1])
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=30,
+        help='Logins per thread.',
+    )
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    os.environ['LOGIN_THROTTLE_RATE'] = ''
+    os.environ['SLOW_REQUEST_THRESHOLD_MS'] = '60000'
+    setup_django()
+    with benchmark_database():
+        results = run(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
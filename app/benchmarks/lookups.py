@@ -0,0 +1,194 @@
+"""
+Table size and query time with bin types and sizes as lookup IDs.
+
+Seeds `--users` users with `--containers` containers each, then copies
+the containers into a table with the old layout, where `bin_type` and
+`bin_size` are text columns, with the same indexes. Reports the size of
+both tables and their indexes, and the time of the same queries against
+each: counting every container by bin type and bin size, counting one
+user's containers, and a page of one user's containers of one type.
+
+    python -m benchmarks.lookups --users 10 --containers 20000
+"""
+import argparse
+import json
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    seed_containers,
+    setup_django,
+    summarize,
+)
+
+
+TEXT_TABLE = 'bench_container_text'
+
+CREATE_TEXT_TABLE = f"""
+CREATE TABLE {TEXT_TABLE} AS
+SELECT c.id, c.user_id, c.bin_id, s.name::varchar(255) AS bin_size,
+       t.name::varchar(255) AS bin_type, c.description, c.search_vector,
+       c.updated_at, c.change_xid, c.change_seq
+FROM core_container c
+JOIN core_bintype t ON t.id = c.bin_type_id
+JOIN core_binsize s ON s.id = c.bin_size_id
+ORDER BY c.id;
+ALTER TABLE {TEXT_TABLE} ADD PRIMARY KEY (id);
+CREATE UNIQUE INDEX {TEXT_TABLE}_user_bin_id ON {TEXT_TABLE} (user_id, bin_id);
+CREATE INDEX {TEXT_TABLE}_user_id ON {TEXT_TABLE} (user_id, id);
+CREATE INDEX {TEXT_TABLE}_user_type ON {TEXT_TABLE} (user_id, bin_type, id);
+CREATE INDEX {TEXT_TABLE}_user_size ON {TEXT_TABLE} (user_id, bin_size, id);
+CREATE INDEX {TEXT_TABLE}_search ON {TEXT_TABLE} USING gin (search_vector);
+CREATE INDEX {TEXT_TABLE}_updated ON {TEXT_TABLE} (user_id, updated_at);
+CREATE INDEX {TEXT_TABLE}_change
+    ON {TEXT_TABLE} (user_id, change_xid, change_seq)
+"""
+
+QUERIES = {
+    'count_all': {
+        'text': f"""
+            SELECT bin_type, bin_size, count(*) FROM {TEXT_TABLE}
+            GROUP BY 1, 2
+        """,
+        'lookup': """
+            SELECT t.name, s.name, g.count FROM (
+                SELECT bin_type_id, bin_size_id, count(*)
+                FROM core_container GROUP BY 1, 2
+            ) g
+            JOIN core_bintype t ON t.id = g.bin_type_id
+            JOIN core_binsize s ON s.id = g.bin_size_id
+        """,
+    },
+    'count_user': {
+        'text': f"""
+            SELECT bin_type, count(*) FROM {TEXT_TABLE}
+            WHERE user_id = %(user)s GROUP BY 1
+        """,
+        'lookup': """
+            SELECT t.name, g.count FROM (
+                SELECT bin_type_id, count(*) FROM core_container
+                WHERE user_id = %(user)s GROUP BY 1
+            ) g
+            JOIN core_bintype t ON t.id = g.bin_type_id
+        """,
+    },
+    'filtered_page': {
+        'text': f"""
+            SELECT * FROM {TEXT_TABLE}
+            WHERE user_id = %(user)s AND bin_type = %(bin_type)s
+            ORDER BY id DESC LIMIT 100
+        """,
+        # The view turns the string into an ID from the cache first.
+        'lookup': """
+            SELECT * FROM core_container
+            WHERE user_id = %(user)s AND bin_type_id = %(bin_type_id)s
+            ORDER BY id DESC LIMIT 100
+        """,
+    },
+}
+
+
+def relation_sizes(cursor, table):
+    """Return the table, index and total size of `table` in KiB."""
+    cursor.execute(
+        'SELECT pg_table_size(%s), pg_indexes_size(%s), '
+        'pg_total_relation_size(%s)',
+        [table, table, table],
+    )
+    return [round(size / 1024) for size in cursor.fetchone()]
+
+
+def run(args):
+    from django.db import connection
+
+    from core.models import BinType
+
+    users = []
+    for i in range(args.users):
+        user = create_user(f'bench{i}@example.com')
+        seed_containers(user, args.containers, start=i * args.containers)
+        users.append(user)
+
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TEXT_TABLE)
+        # Rewrite both so neither carries bloat from how it was filled.
+        for table in ('core_container', TEXT_TABLE):
+            cursor.execute(f'VACUUM FULL ANALYZE {table}')
+
+        results = []
+        for layout, table in (
+            ('text', TEXT_TABLE),
+            ('lookup', 'core_container'),
+        ):
+            table_kib, indexes_kib, total_kib = relation_sizes(cursor, table)
+            results.append({
+                'case': f'size_{layout}',
+                'table_kib': table_kib,
+                'indexes_kib': indexes_kib,
+                'total_kib': total_kib,
+            })
+            print(
+                f'{layout:<7} table {table_kib:8d} KiB  '
+                f'indexes {indexes_kib:8d} KiB  '
+                f'total {total_kib:8d} KiB'
+            )
+
+        params = {
+            'user': users[-1].id,
+            'bin_type': 'Compactor',
+            'bin_type_id': BinType.objects.get(name='Compactor').id,
+        }
+        for name, sql in QUERIES.items():
+            for layout in ('text', 'lookup'):
+                def query():
+                    cursor.execute(sql[layout], params)
+                    cursor.fetchall()
+
+                if args.explain:
+                    cursor.execute('EXPLAIN ' + sql[layout], params)
+                    print('\n'.join(row[0] for row in cursor.fetchall()))
+                stats = summarize(measure(query, args.repeat))
+                stats.update(case=f'{name}_{layout}')
+                results.append(stats)
+                print(
+                    f'{name + "_" + layout:<22} '
+                    f'p50 {stats["p50_ms"]:8.2f} ms  '
+                    f'p95 {stats["p95_ms"]:8.2f} ms'
+                )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument(
+        '--containers',
+        type=int,
+        default=20000,
+        help='Containers per user.',
+    )
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument(
+        '--explain',
+        action='store_true',
+        help='Print the plan of each query.',
+    )
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
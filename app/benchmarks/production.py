@@ -0,0 +1,134 @@
+"""
+Throughput of the development server against the production profile.
+
+Seeds a fleet and drives each server profile with the same concurrent
+load as `benchmarks.serving`:
+
+- `runserver`: `manage.py runserver` with DEBUG on, as in
+  docker-compose.yml, opening a new database connection per request.
+- `gunicorn`: gunicorn with `gunicorn.conf.py` and DEBUG off, but still
+  a new database connection per request.
+- `production`: the same with persistent, health checked connections.
+- `pooled`: the same with each worker's threads sharing a pool of
+  `--pool-size` connections (DB_POOL_MODE=local).
+
+    python -m benchmarks.production --workers 2 --threads 4
+"""
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.base import (
+    benchmark_database,
+    setup_django,
+)
+from benchmarks.serving import (
+    prepare,
+    serve,
+    server_env,
+)
+
+
+def run(args):
+    paths, token = prepare(args.rows, args.page_size)
+    bin_dir = os.path.dirname(sys.executable)
+    address = f'127.0.0.1:{args.port}'
+    gunicorn = [
+        os.path.join(bin_dir, 'gunicorn'),
+        'app.wsgi:application',
+        '--config', 'gunicorn.conf.py',
+        '--bind', address,
+    ]
+    tuning = {
+        'GUNICORN_WORKERS': str(args.workers),
+        'GUNICORN_THREADS': str(args.threads),
+    }
+    profiles = {
+        'runserver': (
+            [sys.executable, 'manage.py', 'runserver', address, '--noreload'],
+            server_env(DJANGO_DEBUG='1', DB_CONN_MAX_AGE='0'),
+        ),
+        'gunicorn': (
+            gunicorn,
+            server_env(DJANGO_DEBUG='0', DB_CONN_MAX_AGE='0', **tuning),
+        ),
+        'production': (
+            gunicorn,
+            server_env(DJANGO_DEBUG='0', DB_CONN_MAX_AGE='60', **tuning),
+        ),
+        'pooled': (
+            gunicorn,
+            server_env(
+                DJANGO_DEBUG='0',
+                DB_POOL_MODE='local',
+                DB_POOL_MIN_SIZE=str(args.pool_size),
+                DB_POOL_MAX_SIZE=str(args.pool_size),
+                **tuning,
+            ),
+        ),
+    }
+
+    results = []
+    for concurrency in args.concurrency:
+        for name in args.profiles:
+            command, env = profiles[name]
+            stats = serve(
+                command,
+                env,
+                args.port,
+                paths,
+                token,
+                concurrency,
+                args.duration,
+            )
+            stats.update(profile=name, concurrency=concurrency)
+            results.append(stats)
+            print(
+                f'{name:<10} c={concurrency:<4} '
+                f'{stats["rps"]:8.1f} req/s  '
+                f'p50 {stats.get("p50_ms", 0):8.2f} ms  '
+                f'p99 {stats.get("p99_ms", 0):8.2f} ms  '
+                f'errors {stats["errors"]:<4} '
+                f'rss {stats["rss_mb"]:7.1f} MB'
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument(
+        '--profiles',
+        nargs='+',
+        choices=['runserver', 'gunicorn', 'production', 'pooled'],
+        default=['runserver', 'gunicorn', 'production'],
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        nargs='+',
+        default=[1, 8, 32],
+        help='Requests kept in flight.',
+    )
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
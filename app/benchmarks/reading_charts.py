@@ -0,0 +1,166 @@
+"""
+Charts of a year of sensor readings, from rollups and from raw readings.
+
+Seeds `--containers` containers with a reading a minute for a year and
+times the container readings endpoint for spans from an hour to a year.
+The year is also summed per day straight from the raw readings, which is
+what every chart would cost without the rollups.
+
+    python -m benchmarks.reading_charts --containers 4
+"""
+import argparse
+import datetime
+import json
+import os
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    seed_containers,
+    setup_django,
+    summarize,
+)
+
+
+DAYS = 365
+
+CASES = [
+    ('hour_raw', datetime.timedelta(hours=1), 'raw'),
+    ('day_5m', datetime.timedelta(days=1), '5m'),
+    ('month_1h', datetime.timedelta(days=30), '1h'),
+    ('year_1d', datetime.timedelta(days=DAYS), '1d'),
+]
+
+SEED_READINGS = """
+INSERT INTO core_reading (container_id, recorded_at, fill_level, temperature)
+SELECT %(container_id)s, t,
+    (extract(epoch FROM t)::bigint / 60) %% 101,
+    10 + (extract(epoch FROM t)::bigint / 60) %% 7
+FROM generate_series(
+    %(start)s::timestamptz, %(end)s::timestamptz, interval '1 minute'
+) AS t
+"""
+
+RAW_YEAR = """
+SELECT date_trunc('day', recorded_at), count(*), avg(fill_level),
+    min(fill_level), max(fill_level), avg(temperature), min(temperature),
+    max(temperature)
+FROM core_reading
+WHERE container_id = %s AND recorded_at >= %s AND recorded_at < %s
+GROUP BY 1
+ORDER BY 1
+"""
+
+
+def seed_readings(containers, end):
+    """Store a reading a minute for a year for each of `containers`."""
+    from django.db import (
+        connection,
+        transaction,
+    )
+
+    from container.readings import reading_partitions
+
+    start = end - datetime.timedelta(days=DAYS)
+    month = start.date().replace(day=1)
+    months = []
+    while month <= end.date():
+        months.append(month)
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+    with transaction.atomic():
+        reading_partitions.ensure(months)
+
+    for container in containers:
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_READINGS, {
+                'container_id': container.id,
+                'start': start,
+                'end': end - datetime.timedelta(minutes=1),
+            })
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM ANALYZE core_reading')
+        cursor.execute('VACUUM ANALYZE core_readingrollup')
+        cursor.execute('SELECT count(*) FROM core_reading')
+        print(f'{cursor.fetchone()[0]:,} readings stored')
+
+
+def run(containers, repeat):
+    from django.db import connection
+    from django.urls import reverse
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+
+    from core.models import Container
+
+    user = create_user('bench@example.com')
+    seed_containers(user, containers)
+    seeded = list(Container.objects.filter(user=user))
+    end = timezone.now().replace(second=0, microsecond=0)
+    seed_readings(seeded, end)
+    container = seeded[0]
+    url = reverse('container:container-readings', args=[container.id])
+    client = APIClient()
+    client.force_authenticate(user)
+
+    results = []
+    for name, span, bucket in CASES:
+        params = {
+            'from': (end - span).isoformat(),
+            'to': end.isoformat(),
+            'bucket': bucket,
+        }
+        points = len(client.get(url, params).data['results'])
+
+        def request():
+            res = client.get(url, params)
+            assert res.status_code == 200, res.status_code
+
+        stats = summarize(measure(request, repeat))
+        stats.update(case=name, points=points)
+        results.append(stats)
+        print(
+            f'{name:<10} {points:>5} points  '
+            f'p50 {stats["p50_ms"]:8.2f} ms  '
+            f'p95 {stats["p95_ms"]:8.2f} ms'
+        )
+
+    def raw_year():
+        with connection.cursor() as cursor:
+            cursor.execute(RAW_YEAR, [
+                container.id, end - datetime.timedelta(days=DAYS), end,
+            ])
+            cursor.fetchall()
+
+    stats = summarize(measure(raw_year, max(repeat // 3, 3)))
+    stats.update(case='year_raw_sql')
+    results.append(stats)
+    print(
+        f'{"year_raw_sql":<10} {"":>12}  '
+        f'p50 {stats["p50_ms"]:8.2f} ms  '
+        f'p95 {stats["p95_ms"]:8.2f} ms'
+    )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--containers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    # Time the queries rather than repeated hits on the response cache.
+    os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+    setup_django()
+    with benchmark_database():
+        results = run(args.containers, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Ingestion throughput of batched sensor readings.
+
+Seeds one user with `--containers` containers and times posting batches
+of readings of several sizes to the ingestion endpoint. Every batch is
+new readings, one per container, a minute after the previous batch.
+
+    python -m benchmarks.readings --containers 10000
+"""
+import argparse
+import datetime
+import json
+import os
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    measure,
+    seed_containers,
+    setup_django,
+    summarize,
+)
+
+
+BATCH_SIZES = [100, 1000, 5000]
+
+
+def bodies(containers, batch_size, start):
+    """Yield JSON bodies of `batch_size` readings, each a minute later."""
+    minute = 0
+    while True:
+        recorded_at = (
+            start + datetime.timedelta(minutes=minute)
+        ).isoformat()
+        offset = minute * batch_size
+        yield json.dumps([
+            {
+                'bin_id': f'B{(offset + i) % containers:08d}',
+                'recorded_at': recorded_at,
+                'fill_level': (offset + i) % 101,
+                'temperature': 12.5,
+            }
+            for i in range(batch_size)
+        ])
+        minute += 1
+
+
+def run(containers, repeat):
+    from django.db import connection
+    from django.urls import reverse
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+
+    url = reverse('container:container-ingest')
+    user = create_user('bench@example.com')
+    seed_containers(user, containers)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    results = []
+    for batch_size in BATCH_SIZES:
+        if batch_size > containers:
+            continue
+        # Each size gets its own day, so no reading is a duplicate.
+        start = timezone.now().replace(second=0, microsecond=0) - \
+            datetime.timedelta(days=len(results) + 1)
+        # Build the bodies up front, so only the request is timed.
+        source = bodies(containers, batch_size, start)
+        prepared = iter([next(source) for _ in range(repeat + 3)])
+
+        def request():
+            res = client.post(url, next(prepared),
+                              content_type='application/json')
+            assert res.data['created'] == batch_size, res.data
+
+        stats = summarize(measure(request, repeat))
+        rate = batch_size / stats['p50_ms'] * 1000
+        stats.update(containers=containers, batch_size=batch_size,
+                     readings_per_s=round(rate))
+        results.append(stats)
+        print(
+            f'batch {batch_size:>5}  '
+            f'p50 {stats["p50_ms"]:8.2f} ms  '
+            f'p95 {stats["p95_ms"]:8.2f} ms  '
+            f'{rate:>9,.0f} readings/s'
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM core_reading')
+        print(f'{cursor.fetchone()[0]:,} readings stored')
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--containers', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    # Time the ingestion rather than repeated hits on the response cache.
+    os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+    setup_django()
+    with benchmark_database():
+        results = run(args.containers, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
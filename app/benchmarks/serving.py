@@ -0,0 +1,238 @@
+"""
+Throughput of the read endpoints under WSGI and ASGI servers.
+
+Seeds a fleet, then starts gunicorn with the WSGI app and uvicorn with
+the ASGI app in turn and drives both with the same concurrent load: the
+container list, a container, the tag list and the user profile, each
+request on a new connection as behind a proxy. The resident memory of
+each server's process tree is reported next to its throughput, so worker
+counts can be tuned until both use the same memory.
+
+    python -m benchmarks.serving --wsgi-workers 2 --asgi-workers 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.base import (
+    benchmark_database,
+    create_user,
+    seed_containers,
+    setup_django,
+    summarize,
+)
+
+
+def rss_mb(pid):
+    """Return the resident memory of `pid` and its children in MB."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pending.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return round(total / 1024, 1)
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not start.')
+
+
+async def fetch(port, path, token):
+    """Send one GET and return its status code."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write((
+        f'GET {path} HTTP/1.1\r\n'
+        f'Host: localhost\r\n'
+        f'Authorization: Token {token}\r\n'
+        f'Connection: close\r\n\r\n'
+    ).encode('ascii'))
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return int(data.split(b' ', 2)[1])
+
+
+async def drive(port, paths, token, concurrency, duration):
+    """Keep `concurrency` requests in flight for `duration` seconds."""
+    samples = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, paths[i % len(paths)], token)
+            except (OSError, IndexError, ValueError):
+                status = None
+            if status == 200:
+                samples.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+            i += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples, errors
+
+
+def serve(command, env, port, paths, token, concurrency, duration):
+    """Run the server `command` under load and return its statistics."""
+    process = subprocess.Popen(
+        command,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        asyncio.run(drive(port, paths, token, concurrency, 2))
+        samples, errors = asyncio.run(
+            drive(port, paths, token, concurrency, duration)
+        )
+        memory = rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+    stats = summarize(samples) if samples else {'count': 0}
+    stats.update(
+        rps=round(len(samples) / duration, 1),
+        errors=errors,
+        rss_mb=memory,
+    )
+    return stats
+
+
+def prepare(rows, page_size):
+    """Seed a fleet and return the paths to request and a token."""
+    from django.urls import reverse
+    from rest_framework.authtoken.models import Token
+
+    from core.models import Container, Tag
+
+    user = create_user('bench@example.com')
+    seed_containers(user, rows)
+    Tag.objects.bulk_create([
+        Tag(user=user, name=f'Tag {i}') for i in range(20)
+    ])
+    token = Token.objects.create(user=user).key
+    container = Container.objects.filter(user=user).first()
+    paths = [
+        reverse('container:container-list') + f'?page_size={page_size}',
+        reverse('container:container-detail', args=[container.id]),
+        reverse('container:tag-list'),
+        reverse('user:me'),
+    ]
+    return paths, token
+
+
+def server_env(**overrides):
+    """Return the environment for a server using the benchmark database."""
+    from django.db import connection
+
+    return dict(
+        os.environ,
+        DB_NAME=connection.settings_dict['NAME'],
+        DJANGO_ALLOWED_HOSTS='localhost',
+        **overrides,
+    )
+
+
+def run(args):
+    paths, token = prepare(args.rows, args.page_size)
+    env = server_env()
+    bin_dir = os.path.dirname(sys.executable)
+    servers = {
+        'wsgi': [
+            os.path.join(bin_dir, 'gunicorn'),
+            'app.wsgi:application',
+            '--workers', str(args.wsgi_workers),
+            '--worker-class', 'sync',
+            '--bind', f'127.0.0.1:{args.port}',
+        ],
+        'asgi': [
+            os.path.join(bin_dir, 'uvicorn'),
+            'app.asgi:application',
+            '--workers', str(args.asgi_workers),
+            '--port', str(args.port),
+            '--no-access-log',
+        ],
+    }
+
+    results = []
+    for concurrency in args.concurrency:
+        for name, command in servers.items():
+            stats = serve(
+                command,
+                env,
+                args.port,
+                paths,
+                token,
+                concurrency,
+                args.duration,
+            )
+            stats.update(server=name, concurrency=concurrency)
+            results.append(stats)
+            print(
+                f'{name}  c={concurrency:<4} '
+                f'{stats["rps"]:8.1f} req/s  '
+                f'p50 {stats.get("p50_ms", 0):8.2f} ms  '
+                f'p99 {stats.get("p99_ms", 0):8.2f} ms  '
+                f'errors {stats["errors"]:<4} '
+                f'rss {stats["rss_mb"]:7.1f} MB'
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--wsgi-workers', type=int, default=2)
+    parser.add_argument('--asgi-workers', type=int, default=1)
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        nargs='+',
+        default=[1, 8, 32],
+        help='Requests kept in flight.',
+    )
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
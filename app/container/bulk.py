@@ -0,0 +1,277 @@
+"""
+Batched writes for the container API.
+"""
+from uuid import uuid4
+
+from django.db import (
+    transaction,
+    IntegrityError,
+)
+from django.db.models import (
+    CharField,
+    Q,
+    Value,
+)
+from django.db.models.functions import (
+    Cast,
+    Concat,
+)
+from django.utils import timezone
+
+from core.cache import response_cache
+from core.models import Container
+from container.serializers import ContainerDetailSerializer
+from container.tags import assign_tags
+
+
+OP_UPSERT = 'upsert'
+OP_DELETE = 'delete'
+
+
+def is_valid_id(value):
+    """Return True if `value` can be a container ID."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_valid_bin_id(value):
+    """Return True if `value` can be looked up as a bin ID."""
+    return isinstance(value, str) or is_valid_id(value)
+
+
+class BulkContainerWriter:
+    """Validate and apply a batch of container upserts and deletes.
+
+    Upserts match an existing container by `id` when given, otherwise by
+    `bin_id`, and create a new container when nothing matches. Deletes
+    match by `id` or `bin_id`. The whole batch is validated before any
+    write happens and is then applied in a single transaction, so either
+    every item is applied or none are. Bin IDs are checked against the
+    state the batch leaves, so containers can swap bin IDs or take one
+    from a container deleted in the same batch.
+    """
+    serializer_class = ContainerDetailSerializer
+
+    def __init__(self, user, items):
+        self.user = user
+        self.items = items
+        self.results = []
+        self.valid = True
+
+    def run(self):
+        """Validate and apply the batch, returning per-item results."""
+        plan = self._validate()
+        if self.valid:
+            try:
+                self._apply(*plan)
+            except IntegrityError:
+                # Another request claimed one of the bin IDs first.
+                self.valid = False
+                for result in self.results:
+                    result.update(status='error', errors={
+                        'non_field_errors': [
+                            'The batch conflicts with a concurrent change.'
+                        ],
+                    })
+                    result.pop('id', None)
+        else:
+            for result in self.results:
+                result.setdefault('status', 'skipped')
+
+        return self.results
+
+    def _load_existing(self):
+        """Fetch every container the batch refers to in one query."""
+        ids = set()
+        bin_ids = set()
+        for item in self.items:
+            if not isinstance(item, dict):
+                continue
+            if item.get('id') is not None:
+                if is_valid_id(item['id']):
+                    ids.add(item['id'])
+            elif is_valid_bin_id(item.get('bin_id')):
+                bin_ids.add(str(item['bin_id']))
+
+        by_id = {}
+        by_bin_id = {}
+        if not ids and not bin_ids:
+            return by_id, by_bin_id
+
+        queryset = Container.objects.filter(user=self.user).filter(
+            Q(id__in=ids) | Q(bin_id__in=bin_ids)
+        ).order_by('id')
+        for container in queryset:
+            by_id[container.id] = container
+            by_bin_id.setdefault(container.bin_id, container)
+
+        return by_id, by_bin_id
+
+    def _error(self, result, errors):
+        result['status'] = 'error'
+        result['errors'] = errors
+        self.valid = False
+
+    def _validate(self):
+        by_id, by_bin_id = self._load_existing()
+        to_create = []
+        to_update = []
+        to_delete = []
+        update_fields = set()
+        seen = set()
+        claimed = set()
+        renamed = []
+        tags = {}
+
+        for index, item in enumerate(self.items):
+            result = {'index': index}
+            self.results.append(result)
+            if not isinstance(item, dict):
+                self._error(result, {'non_field_errors': [
+                    'Expected an object.'
+                ]})
+                continue
+
+            op = item.get('op', OP_UPSERT)
+            if op not in (OP_UPSERT, OP_DELETE):
+                self._error(result, {'op': [f'Unknown operation "{op}".']})
+                continue
+            # The ID is used as a key below, so anything unhashable has to
+            # be turned away first.
+            if item.get('id') is not None and not is_valid_id(item['id']):
+                self._error(result, {'id': ['A valid integer is required.']})
+                continue
+            if item.get('id') is None and \
+                    not is_valid_bin_id(item.get('bin_id')):
+                self._error(result, {'bin_id': [
+                    'A valid bin ID is required when id is not given.'
+                ]})
+                continue
+
+            if item.get('id') is not None:
+                instance = by_id.get(item['id'])
+                key = ('id', item['id'])
+            else:
+                instance = by_bin_id.get(str(item['bin_id']))
+                key = ('bin_id', str(item['bin_id']))
+
+            if instance is not None:
+                key = ('id', instance.id)
+            if key in seen:
+                self._error(result, {'non_field_errors': [
+                    'Container appears more than once in the batch.'
+                ]})
+                continue
+            seen.add(key)
+
+            if op == OP_DELETE:
+                if instance is None:
+                    self._error(result, {'non_field_errors': [
+                        'Container not found.'
+                    ]})
+                    continue
+                to_delete.append((result, instance))
+                continue
+
+            if instance is None and item.get('id') is not None:
+                self._error(result, {'id': ['Container not found.']})
+                continue
+
+            serializer = self.serializer_class(
+                instance,
+                data=item,
+                partial=instance is not None,
+            )
+            if not serializer.is_valid():
+                self._error(result, serializer.errors)
+                continue
+
+            data = dict(serializer.validated_data)
+            if 'tags' in data:
+                tags[index] = [tag['name'] for tag in data.pop('tags')]
+            bin_id = data.get('bin_id', getattr(instance, 'bin_id', None))
+            if bin_id in claimed:
+                self._error(result, {'bin_id': [
+                    'Bin ID appears more than once in the batch.'
+                ]})
+                continue
+            claimed.add(bin_id)
+            if instance is not None and bin_id != instance.bin_id:
+                renamed.append((result, instance))
+
+            if instance is None:
+                to_create.append((result, Container(user=self.user, **data)))
+            else:
+                for attr, value in data.items():
+                    setattr(instance, attr, value)
+                update_fields.update(data)
+                to_update.append((result, instance))
+
+        self._check_renames(renamed, [
+            obj.id for _, obj in to_update + to_delete
+        ])
+        renamed = [obj for _, obj in renamed]
+        return to_create, to_update, to_delete, update_fields, tags, renamed
+
+    def _check_renames(self, renamed, touched):
+        """Reject updates that move a container onto a used bin ID."""
+        if not renamed:
+            return
+
+        # Containers the batch deletes or updates give up their bin IDs,
+        # and the ones they keep or take are already claimed above.
+        taken = set(Container.objects.filter(
+            user=self.user,
+            bin_id__in=[obj.bin_id for _, obj in renamed],
+        ).exclude(id__in=touched).values_list('bin_id', flat=True))
+        for result, obj in renamed:
+            if obj.bin_id in taken:
+                self._error(result, {'bin_id': [
+                    'You already have a container with this bin ID.'
+                ]})
+
+    @transaction.atomic
+    def _apply(self, to_create, to_update, to_delete, update_fields, tags,
+               renamed):
+        # bulk_create and bulk_update send no signals.
+        response_cache.bump(self.user.id)
+        # The unique bin ID constraint is checked row by row, so bin IDs
+        # are freed before anything takes them: deleted containers first,
+        # then renamed ones move to a placeholder of their own.
+        if to_delete:
+            Container.objects.filter(
+                id__in=[obj.id for _, obj in to_delete],
+            ).delete()
+            for result, obj in to_delete:
+                result.update(status='deleted', id=obj.id)
+        if len(renamed) > 1:
+            Container.objects.filter(
+                id__in=[obj.id for obj in renamed],
+            ).update(bin_id=Concat(
+                Value(f'{uuid4().hex}-'),
+                Cast('id', output_field=CharField()),
+            ))
+
+        if to_create:
+            Container.objects.bulk_create([obj for _, obj in to_create])
+            for result, obj in to_create:
+                result.update(status='created', id=obj.id)
+
+        if to_update:
+            # bulk_update skips auto_now, and tag changes count too.
+            now = timezone.now()
+            for _, obj in to_update:
+                obj.updated_at = now
+            Container.objects.bulk_update(
+                [obj for _, obj in to_update],
+                sorted(update_fields | {'updated_at'}),
+            )
+        for result, obj in to_update:
+            result.update(status='updated', id=obj.id)
+
+        assignments = {
+            obj: tags[result['index']]
+            for result, obj in to_create + to_update
+            if result['index'] in tags
+        }
+        if assignments:
+            assign_tags(self.user, assignments)
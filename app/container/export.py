@@ -0,0 +1,93 @@
+"""
+Streaming export of containers.
+"""
+import csv
+import json
+import tempfile
+from collections import defaultdict
+
+from core.models import Container
+
+
+EXPORT_FIELDS = [
+    'id', 'bin_id', 'bin_size', 'bin_type', 'description', 'latitude',
+    'longitude',
+]
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_SPOOL_SIZE = 4 * 1024 * 1024
+TAG_SEPARATOR = '|'
+
+
+class Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a dict per container, including its tag names.
+
+    Rows are read in keyset batches of `chunk_size`, each starting after
+    the last ID of the one before, and tags are fetched once per batch.
+    Memory use depends on `chunk_size` and not on the size of the
+    queryset, whether or not server-side cursors are available, as they
+    are not behind pgbouncer.
+    """
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS)
+    through = Container.tags.through.objects
+    last_id = None
+    while True:
+        batch = rows if last_id is None else rows.filter(id__gt=last_id)
+        chunk = list(batch[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+
+        tags = defaultdict(list)
+        tag_rows = through.filter(
+            container_id__in=[row[0] for row in chunk],
+        ).values_list('container_id', 'tag__name').order_by('tag__name')
+        for container_id, name in tag_rows:
+            tags[container_id].append(name)
+
+        for row in chunk:
+            item = dict(zip(EXPORT_FIELDS, row))
+            item['tags'] = tags.get(row[0], [])
+            yield item
+
+
+def stream_ndjson(rows):
+    """Yield each row as a line of JSON."""
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def stream_csv(rows):
+    """Yield a CSV header followed by a line per row."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS + ['tags'])
+    for row in rows:
+        yield writer.writerow(
+            [row[field] for field in EXPORT_FIELDS] +
+            [TAG_SEPARATOR.join(row['tags'])]
+        )
+
+
+def spool(content, max_size=EXPORT_SPOOL_SIZE):
+    """Write the text chunks of `content` to a file and return it rewound.
+
+    Under ASGI, Django 3.2 reads a streaming response on the event loop,
+    where the ORM cannot run. Spooling the export in the view's thread
+    leaves the loop only the file to read. Up to `max_size` bytes are
+    kept in memory, the rest goes to a temporary file.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_size)
+    try:
+        for chunk in content:
+            spooled.write(chunk.encode())
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
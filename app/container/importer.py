@@ -0,0 +1,314 @@
+"""
+Streaming import of containers from CSV or NDJSON.
+"""
+import csv
+import io
+import json
+import time
+
+from django.db import (
+    connection,
+    transaction,
+    DatabaseError,
+)
+
+from core.cache import response_cache
+from core.models import Container
+from container.export import TAG_SEPARATOR
+from container.serializers import ContainerDetailSerializer
+from container.tags import TagResolver
+
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+FORMATS = [FORMAT_CSV, FORMAT_NDJSON]
+EXTENSIONS = {
+    '.csv': FORMAT_CSV,
+    '.ndjson': FORMAT_NDJSON,
+    '.jsonl': FORMAT_NDJSON,
+}
+
+
+def guess_format(filename):
+    """Return the import format for a file name, or None."""
+    for extension, file_format in EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return file_format
+
+    return None
+
+
+def read_csv(lines):
+    """Yield `(line number, row)` for CSV text lines with a header."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # An empty cell leaves the location unset, as exported.
+        for field in ('latitude', 'longitude'):
+            if row.get(field) == '':
+                row[field] = None
+        tags = row.pop('tags', None) or ''
+        row['tags'] = [tag for tag in tags.split(TAG_SEPARATOR) if tag]
+        yield reader.line_num, row
+
+
+def read_ndjson(lines):
+    """Yield `(line number, row)` for NDJSON text lines.
+
+    Lines that are not valid JSON objects are yielded as a string error
+    message in place of the row.
+    """
+    for lineno, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield lineno, f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(row, dict):
+            yield lineno, 'Expected a JSON object.'
+            continue
+        yield lineno, row
+
+
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def copy_value(value):
+    """Return `value` escaped for the COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+
+    return str(value).translate(COPY_ESCAPES)
+
+
+READERS = {
+    FORMAT_CSV: read_csv,
+    FORMAT_NDJSON: read_ndjson,
+}
+
+
+class ImportResult:
+    """Running totals for an import."""
+
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.started = time.monotonic()
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_sec(self):
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_sec': round(self.rows_per_sec, 1),
+        }
+
+
+class ContainerImporter:
+    """Validate and insert containers for a user in fixed size chunks.
+
+    Rows are validated with `ContainerDetailSerializer`, tags are resolved
+    by name and each chunk is written in its own transaction, with `COPY`
+    on Postgres and `bulk_create` elsewhere. Only one chunk is held in
+    memory at a time. If a chunk fails to insert it is retried row by row
+    so a single bad row does not reject its neighbours.
+    """
+    serializer_class = ContainerDetailSerializer
+
+    def __init__(self, user, chunk_size=5000, use_copy=None,
+                 max_errors=1000, progress=None):
+        self.user = user
+        self.chunk_size = chunk_size
+        if use_copy is None:
+            use_copy = connection.vendor == 'postgresql'
+        self.use_copy = use_copy
+        self.max_errors = max_errors
+        self.progress = progress
+        self.tags = TagResolver(user)
+
+    def run(self, rows):
+        """Import `(line number, row)` pairs and return an ImportResult."""
+        result = ImportResult(self.max_errors)
+        chunk = []
+        for line, row in rows:
+            result.rows += 1
+            if isinstance(row, str):
+                result.add_error(line, {'non_field_errors': [row]})
+                continue
+
+            # Tags are plain names here rather than nested objects.
+            names = row.pop('tags', None) or []
+            serializer = self.serializer_class(data=row)
+            if not serializer.is_valid():
+                result.add_error(line, serializer.errors)
+                continue
+
+            if not isinstance(names, list) or \
+                    not all(isinstance(name, str) for name in names):
+                result.add_error(line, {
+                    'tags': ['Expected a list of names.'],
+                })
+                continue
+            chunk.append((line, serializer.validated_data, names))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, result)
+                chunk = []
+
+        if chunk:
+            self._flush(chunk, result)
+
+        return result
+
+    def import_file(self, lines, file_format):
+        """Import text `lines` in the given format."""
+        return self.run(READERS[file_format](lines))
+
+    def _flush(self, chunk, result):
+        chunk = self._drop_duplicates(chunk, result)
+        tags = self.tags.resolve(
+            name for _, _, names in chunk for name in names
+        )
+        entries = [
+            (
+                line,
+                Container(user=self.user, **data),
+                [tags[name] for name in names if name in tags],
+            )
+            for line, data, names in chunk
+        ]
+        try:
+            with transaction.atomic():
+                self._insert(entries)
+            result.created += len(entries)
+        except DatabaseError:
+            self._insert_rows(entries, result)
+        # COPY and bulk_create send no signals.
+        response_cache.bump(self.user.id)
+
+        if self.progress:
+            self.progress(result)
+
+    def _drop_duplicates(self, chunk, result):
+        """Remove rows whose bin ID already exists, recording errors."""
+        taken = set(Container.objects.filter(
+            user=self.user,
+            bin_id__in=[data['bin_id'] for _, data, _ in chunk],
+        ).values_list('bin_id', flat=True))
+        rows = []
+        for line, data, names in chunk:
+            if data['bin_id'] in taken:
+                result.add_error(line, {'bin_id': [
+                    'You already have a container with this bin ID.'
+                ]})
+                continue
+            taken.add(data['bin_id'])
+            rows.append((line, data, names))
+
+        return rows
+
+    def _insert_rows(self, entries, result):
+        """Insert entries one at a time, recording each failure."""
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    self._bulk_insert([entry])
+                result.created += 1
+            except DatabaseError as exc:
+                result.add_error(entry[0], {'non_field_errors': [str(exc)]})
+
+    def _insert(self, entries):
+        if self.use_copy:
+            self._copy_insert(entries)
+        else:
+            self._bulk_insert(entries)
+
+    def _bulk_insert(self, entries):
+        containers = [container for _, container, _ in entries]
+        Container.objects.bulk_create(containers)
+        self._add_tags(entries)
+
+    def _add_tags(self, entries):
+        Through = Container.tags.through
+        links = [
+            Through(container_id=container.id, tag_id=tag.id)
+            for _, container, tags in entries
+            for tag in tags
+        ]
+        if links:
+            Through.objects.bulk_create(links)
+
+    def _copy_insert(self, entries):
+        """Insert entries with COPY, using ids reserved up front."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [Container._meta.db_table, 'id', len(entries)],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+            fields = Container._meta.concrete_fields
+            rows = []
+            for (_, container, _), pk in zip(entries, ids):
+                container.id = pk
+                rows.append([
+                    field.get_db_prep_save(
+                        field.pre_save(container, add=True), connection,
+                    )
+                    for field in fields
+                ])
+            self._copy(cursor, Container._meta.db_table,
+                       [field.column for field in fields], rows)
+
+            Through = Container.tags.through
+            links = [
+                [container.id, tag.id]
+                for _, container, tags in entries
+                for tag in tags
+            ]
+            if links:
+                self._copy(cursor, Through._meta.db_table,
+                           ['container_id', 'tag_id'], links)
+
+    @staticmethod
+    def _copy(cursor, table, columns, rows):
+        """COPY `rows` into `table` using the text format."""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        sql = 'COPY {} ({}) FROM STDIN'.format(
+            quote(table), ', '.join(quote(column) for column in columns),
+        )
+        with connection.wrap_database_errors:
+            cursor.copy_expert(sql, buffer)
@@ -0,0 +1,39 @@
+"""
+Django command to create the monthly partitions of the readings table.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from container.readings import reading_partitions
+
+
+class Command(BaseCommand):
+    """Django command to create upcoming reading partitions."""
+    help = (
+        'Create the readings partitions of this month and the next ones, '
+        'so ingestion does not have to.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=3,
+            help='Months ahead to create partitions for.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        month = timezone.now().date().replace(day=1)
+        created = 0
+        for _ in range(options['months'] + 1):
+            created += reading_partitions.create(month)
+            last = month
+            month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} reading partitions, '
+            f'readings can be stored up to the end of {last:%Y-%m}.'
+        ))
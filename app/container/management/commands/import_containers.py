@@ -0,0 +1,84 @@
+"""
+Django command to import containers from a CSV or NDJSON file.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from container.importer import (
+    FORMATS,
+    ContainerImporter,
+    guess_format,
+)
+
+
+class Command(BaseCommand):
+    """Django command to import containers for a user."""
+    help = 'Import containers for a user from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user that will own the containers.',
+        )
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=FORMATS,
+            help='File format, guessed from the extension by default.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Rows written per transaction.',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use INSERT instead of COPY on Postgres.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist.')
+
+        file_format = options['file_format'] or guess_format(options['path'])
+        if file_format is None:
+            raise CommandError('Unable to guess the format, use --format.')
+
+        importer = ContainerImporter(
+            user,
+            chunk_size=options['chunk_size'],
+            use_copy=False if options['no_copy'] else None,
+            progress=self.report_progress,
+        )
+        with open(options['path'], encoding='utf-8', newline='') as lines:
+            result = importer.import_file(lines, file_format)
+
+        for error in result.errors:
+            self.stderr.write(f'Line {error["line"]}: {error["errors"]}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(
+                f'... {result.error_count - len(result.errors)} more errors'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} of {result.rows} rows in '
+            f'{result.elapsed:.1f}s ({result.rows_per_sec:.0f} rows/sec), '
+            f'{result.error_count} errors.'
+        ))
+
+    def report_progress(self, result):
+        """Write the running totals after each chunk."""
+        self.stdout.write(
+            f'{result.rows} rows, {result.created} created, '
+            f'{result.error_count} errors, '
+            f'{result.rows_per_sec:.0f} rows/sec'
+        )
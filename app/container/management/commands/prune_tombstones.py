@@ -0,0 +1,31 @@
+"""
+Django command to delete the tombstones no sync token needs any more.
+"""
+from django.core.management.base import BaseCommand
+
+from container.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    """Django command to prune old tombstones."""
+    help = (
+        'Delete the tombstones of containers and tags deleted longer ago '
+        'than TOMBSTONE_RETENTION_DAYS. Sync tokens that old must do a '
+        'full sync.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Tombstones deleted per query.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        deleted = prune_tombstones(options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} tombstones.'
+        ))
@@ -0,0 +1,65 @@
+"""
+Django command to recount the container stats from the containers.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from container.stats import (
+    delete_orphaned_stats,
+    rebuild_stats,
+)
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the container stats."""
+    help = (
+        'Recount containers by bin type, bin size and tag, correcting '
+        'the counts kept by the database triggers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='emails',
+            help='Email of a user to rebuild, may be repeated. '
+                 'Rebuilds every user by default.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users rebuilt per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        users = get_user_model().objects.order_by('id')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+            missing = set(options['emails']) - set(
+                users.values_list('email', flat=True)
+            )
+            if missing:
+                raise CommandError(
+                    f'User {", ".join(sorted(missing))} does not exist.'
+                )
+
+        user_ids = list(users.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        corrected = set()
+        for start in range(0, len(user_ids), batch_size):
+            corrected |= rebuild_stats(user_ids[start:start + batch_size])
+
+        deleted = 0
+        if not options['emails']:
+            deleted = delete_orphaned_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {len(user_ids)} users, '
+            f'{len(corrected)} corrected, '
+            f'{deleted} orphaned counts deleted.'
+        ))
@@ -0,0 +1,191 @@
+"""
+View mixins for the container APIs.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Max,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    http_date,
+    parse_http_date_safe,
+)
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from core.cache import response_cache
+from core.metrics import RESPONSE_CACHE_LOOKUPS
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _('The resource has changed since it was fetched.')
+    default_code = 'precondition_failed'
+
+
+def aggregate_validators(queryset):
+    """Return `(last modified, count)` for a queryset in one query."""
+    result = queryset.order_by().aggregate(
+        last_modified=Max('updated_at'),
+        count=Count('pk'),
+    )
+    return result['last_modified'], result['count']
+
+
+class ConditionalRequestMixin:
+    """Add ETag and Last-Modified validators to a model viewset.
+
+    Lists and objects are described by a few values, such as the latest
+    `updated_at` and a row count, that change whenever their response
+    would. Those are read with an aggregate query and checked before
+    anything is serialized, so a matching `If-None-Match` or
+    `If-Modified-Since` is answered with 304 Not Modified; views with a
+    detail route call `conditional_response` themselves. Updates and
+    deletes honour `If-Match` and `If-Unmodified-Since`, locking the row
+    while the precondition is checked, and fail with 412 otherwise.
+    """
+
+    def get_list_validators(self, queryset):
+        """Return values that change whenever the list would."""
+        return aggregate_validators(queryset)
+
+    def get_object_validators(self, instance):
+        """Return values that change whenever the object would."""
+        return instance.pk, instance.updated_at
+
+    def get_validators(self, values):
+        """Return an `(etag, last modified timestamp)` pair for values."""
+        key = '|'.join(
+            value.isoformat() if hasattr(value, 'isoformat') else str(value)
+            for value in values
+        )
+        etag = '"%s"' % hashlib.md5(key.encode('utf-8')).hexdigest()
+        stamps = [value for value in values if hasattr(value, 'timestamp')]
+        # HTTP dates have whole second precision.
+        last_modified = int(max(stamps).timestamp()) if stamps else None
+        return etag, last_modified
+
+    def conditional_response(self, values, get_response):
+        """Return 304 if the client is up to date, else `get_response()`."""
+        etag, timestamp = self.get_validators(values)
+        return self.validated_response(etag, timestamp, get_response)
+
+    def validated_response(self, etag, timestamp, get_response):
+        """Like `conditional_response`, with the validators at hand."""
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=timestamp,
+        )
+        if response is None:
+            response = get_response()
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def has_preconditions(self):
+        meta = self.request.META
+        return 'HTTP_IF_MATCH' in meta or 'HTTP_IF_UNMODIFIED_SINCE' in meta
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS and \
+                self.has_preconditions():
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
+
+    def get_object(self):
+        """Return the object, checking write preconditions against it."""
+        instance = super().get_object()
+        if self.request.method not in SAFE_METHODS:
+            etag, last_modified = self.get_validators(
+                self.get_object_validators(instance),
+            )
+            response = get_conditional_response(
+                self.request,
+                etag=etag,
+                last_modified=last_modified,
+            )
+            if response is not None:
+                raise PreconditionFailed()
+        return instance
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Filters, ordering and cursors are all part of the query string.
+        values = [request.get_full_path()]
+        values.extend(self.get_list_validators(queryset))
+        return self.conditional_response(
+            values,
+            lambda: super(ConditionalRequestMixin, self).list(
+                request, *args, **kwargs,
+            ),
+        )
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+
+def detach(data):
+    """Return response data without its reference to the serializer."""
+    if isinstance(data, ReturnList):
+        return list(data)
+    if isinstance(data, dict):
+        return {key: detach(value) for key, value in data.items()}
+    return data
+
+
+class CachedListMixin:
+    """Serve lists from the response cache, see `core.cache`.
+
+    Lists are keyed by the view, the user, the URL with its query
+    parameters and the user's data version, which every write to their
+    containers or tags moves on. A hit runs no queries. Goes before
+    `ConditionalRequestMixin`, whose validators are cached along with the
+    data, so cached lists still answer 304 Not Modified.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not response_cache.enabled:
+            return super().list(request, *args, **kwargs)
+
+        name = type(self).__name__
+        key, version = response_cache.make_key(
+            name,
+            request.user.pk,
+            request.build_absolute_uri(request.path),
+            *sorted(request.query_params.lists()),
+        )
+        cached = response_cache.get(key)
+        if cached is not None:
+            RESPONSE_CACHE_LOOKUPS.labels(name, 'hit').inc()
+            data, etag, last_modified = cached
+            return self.validated_response(
+                etag,
+                parse_http_date_safe(last_modified or ''),
+                lambda: Response(data),
+            )
+
+        RESPONSE_CACHE_LOOKUPS.labels(name, 'miss').inc()
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set(key, (
+                detach(response.data),
+                response.get('ETag'),
+                response.get('Last-Modified'),
+            ), version)
+        return response
@@ -0,0 +1,261 @@
+"""
+Pagination for the container APIs.
+"""
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from urllib import parse
+
+from django.db.models import (
+    BooleanField,
+    Expression,
+    F,
+    Value,
+)
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(ordering, position, reverse=False):
+    """Return an opaque cursor for `position` in `ordering`."""
+    payload = {'o': ordering, 'p': position}
+    if reverse:
+        payload['r'] = 1
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return b64encode(data, altchars=b'-_').decode('ascii')
+
+
+class RowComparison(Expression):
+    """A SQL row value comparison such as `(user_id, id) < (%s, %s)`."""
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, fields, operator, values):
+        super().__init__(output_field=BooleanField())
+        self.fields = [F(field) for field in fields]
+        self.operator = operator
+        self.values = [Value(value) for value in values]
+
+    def resolve_expression(self, query=None, allow_joins=True, reuse=None,
+                           summarize=False, for_save=False):
+        c = self.copy()
+        c.is_summary = summarize
+        c.fields = [
+            field.resolve_expression(query, allow_joins, reuse, summarize)
+            for field in self.fields
+        ]
+        # Prepare each value like the column it is compared to.
+        c.values = [
+            Value(value.value, output_field=field.output_field)
+            .resolve_expression(query, allow_joins, reuse, summarize)
+            for field, value in zip(c.fields, self.values)
+        ]
+        return c
+
+    def get_source_expressions(self):
+        return self.fields + self.values
+
+    def set_source_expressions(self, exprs):
+        self.fields = exprs[:len(self.fields)]
+        self.values = exprs[len(self.fields):]
+
+    def as_sql(self, compiler, connection):
+        sql = []
+        params = []
+        for side in (self.fields, self.values):
+            parts = []
+            for expr in side:
+                part_sql, part_params = compiler.compile(expr)
+                parts.append(part_sql)
+                params.extend(part_params)
+            sql.append('(%s)' % ', '.join(parts))
+
+        return f'{sql[0]} {self.operator} {sql[1]}', params
+
+
+class KeysetCursorPagination(BasePagination):
+    """Opaque cursor pagination using keyset (seek) queries.
+
+    The queryset is ordered by one of the view's `ordering_fields` followed
+    by `id` as a tie breaker, and each page is fetched with a `WHERE` clause
+    on the last seen `(value, id)` pair instead of an `OFFSET`, so every
+    page costs the same as the first one.
+
+    Views can set `keyset_prefix` to the columns the queryset is already
+    filtered on by equality, such as `['user_id']`, or a
+    `get_keyset_prefix()` method when that depends on the request. They
+    lead the row comparison so Postgres seeks straight into a composite
+    index starting with those columns. Likewise `get_ordering()` and
+    `get_ordering_fields()` override `ordering` and `ordering_fields`.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, view)
+
+        field, descending = self._split_ordering(self.ordering)
+        self.field = field
+        self.keys = [
+            key for key in self.get_keyset_prefix(view) if key != field
+        ]
+        self.keys.append(field)
+        if field != 'id':
+            self.keys.append('id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            position, reverse = None, False
+        else:
+            position, reverse = cursor
+
+        if reverse:
+            descending = not descending
+        if position is not None:
+            queryset = queryset.filter(RowComparison(
+                self.keys,
+                '<' if descending else '>',
+                position,
+            ))
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(*[prefix + key for key in self.keys])
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.results = results
+        return results
+
+    def get_page_size(self, request):
+        """Return the requested page size, capped at `max_page_size`."""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_keyset_prefix(self, view):
+        """Return the columns that lead the keyset for this request."""
+        if hasattr(view, 'get_keyset_prefix'):
+            return list(view.get_keyset_prefix())
+        return list(getattr(view, 'keyset_prefix', []))
+
+    def get_ordering(self, request, view):
+        """Return the requested ordering if the view allows it."""
+        if hasattr(view, 'get_ordering'):
+            default = view.get_ordering()
+        else:
+            default = getattr(view, 'ordering', '-id')
+        if hasattr(view, 'get_ordering_fields'):
+            allowed = view.get_ordering_fields()
+        else:
+            allowed = getattr(view, 'ordering_fields', ['id'])
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering and ordering.lstrip('-') in allowed:
+            return ordering
+
+        return default
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.results:
+            return None
+        return self.encode_cursor(self._position(self.results[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.results:
+            return None
+        return self.encode_cursor(self._position(self.results[0]), True)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page '
+                               f'(max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def encode_cursor(self, position, reverse):
+        """Return a URL for the page on either side of `position`."""
+        encoded = encode_cursor(self.ordering, position, reverse)
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """Return `(position, reverse)` from the request, or None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = b64decode(parse.unquote(encoded), altchars=b'-_')
+            payload = json.loads(data.decode('utf-8'))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+            ordering = payload['o']
+        except (BinasciiError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if ordering != self.ordering or not isinstance(position, list) \
+                or len(position) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def _position(self, instance):
+        return [getattr(instance, key) for key in self.keys]
+
+    @staticmethod
+    def _split_ordering(ordering):
+        if ordering.startswith('-'):
+            return ordering[1:], True
+        return ordering, False
@@ -0,0 +1,335 @@
+"""
+Batched ingestion and downsampled charts of container sensor readings.
+"""
+import datetime
+import functools
+import math
+
+from django.db import (
+    IntegrityError,
+    connection,
+    transaction,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import (
+    Reading,
+    ReadingRollup,
+)
+
+
+# Bin IDs are resolved in the statement, so it always sees the user's
+# containers as they are now. Returns how many readings were new and the
+# items whose bin ID matched no container.
+INSERT_READINGS = """
+WITH batch AS (
+    SELECT * FROM unnest(
+        %(items)s::integer[], %(bin_ids)s::text[],
+        %(recorded_at)s::timestamptz[], %(fill_levels)s::double precision[],
+        %(temperatures)s::double precision[]
+    ) AS b(item, bin_id, recorded_at, fill_level, temperature)
+), matched AS (
+    SELECT b.item, c.id AS container_id, b.recorded_at, b.fill_level,
+        b.temperature
+    FROM batch b
+    JOIN core_container c ON c.user_id = %(user_id)s AND c.bin_id = b.bin_id
+), inserted AS (
+    INSERT INTO core_reading
+        (container_id, recorded_at, fill_level, temperature)
+    SELECT container_id, recorded_at, fill_level, temperature FROM matched
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+)
+SELECT
+    (SELECT count(*) FROM inserted),
+    ARRAY(
+        SELECT item FROM batch
+        EXCEPT SELECT item FROM matched
+        ORDER BY 1
+    )
+"""
+
+
+class ReadingPartitions:
+    """Creates the monthly partitions of the readings table on demand.
+
+    A month is remembered once its partition is committed, after which
+    batches for it add no queries.
+    """
+
+    def __init__(self):
+        self.months = set()
+
+    def create(self, month):
+        """Add the partition of `month`, returning whether it was missing."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT core_create_reading_partition(%s)',
+                [month],
+            )
+            created = cursor.fetchone()[0]
+        transaction.on_commit(functools.partial(self.months.add, month))
+        return created
+
+    def ensure(self, months):
+        """Make sure every month in `months` has a partition."""
+        for month in sorted(set(months) - self.months):
+            self.create(month)
+
+    def clear(self):
+        """Forget which partitions exist."""
+        self.months.clear()
+
+
+reading_partitions = ReadingPartitions()
+
+
+class ReadingResult:
+    """Counts and errors of an ingested batch."""
+
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.received = 0
+        self.created = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, index, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'index': index, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'received': self.received,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+class ReadingWriter:
+    """Validate a batch of readings and store the valid ones.
+
+    Each reading names its container by `bin_id`, which is resolved in
+    the `INSERT` itself. Readings are checked by hand rather than with a
+    serializer, which would cost more than the insert itself, and the
+    valid ones are written with a single `INSERT` of arrays. A reading for
+    a container and time that is already stored is counted as a
+    duplicate, so a device can safely send a batch again.
+    """
+    max_errors = 100
+    max_age = datetime.timedelta(days=365)
+    max_future = datetime.timedelta(days=1)
+
+    def __init__(self, user):
+        self.user = user
+
+    def run(self, items):
+        """Ingest a list of readings and return a ReadingResult."""
+        result = ReadingResult(self.max_errors)
+        result.received = len(items)
+        now = timezone.now()
+        parsed = []
+        for index, item in enumerate(items):
+            reading, errors = self._parse(item, now)
+            if errors:
+                result.add_error(index, errors)
+            else:
+                parsed.append((index, reading))
+
+        if parsed:
+            created, unmatched = self._insert(parsed)
+            for index in unmatched:
+                result.add_error(index, {'bin_id': ['Container not found.']})
+            result.created = created
+            result.duplicates = len(parsed) - len(unmatched) - created
+            result.errors.sort(key=lambda error: error['index'])
+
+        return result
+
+    def _insert(self, parsed):
+        """Insert the `(index, reading)` pairs of `parsed`.
+
+        Returns how many readings were new and the indexes of those whose
+        bin ID matched no container. A container deleted while the
+        statement runs fails its foreign key, in which case the batch is
+        tried once more.
+        """
+        indexes = [index for index, _ in parsed]
+        bin_ids, recorded_at, fill_levels, temperatures = [
+            list(column) for column in zip(*(reading for _, reading in parsed))
+        ]
+        params = {
+            'user_id': self.user.id,
+            'items': indexes,
+            'bin_ids': bin_ids,
+            'recorded_at': recorded_at,
+            'fill_levels': fill_levels,
+            'temperatures': temperatures,
+        }
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    reading_partitions.ensure(
+                        value.date().replace(day=1) for value in recorded_at
+                    )
+                    with connection.cursor() as cursor:
+                        cursor.execute(INSERT_READINGS, params)
+                        return cursor.fetchone()
+            except IntegrityError:
+                if attempt:
+                    raise
+
+    def _parse(self, item, now):
+        """Return `(reading, errors)` for one item of the batch."""
+        if not isinstance(item, dict):
+            return None, {'non_field_errors': ['Expected an object.']}
+
+        errors = {}
+        bin_id = item.get('bin_id')
+        if isinstance(bin_id, int) and not isinstance(bin_id, bool):
+            bin_id = str(bin_id)
+        if not isinstance(bin_id, str) or not bin_id:
+            errors['bin_id'] = ['Expected a bin ID.']
+
+        recorded_at = item.get('recorded_at')
+        if isinstance(recorded_at, str):
+            try:
+                recorded_at = parse_datetime(recorded_at)
+            except ValueError:
+                recorded_at = None
+        else:
+            recorded_at = None
+        if recorded_at is None:
+            errors['recorded_at'] = ['Expected an ISO 8601 date and time.']
+        else:
+            # Times without an offset are taken to be UTC.
+            if timezone.is_naive(recorded_at):
+                recorded_at = recorded_at.replace(tzinfo=datetime.timezone.utc)
+            recorded_at = recorded_at.astimezone(datetime.timezone.utc)
+            if not now - self.max_age <= recorded_at <= now + self.max_future:
+                errors['recorded_at'] = [
+                    'Must be within the last year and at most a day ahead.'
+                ]
+
+        fill_level = self._number(
+            item, 'fill_level', errors, required=True, low=0, high=100,
+        )
+        temperature = self._number(item, 'temperature', errors)
+
+        if errors:
+            return None, errors
+        return (bin_id, recorded_at, fill_level, temperature), None
+
+    @staticmethod
+    def _number(item, name, errors, required=False, low=None, high=None):
+        """Return the number `name` of `item`, adding any error."""
+        value = item.get(name)
+        if value is None:
+            if required:
+                errors[name] = ['This field is required.']
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)) \
+                or not math.isfinite(value):
+            errors[name] = ['Expected a number.']
+            return None
+        if low is not None and not low <= value <= high:
+            errors[name] = [f'Must be between {low} and {high}.']
+            return None
+        return float(value)
+
+
+BUCKET_RAW = 'raw'
+BUCKET_SECONDS = {
+    ReadingRollup.FIVE_MINUTES: 300,
+    ReadingRollup.HOUR: 3600,
+    ReadingRollup.DAY: 86400,
+}
+BUCKETS = [BUCKET_RAW] + list(BUCKET_SECONDS)
+
+# The longest span served from raw readings, and the smallest span each
+# rollup is picked for when no bucket is asked for.
+RAW_MAX_SPAN = datetime.timedelta(days=1)
+AUTO_BUCKETS = [
+    (datetime.timedelta(days=30), ReadingRollup.DAY),
+    (datetime.timedelta(days=2), ReadingRollup.HOUR),
+    (datetime.timedelta(hours=6), ReadingRollup.FIVE_MINUTES),
+]
+
+
+def default_bucket(start, end):
+    """Return the coarsest bucket that still draws `start` to `end` well."""
+    span = end - start
+    for min_span, bucket in AUTO_BUCKETS:
+        if span > min_span:
+            return bucket
+    return BUCKET_RAW
+
+
+def reading_series(container_id, start, end, bucket):
+    """Return the points of a container's readings from `start` to `end`.
+
+    Rollup buckets are read from `core_readingrollup`, which is kept
+    current as readings are stored, so a year of daily points is 366
+    rows of its primary key however many readings there are. The bucket
+    holding `start` is included whole. Raw readings are one point each.
+    """
+    if bucket == BUCKET_RAW:
+        rows = Reading.objects.filter(
+            container_id=container_id,
+            recorded_at__gte=start,
+            recorded_at__lt=end,
+        ).order_by('recorded_at').values_list(
+            'recorded_at', 'fill_level', 'temperature',
+        )
+        return [
+            {
+                'time': recorded_at,
+                'count': 1,
+                'fill_level_avg': fill_level,
+                'fill_level_min': fill_level,
+                'fill_level_max': fill_level,
+                'temperature_avg': temperature,
+                'temperature_min': temperature,
+                'temperature_max': temperature,
+            }
+            for recorded_at, fill_level, temperature in rows
+        ]
+
+    seconds = BUCKET_SECONDS[bucket]
+    first = datetime.datetime.fromtimestamp(
+        start.timestamp() // seconds * seconds,
+        tz=datetime.timezone.utc,
+    )
+    rows = ReadingRollup.objects.filter(
+        container_id=container_id,
+        period=bucket,
+        starts_at__gte=first,
+        starts_at__lt=end,
+    ).order_by('starts_at').values_list(
+        'starts_at', 'count', 'fill_level_sum', 'fill_level_min',
+        'fill_level_max', 'temperature_count', 'temperature_sum',
+        'temperature_min', 'temperature_max',
+    )
+    return [
+        {
+            'time': starts_at,
+            'count': count,
+            'fill_level_avg': fill_sum / count,
+            'fill_level_min': fill_min,
+            'fill_level_max': fill_max,
+            'temperature_avg': (
+                temperature_sum / temperature_count
+                if temperature_count else None
+            ),
+            'temperature_min': temperature_min,
+            'temperature_max': temperature_max,
+        }
+        for (starts_at, count, fill_sum, fill_min, fill_max,
+             temperature_count, temperature_sum, temperature_min,
+             temperature_max) in rows
+    ]
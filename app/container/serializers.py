@@ -1,22 +1,109 @@
 """
 Serializers for container APIs.
 """
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
 
 from core.models import (
     Container,
     Tag,
 )
+from container.tags import assign_tags
+
+
+class TagSerializer(serializers.ModelSerializer):
+    """Serializer for tags."""
+
+    class Meta:
+        model = Tag
+        fields = ['id', 'name']
+        read_only_fields = ['id']
+
+    def validate_name(self, value):
+        """Check the tag name is not already used by the user."""
+        request = self.context.get('request')
+        if request is None or self.parent is not None:
+            # Nested tags are looked up by name, so existing names are fine.
+            return value
+
+        tags = Tag.objects.filter(user=request.user, name=value)
+        if self.instance is not None:
+            tags = tags.exclude(pk=self.instance.pk)
+        if tags.exists():
+            msg = _('You already have a tag with this name.')
+            raise serializers.ValidationError(msg)
+
+        return value
 
 
 class ContainerSerializer(serializers.ModelSerializer):
     """Serializer for containers."""
+    # Stored as lookup table IDs, but read and written as strings.
+    bin_size = serializers.CharField(max_length=255)
+    bin_type = serializers.CharField(max_length=255)
+    tags = TagSerializer(many=True, required=False)
 
     class Meta:
         model = Container
-        fields = ['id', 'bin_id', 'bin_size', 'bin_type']
+        fields = [
+            'id', 'bin_id', 'bin_size', 'bin_type', 'latitude', 'longitude',
+            'tags',
+        ]
         read_only_fields = ['id']
 
+    def validate_bin_id(self, value):
+        """Check the bin ID is not already used by the user."""
+        request = self.context.get('request')
+        if request is None:
+            return value
+
+        containers = Container.objects.filter(user=request.user, bin_id=value)
+        if self.instance is not None:
+            containers = containers.exclude(pk=self.instance.pk)
+        if containers.exists():
+            msg = _('You already have a container with this bin ID.')
+            raise serializers.ValidationError(msg)
+
+        return value
+
+    def validate(self, attrs):
+        """Check latitude and longitude are set or cleared together."""
+        latitude, longitude = (
+            attrs.get(field, getattr(self.instance, field, None))
+            for field in ('latitude', 'longitude')
+        )
+        if (latitude is None) != (longitude is None):
+            msg = _('Latitude and longitude must be given together.')
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+    def _set_tags(self, container, tags, clear):
+        """Get or create tags by name and link them to the container."""
+        names = [tag['name'] for tag in tags]
+        assign_tags(container.user, {container: names}, clear=clear)
+
+    def create(self, validated_data):
+        """Create a container."""
+        tags = validated_data.pop('tags', [])
+        container = Container.objects.create(**validated_data)
+        if tags:
+            self._set_tags(container, tags, clear=False)
+
+        return container
+
+    def update(self, instance, validated_data):
+        """Update a container."""
+        tags = validated_data.pop('tags', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+        if tags is not None:
+            self._set_tags(instance, tags, clear=True)
+
+        return instance
+
 
 class ContainerDetailSerializer(ContainerSerializer):
     """Serializer for container detail view."""
@@ -24,10 +111,59 @@ class ContainerDetailSerializer(ContainerSerializer):
     class Meta(ContainerSerializer.Meta):
         fields = ContainerSerializer.Meta.fields + ['description']
 
-class TagSerializer(serializers.ModelSerializer):
-    """Serializer for tags."""
 
-    class Meta:
-        model = Tag
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+class DeletedSerializer(serializers.Serializer):
+    """Serializer for the IDs deleted since a sync token."""
+    containers = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+
+
+class SyncSerializer(serializers.Serializer):
+    """Serializer for a page of changes since a sync token."""
+    token = serializers.CharField()
+    has_more = serializers.BooleanField()
+    next = serializers.CharField(allow_null=True)
+    containers = ContainerDetailSerializer(many=True)
+    tags = TagSerializer(many=True)
+    deleted = DeletedSerializer()
+
+
+class ValueCountSerializer(serializers.Serializer):
+    """Serializer for the number of containers with one field value."""
+    value = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class TagCountSerializer(serializers.Serializer):
+    """Serializer for the number of containers with one tag."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class ContainerStatsSerializer(serializers.Serializer):
+    """Serializer for a user's container counts."""
+    total = serializers.IntegerField()
+    bin_types = ValueCountSerializer(many=True)
+    bin_sizes = ValueCountSerializer(many=True)
+    tags = TagCountSerializer(many=True)
+
+
+class ReadingPointSerializer(serializers.Serializer):
+    """Serializer for the readings of a container in one bucket."""
+    time = serializers.DateTimeField()
+    count = serializers.IntegerField()
+    fill_level_avg = serializers.FloatField()
+    fill_level_min = serializers.FloatField()
+    fill_level_max = serializers.FloatField()
+    temperature_avg = serializers.FloatField(allow_null=True)
+    temperature_min = serializers.FloatField(allow_null=True)
+    temperature_max = serializers.FloatField(allow_null=True)
+
+
+class ReadingSeriesSerializer(serializers.Serializer):
+    """Serializer for a container's readings over a time range."""
+    bucket = serializers.CharField()
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    results = ReadingPointSerializer(many=True)
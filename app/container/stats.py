@@ -0,0 +1,98 @@
+"""
+Per-user container counts by bin type, bin size and tag.
+"""
+from django.contrib.auth import get_user_model
+from django.db import (
+    connection,
+    transaction,
+)
+
+from core.models import (
+    Container,
+    ContainerStat,
+    Tag,
+)
+
+
+def container_stats(user):
+    """Return the user's container counts, largest first.
+
+    The counts are kept by database triggers, so this reads one row per
+    distinct bin type, bin size and tag, however many containers there
+    are.
+    """
+    stats = {'total': 0, 'bin_types': [], 'bin_sizes': [], 'tags': []}
+    # Bin types and sizes are counted by lookup ID.
+    meta = Container._meta
+    keys = {
+        ContainerStat.BIN_TYPE: (
+            'bin_types',
+            meta.get_field('bin_type').lookup_cache,
+        ),
+        ContainerStat.BIN_SIZE: (
+            'bin_sizes',
+            meta.get_field('bin_size').lookup_cache,
+        ),
+    }
+    tag_counts = {}
+    rows = ContainerStat.objects.filter(user_id=user.id, count__gt=0) \
+        .values_list('dimension', 'value', 'count')
+    for dimension, value, count in rows:
+        if dimension == ContainerStat.TOTAL:
+            stats['total'] = count
+        elif dimension == ContainerStat.TAG:
+            tag_counts[int(value)] = count
+        elif dimension in keys:
+            key, lookups = keys[dimension]
+            stats[key].append({
+                'value': lookups.get_name(int(value)),
+                'count': count,
+            })
+    for key, _ in keys.values():
+        stats[key].sort(key=lambda entry: (-entry['count'], entry['value']))
+
+    # A deleted tag's count can linger, so only list tags that exist.
+    tags = Tag.objects.filter(user=user, id__in=tag_counts) \
+        .values_list('id', 'name')
+    stats['tags'] = sorted(
+        (
+            {'id': tag_id, 'name': name, 'count': tag_counts[tag_id]}
+            for tag_id, name in tags
+        ),
+        key=lambda tag: (-tag['count'], tag['name']),
+    )
+
+    return stats
+
+
+def _snapshot(user_ids):
+    """Return the non-zero counts of `user_ids`, or of every user."""
+    rows = ContainerStat.objects.filter(count__gt=0)
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    return set(rows.values_list('user_id', 'dimension', 'value', 'count'))
+
+
+def rebuild_stats(user_ids=None):
+    """Recount the containers of `user_ids`, or of every user.
+
+    Writers to the counts wait until the rebuild commits. Returns the IDs
+    of users whose counts were wrong.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE core_containerstat IN EXCLUSIVE MODE')
+        before = _snapshot(user_ids)
+        cursor.execute(
+            'SELECT core_rebuild_container_stats(%s::bigint[])',
+            [user_ids],
+        )
+        after = _snapshot(user_ids)
+
+    return {row[0] for row in before ^ after}
+
+
+def delete_orphaned_stats():
+    """Delete counts left behind by deleted users."""
+    users = get_user_model().objects.values('id')
+    deleted, _ = ContainerStat.objects.exclude(user_id__in=users).delete()
+    return deleted
@@ -0,0 +1,243 @@
+"""
+Delta sync of containers, tags and deletions.
+"""
+import json
+import logging
+import time
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from core.models import (
+    Container,
+    Tag,
+    Tombstone,
+)
+from core.routers import pin_to_primary
+from container.pagination import RowComparison
+
+
+logger = logging.getLogger(__name__)
+
+# Transactions running in this database, oldest first, and whether each
+# has run for longer than the given number of seconds. Transaction IDs
+# are shared by the whole cluster, so those of other databases are left
+# out. pg_stat_activity and pg_prepared_xacts only show the low 32 bits.
+# xact_start is hidden for other roles' sessions, which count as recent.
+RUNNING_TRANSACTIONS_SQL = """
+WITH snapshot AS (
+    SELECT txid_current_snapshot() AS snapshot
+), running AS (
+    SELECT xid, coalesce(a.xact_start, p.prepared) AS started
+    FROM snapshot
+    CROSS JOIN LATERAL txid_snapshot_xip(snapshot) AS xid
+    LEFT JOIN pg_stat_activity a
+        ON a.backend_xid::text::bigint = xid %% 4294967296
+        AND a.datname = current_database()
+    LEFT JOIN pg_prepared_xacts p
+        ON p.transaction::text::bigint = xid %% 4294967296
+        AND p.database = current_database()
+    WHERE a.pid IS NOT NULL OR p.gid IS NOT NULL
+)
+SELECT
+    txid_snapshot_xmax(snapshot),
+    xid,
+    started < statement_timestamp() - make_interval(secs => %s)
+FROM snapshot
+LEFT JOIN running ON true
+ORDER BY xid
+"""
+
+
+class InvalidToken(ValueError):
+    """Raised for a sync token that cannot be decoded."""
+
+
+class TokenExpired(InvalidToken):
+    """Raised for a sync token older than the tombstones kept."""
+
+
+def encode_token(xid, seq, cap=None, issued=None):
+    """Return an opaque token for the change after `(xid, seq)`.
+
+    `issued` is when the cap was taken, by default now.
+    """
+    payload = {'x': xid, 's': seq}
+    if cap is not None:
+        payload['c'] = cap
+    payload['t'] = int(time.time()) if issued is None else issued
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return b64encode(data, altchars=b'-_').decode('ascii')
+
+
+def decode_token(token):
+    """Return `(xid, seq, cap, issued)` for a token.
+
+    `cap` is None between syncs, and `issued` for tokens from before it
+    was added.
+    """
+    try:
+        payload = json.loads(b64decode(token, altchars=b'-_').decode('utf-8'))
+        position = (
+            payload['x'], payload['s'], payload.get('c'), payload.get('t'),
+        )
+    except (BinasciiError, ValueError, TypeError, KeyError):
+        raise InvalidToken(token)
+    if not all(isinstance(value, int) for value in position[:2]) or \
+            not all(
+                isinstance(value, (int, type(None)))
+                for value in position[2:]
+            ):
+        raise InvalidToken(token)
+
+    return position
+
+
+def oldest_running_xid(max_lag):
+    """Return the ID of the oldest transaction still writing this database.
+
+    Transactions that have run for more than `max_lag` seconds are passed
+    with a warning, so one left open does not stall every sync. Clients
+    that sync past one miss its changes until the rows are written again.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(RUNNING_TRANSACTIONS_SQL, [max_lag])
+        rows = cursor.fetchall()
+    for _, xid, stale in rows:
+        if xid is None:
+            break
+        if not stale:
+            return xid
+        logger.warning(
+            'Delta sync is passing transaction %s, which has run for more '
+            'than %s seconds. Its changes will be missed by clients.',
+            xid,
+            max_lag,
+        )
+    # None are left, so every transaction before the next ID has finished.
+    return rows[0][0]
+
+
+def retention():
+    """Return for how many seconds a sync token stays valid."""
+    return settings.TOMBSTONE_RETENTION_DAYS * 24 * 60 * 60
+
+
+def prune_tombstones(batch_size=10000):
+    """Delete the tombstones no valid token needs, return how many."""
+    # A token's changes come from transactions that were running when it
+    # was issued, so at most SYNC_MAX_LAG seconds older.
+    cutoff = timezone.now() - timedelta(
+        seconds=retention() + settings.SYNC_MAX_LAG,
+    )
+    deleted = 0
+    while True:
+        # Tombstones are written in roughly ID order, so the oldest are
+        # found at the start of the primary key.
+        ids = list(
+            Tombstone.objects.filter(deleted_at__lt=cutoff)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += Tombstone.objects.filter(id__in=ids).delete()[0]
+
+
+class ChangeFeed:
+    """Containers, tags and tombstones for a user in change order.
+
+    Database triggers stamp every write with the writing transaction's ID
+    and a value from a shared sequence, and deletes leave a tombstone with
+    the same stamp. Changes are returned in `(transaction, sequence)`
+    order, but only from transactions older than every transaction still
+    running when the sync started. Those can no longer gain rows, so a
+    token past them never skips a change that commits late. Changes that
+    are rewritten after a client saw them move to a later position and are
+    sent again.
+
+    Only transactions in this database hold syncs back, and none for more
+    than `SYNC_MAX_LAG` seconds, see `oldest_running_xid`. Tombstones are
+    pruned after `TOMBSTONE_RETENTION_DAYS`, so older tokens raise
+    `TokenExpired` and the client has to sync in full.
+    """
+
+    def __init__(self, user, page_size):
+        self.user = user
+        self.page_size = page_size
+
+    def page(self, token=None):
+        """Return the page of changes after `token`."""
+        # The cap comes from the primary's running transactions, so the
+        # changes must be read there too rather than from a lagging replica.
+        with pin_to_primary():
+            return self._page(token)
+
+    def _page(self, token):
+        if token is None:
+            xid, seq, cap, issued = 0, 0, None, None
+        else:
+            xid, seq, cap, issued = decode_token(token)
+            if issued is None or issued < time.time() - retention():
+                raise TokenExpired(token)
+        if cap is None:
+            issued = int(time.time())
+            cap = oldest_running_xid(settings.SYNC_MAX_LAG)
+
+        containers = self._changes(
+            Container.objects.prefetch_related('tags'), xid, seq, cap,
+        )
+        tags = self._changes(Tag.objects.all(), xid, seq, cap)
+        tombstones = self._changes(Tombstone.objects.all(), xid, seq, cap)
+        changes = sorted(
+            containers + tags + tombstones,
+            key=lambda obj: (obj.change_xid, obj.change_seq),
+        )
+        has_more = len(changes) > self.page_size
+        changes = changes[:self.page_size]
+        if has_more:
+            last = changes[-1]
+            next_token = encode_token(
+                last.change_xid, last.change_seq, cap, issued,
+            )
+        else:
+            next_token = encode_token(cap, 0, issued=issued)
+
+        deleted = {Tombstone.CONTAINER: [], Tombstone.TAG: []}
+        for obj in changes:
+            if isinstance(obj, Tombstone):
+                deleted[obj.model].append(obj.object_id)
+
+        return {
+            'token': next_token,
+            'has_more': has_more,
+            'containers': [
+                obj for obj in changes if isinstance(obj, Container)
+            ],
+            'tags': [obj for obj in changes if isinstance(obj, Tag)],
+            'deleted': {
+                'containers': deleted[Tombstone.CONTAINER],
+                'tags': deleted[Tombstone.TAG],
+            },
+        }
+
+    def _changes(self, queryset, xid, seq, cap):
+        """Fetch up to one more than a page of changes from `queryset`."""
+        # As in the container list, the user range lets the row comparison
+        # seek into the (user, change_xid, change_seq) index.
+        user_id = self.user.id
+        queryset = queryset.filter(
+            user_id__gte=user_id,
+            user_id__lte=user_id,
+            change_xid__lt=cap,
+        ).filter(RowComparison(
+            ['user_id', 'change_xid', 'change_seq'],
+            '>',
+            [user_id, xid, seq],
+        )).order_by('user_id', 'change_xid', 'change_seq')
+
+        return list(queryset[:self.page_size + 1])
@@ -0,0 +1,71 @@
+"""
+Helpers for resolving tags by name.
+"""
+from core.models import (
+    Container,
+    Tag,
+)
+
+
+class TagResolver:
+    """Resolve tag names to tags for a user, creating missing ones.
+
+    Resolved names are remembered, so a long running import only queries
+    for names it has not seen before.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._cache = {}
+
+    def resolve(self, names):
+        """Return a dict of name to tag for `names`."""
+        names = {name for name in names if name}
+        missing = names - self._cache.keys()
+        if missing:
+            self._fetch(missing)
+            new = [
+                Tag(user=self.user, name=name)
+                for name in sorted(missing - self._cache.keys())
+            ]
+            if new:
+                # Tags created concurrently by another request are skipped
+                # here and picked up by the second fetch.
+                Tag.objects.bulk_create(new, ignore_conflicts=True)
+                self._fetch({tag.name for tag in new})
+
+        return {name: self._cache[name] for name in names}
+
+    def _fetch(self, names):
+        for tag in Tag.objects.filter(user=self.user, name__in=names):
+            self._cache[tag.name] = tag
+
+
+def assign_tags(user, assignments, clear=True):
+    """Set the tags of several containers at once.
+
+    `assignments` maps each saved container to a list of tag names. Names
+    are resolved in bulk and the links are written with a single
+    `bulk_create` on the through table. With `clear`, the containers'
+    existing tags are removed first so the lists replace them.
+    """
+    Through = Container.tags.through
+    if clear:
+        Through.objects.filter(
+            container_id__in=[container.id for container in assignments],
+        ).delete()
+
+    tags = TagResolver(user).resolve(
+        name for names in assignments.values() for name in names
+    )
+    links = {
+        (container.id, tags[name].id)
+        for container, names in assignments.items()
+        for name in names
+        if name in tags
+    }
+    if links:
+        Through.objects.bulk_create([
+            Through(container_id=container_id, tag_id=tag_id)
+            for container_id, tag_id in sorted(links)
+        ])
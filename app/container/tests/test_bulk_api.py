@@ -0,0 +1,241 @@
+"""
+Tests for the bulk container API.
+"""
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Container,
+    Tag,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+BULK_URL = reverse('container:container-bulk')
+
+
+class PublicBulkApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to call the bulk API."""
+        res = self.client.post(BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(TestCase):
+    """Test authenticated bulk API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_update_delete(self):
+        """Test applying a mixed batch of writes."""
+        existing = create_container(user=self.user, bin_id='100')
+        doomed = create_container(user=self.user, bin_id='200')
+        payload = [
+            {'bin_id': '300', 'bin_size': '15m', 'bin_type': 'Compactor'},
+            {'bin_id': '100', 'bin_size': '40m'},
+            {'op': 'delete', 'id': doomed.id},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(
+            [r['status'] for r in results],
+            ['created', 'updated', 'deleted'],
+        )
+        created = Container.objects.get(id=results[0]['id'])
+        self.assertEqual(created.user, self.user)
+        self.assertEqual(created.bin_type, 'Compactor')
+        existing.refresh_from_db()
+        self.assertEqual(existing.bin_size, '40m')
+        self.assertFalse(Container.objects.filter(id=doomed.id).exists())
+
+    def test_bulk_ndjson_body(self):
+        """Test a batch can be sent as newline delimited JSON."""
+        lines = [
+            {'bin_id': str(i), 'bin_size': '32m', 'bin_type': 'Skip'}
+            for i in range(3)
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines)
+
+        res = self.client.post(
+            BULK_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Container.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_invalid_item_rolls_back(self):
+        """Test an invalid item rejects the whole batch."""
+        payload = [
+            {'bin_id': '300', 'bin_size': '15m', 'bin_type': 'Compactor'},
+            {'bin_id': '301'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        results = res.data['results']
+        self.assertEqual(results[0]['status'], 'skipped')
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertIn('bin_size', results[1]['errors'])
+        self.assertFalse(Container.objects.exists())
+
+    def test_bulk_invalid_id(self):
+        """Test IDs that are not integers are rejected per item."""
+        payload = [
+            {'id': [1], 'bin_size': '15m'},
+            {'op': 'delete', 'id': {}},
+            {'id': True},
+            {'id': '1'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        for result in res.data['results']:
+            self.assertEqual(
+                result['errors'], {'id': ['A valid integer is required.']},
+            )
+
+    def test_bulk_other_users_container_not_touched(self):
+        """Test a batch cannot update or delete another user's bins."""
+        other = create_user(email='other@example.com', password='testp123')
+        container = create_container(user=other, bin_id='100')
+        payload = [{'op': 'delete', 'id': container.id}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Container.objects.filter(id=container.id).exists())
+
+    def test_bulk_batch_size_limit(self):
+        """Test batches larger than the limit are rejected."""
+        payload = [{'bin_id': str(i)} for i in range(1001)]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Container.objects.exists())
+
+    def test_bulk_duplicate_bin_id_error(self):
+        """Test a batch cannot leave two containers with one bin ID."""
+        create_container(user=self.user, bin_id='100')
+        second = create_container(user=self.user, bin_id='200')
+        payload = [
+            {'bin_id': '300', 'bin_size': '15m', 'bin_type': 'Compactor'},
+            {'bin_id': '300', 'bin_size': '15m', 'bin_type': 'Compactor'},
+            {'id': second.id, 'bin_id': '100'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        results = res.data['results']
+        self.assertEqual(
+            [r['status'] for r in results],
+            ['skipped', 'error', 'error'],
+        )
+        self.assertEqual(Container.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_missing_bin_id(self):
+        """Test items without an ID or bin ID match no container."""
+        create_container(user=self.user, bin_id='None')
+        payload = [
+            {'op': 'delete'},
+            {'bin_size': '15m', 'bin_type': 'Compactor'},
+            {'op': 'delete', 'bin_id': ['None']},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        for result in res.data['results']:
+            self.assertEqual(result['status'], 'error')
+            self.assertIn('bin_id', result['errors'])
+        self.assertTrue(Container.objects.filter(bin_id='None').exists())
+
+    def test_bulk_swap_bin_ids(self):
+        """Test two containers can swap bin IDs in one batch."""
+        first = create_container(user=self.user, bin_id='100')
+        second = create_container(user=self.user, bin_id='200')
+        payload = [
+            {'id': first.id, 'bin_id': '200'},
+            {'id': second.id, 'bin_id': '100'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.bin_id, second.bin_id), ('200', '100'))
+
+    def test_bulk_rename_into_deleted_bin_id(self):
+        """Test a container can take the bin ID of one deleted with it."""
+        create_container(user=self.user, bin_id='100')
+        second = create_container(user=self.user, bin_id='200')
+        payload = [
+            {'id': second.id, 'bin_id': '100'},
+            {'op': 'delete', 'bin_id': '100'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']],
+            ['updated', 'deleted'],
+        )
+        self.assertEqual(
+            list(Container.objects.values_list('id', 'bin_id')),
+            [(second.id, '100')],
+        )
+
+    def test_bulk_tags(self):
+        """Test tags are set on created and updated containers."""
+        existing = create_container(user=self.user, bin_id='100')
+        existing.tags.add(Tag.objects.create(user=self.user, name='Damaged'))
+        payload = [
+            {
+                'bin_id': '300',
+                'bin_size': '15m',
+                'bin_type': 'Compactor',
+                'tags': [{'name': 'Damaged'}, {'name': 'New'}],
+            },
+            {'bin_id': '100', 'tags': [{'name': 'Repaired'}]},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        created = Container.objects.get(id=res.data['results'][0]['id'])
+        self.assertEqual(
+            sorted(tag.name for tag in created.tags.all()),
+            ['Damaged', 'New'],
+        )
+        self.assertEqual(
+            [tag.name for tag in existing.tags.all()],
+            ['Repaired'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
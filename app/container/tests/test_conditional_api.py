@@ -0,0 +1,217 @@
+"""
+Tests for conditional requests on the container and tag APIs.
+"""
+from django.conf import settings
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Container,
+    Tag,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+CONTAINER_URL = reverse('container:container-list')
+TAGS_URL = reverse('container:tag-list')
+
+
+def detail_url(container_id):
+    """Create and return a container detail URL."""
+    return reverse('container:container-detail', args=[container_id])
+
+
+def tag_detail_url(tag_id):
+    """Create and return a tag detail URL."""
+    return reverse('container:tag-detail', args=[tag_id])
+
+
+class ConditionalContainerApiTests(TestCase):
+    """Test ETag and Last-Modified handling for containers."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    @override_settings(
+        RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'BACKEND': 'none'},
+    )
+    def test_list_not_modified(self):
+        """Test an unchanged list returns 304 from aggregates alone."""
+        create_container(user=self.user)
+        res = self.client.get(CONTAINER_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(2):
+            res = self.client.get(CONTAINER_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_list_etag_changes_on_write(self):
+        """Test updating or deleting a container changes the list ETag."""
+        container = create_container(user=self.user)
+        create_container(user=self.user, bin_id='8608')
+        etag = self.client.get(CONTAINER_URL)['ETag']
+
+        self.client.patch(detail_url(container.id), {'bin_size': '40m'})
+        res = self.client.get(CONTAINER_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        self.client.delete(detail_url(container.id))
+        res = self.client.get(CONTAINER_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_varies_with_query(self):
+        """Test a different page or filter does not match the ETag."""
+        create_container(user=self.user)
+        etag = self.client.get(CONTAINER_URL)['ETag']
+
+        res = self.client.get(
+            CONTAINER_URL,
+            {'bin_type': 'Compactor'},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test an unchanged container returns 304."""
+        container = create_container(user=self.user)
+        res = self.client.get(detail_url(container.id))
+
+        res = self.client.get(
+            detail_url(container.id),
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self):
+        """Test If-Modified-Since uses the Last-Modified header."""
+        container = create_container(user=self.user)
+        res = self.client.get(detail_url(container.id))
+
+        res = self.client.get(
+            detail_url(container.id),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tag_rename_changes_container_etag(self):
+        """Test renaming a nested tag changes the container's ETag."""
+        container = create_container(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Damaged')
+        container.tags.add(tag)
+        etag = self.client.get(detail_url(container.id))['ETag']
+
+        self.client.patch(tag_detail_url(tag.id), {'name': 'Repaired'})
+        res = self.client.get(
+            detail_url(container.id),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Repaired')
+
+    def test_update_if_match(self):
+        """Test an update with a current ETag succeeds."""
+        container = create_container(user=self.user)
+        etag = self.client.get(detail_url(container.id))['ETag']
+
+        res = self.client.patch(
+            detail_url(container.id),
+            {'bin_size': '40m'},
+            HTTP_IF_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        container.refresh_from_db()
+        self.assertEqual(container.bin_size, '40m')
+
+    def test_update_stale_if_match_fails(self):
+        """Test an update with an outdated ETag is rejected."""
+        container = create_container(user=self.user)
+        etag = self.client.get(detail_url(container.id))['ETag']
+        self.client.patch(detail_url(container.id), {'bin_size': '15m'})
+
+        res = self.client.patch(
+            detail_url(container.id),
+            {'bin_size': '40m'},
+            HTTP_IF_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        container.refresh_from_db()
+        self.assertEqual(container.bin_size, '15m')
+
+    def test_delete_stale_if_match_fails(self):
+        """Test a delete with an outdated ETag is rejected."""
+        container = create_container(user=self.user)
+
+        res = self.client.delete(
+            detail_url(container.id),
+            HTTP_IF_MATCH='"stale"',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Container.objects.filter(id=container.id).exists())
+
+    def test_bulk_update_changes_updated_at(self):
+        """Test the bulk endpoint bumps updated_at on updates."""
+        container = create_container(user=self.user)
+        original = container.updated_at
+
+        self.client.post(
+            reverse('container:container-bulk'),
+            [{'id': container.id, 'bin_size': '40m'}],
+            format='json',
+        )
+
+        container.refresh_from_db()
+        self.assertGreater(container.updated_at, original)
+
+
+class ConditionalTagApiTests(TestCase):
+    """Test ETag handling for tags."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        """Test an unchanged tag list returns 304."""
+        Tag.objects.create(user=self.user, name='Damaged')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_stale_if_match_fails(self):
+        """Test updating a tag with an outdated ETag is rejected."""
+        tag = Tag.objects.create(user=self.user, name='Damaged')
+
+        res = self.client.patch(
+            tag_detail_url(tag.id),
+            {'name': 'Repaired'},
+            HTTP_IF_MATCH='"stale"',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Damaged')
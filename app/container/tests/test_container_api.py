@@ -1,16 +1,25 @@
 """
 Test for container APIs.
 """
+from itertools import groupby
+from unittest.mock import patch
 
-from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Container
+from core.models import (
+    Container,
+    Tag,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
 
+from container.pagination import KeysetCursorPagination
 from container.serializers import (
     ContainerSerializer,
     ContainerDetailSerializer,
@@ -25,24 +34,6 @@ def detail_url(container_id):
     return reverse('container:container-detail', args=[container_id])
 
 
-def create_container(user, **params):
-    """Create and return a sample container."""
-    defaults = {
-        'bin_id': '8607',
-        'bin_size': '32m',
-        'bin_type': 'Open Skip',
-    }
-    defaults.update(params)
-
-    container = Container.objects.create(user=user, **defaults)
-    return container
-
-
-def create_user(**params):
-    """Create and return a new user."""
-    return get_user_model().objects.create_user(**params)
-
-
 class PublicContainerApiTests(TestCase):
     """Test unauthenticated API requests."""
     def setUp(self):
@@ -65,15 +56,15 @@ class PrivateContainerApiTests(TestCase):
 
     def test_retrieving_containers(self):
         """Test retrieving a list of containers."""
-        create_container(user=self.user)
-        create_container(user=self.user)
+        create_container(user=self.user, bin_id='8607')
+        create_container(user=self.user, bin_id='8608')
 
         res = self.client.get(CONTAINER_URL)
 
         containers = Container.objects.all().order_by('-id')
         serializer = ContainerSerializer(containers, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_container_list_limited_to_user(self):
         """Test list of bins is limited to authenticated users."""
@@ -83,10 +74,10 @@ class PrivateContainerApiTests(TestCase):
 
         res = self.client.get(CONTAINER_URL)
 
-        containers = Container.objects.filter(user=self.user)
+        containers = Container.objects.filter(user=self.user).order_by('-id')
         serializer = ContainerSerializer(containers, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_container_detail(self):
         """Test get container detail."""
@@ -187,3 +178,370 @@ class PrivateContainerApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
         self.assertTrue(Container.objects.filter(id=container.id).exists())
+
+    def test_list_paginated_with_cursor(self):
+        """Test the container list is paginated with next/prev cursors."""
+        containers = [
+            create_container(user=self.user, bin_id=str(i)) for i in range(5)
+        ]
+        ids = [c.id for c in reversed(containers)]
+
+        res = self.client.get(CONTAINER_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in res.data['results']], ids[:2])
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual([c['id'] for c in res.data['results']], ids[2:4])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual([c['id'] for c in res.data['results']], ids[4:])
+        self.assertIsNone(res.data['next'])
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual([c['id'] for c in res.data['results']], ids[2:4])
+
+    def test_list_ordering_by_other_field(self):
+        """Test paginating by a non-unique sort key keeps ties stable."""
+        bin_types = ['Skip', 'Compactor', 'Skip', 'Unipack', 'Skip']
+        for i, bin_type in enumerate(bin_types):
+            create_container(user=self.user, bin_id=str(i), bin_type=bin_type)
+        expected = list(
+            Container.objects.order_by('bin_type', 'id')
+            .values_list('id', flat=True)
+        )
+
+        seen = []
+        url = f'{CONTAINER_URL}?ordering=bin_type&page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(c['id'] for c in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_list_ordering_by_lookup_groups(self):
+        """Test bin types and sizes sort by lookup ID, grouping values."""
+        for i, (bin_type, bin_size) in enumerate([
+            ('Skip', '8m'),
+            ('Compactor', '40m'),
+            ('Skip', '12m'),
+            ('Bin', '8m'),
+        ]):
+            create_container(
+                user=self.user,
+                bin_id=str(i),
+                bin_type=bin_type,
+                bin_size=bin_size,
+            )
+        for field in ['bin_type', '-bin_size']:
+            expected = list(Container.objects.order_by(
+                field, '-id' if field.startswith('-') else 'id',
+            ))
+            seen = []
+            url = f'{CONTAINER_URL}?ordering={field}&page_size=2'
+            while url:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                seen.extend(c['id'] for c in res.data['results'])
+                url = res.data['next']
+
+            self.assertEqual(seen, [c.id for c in expected])
+            groups = [name for name, _ in groupby(
+                getattr(c, field.lstrip('-')) for c in expected
+            )]
+            self.assertEqual(len(groups), len(set(groups)))
+
+    def test_list_page_size_capped(self):
+        """Test the requested page size is capped by the server."""
+        with patch.object(KeysetCursorPagination, 'max_page_size', 2):
+            for i in range(3):
+                create_container(user=self.user, bin_id=str(i))
+
+            res = self.client.get(CONTAINER_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_list_invalid_cursor(self):
+        """Test an invalid cursor returns a 404."""
+        res = self.client.get(CONTAINER_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_duplicate_bin_id_error(self):
+        """Test creating a container with a used bin ID fails."""
+        create_container(user=self.user, bin_id='8607')
+        payload = {
+            'bin_id': '8607',
+            'bin_size': '32m',
+            'bin_type': 'Open Skip',
+        }
+
+        res = self.client.post(CONTAINER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bin_id', res.data)
+        self.assertEqual(Container.objects.filter(user=self.user).count(), 1)
+
+    def test_same_bin_id_for_different_users(self):
+        """Test bin IDs only need to be unique per user."""
+        other_user = create_user(email='other@example.com', password='pass123')
+        create_container(user=other_user, bin_id='8607')
+        payload = {
+            'bin_id': '8607',
+            'bin_size': '32m',
+            'bin_type': 'Open Skip',
+        }
+
+        res = self.client.post(CONTAINER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_container_with_tags(self):
+        """Test creating a container with new and existing tags."""
+        damaged = Tag.objects.create(user=self.user, name='Damaged')
+        payload = {
+            'bin_id': '8607',
+            'bin_size': '32m',
+            'bin_type': 'Open Skip',
+            'tags': [{'name': 'Damaged'}, {'name': 'In For Repairs'}],
+        }
+
+        res = self.client.post(CONTAINER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        container = Container.objects.get(id=res.data['id'])
+        self.assertEqual(
+            sorted(tag.name for tag in container.tags.all()),
+            ['Damaged', 'In For Repairs'],
+        )
+        self.assertIn(damaged, container.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_update_container_replaces_tags(self):
+        """Test updating tags replaces the container's tags."""
+        container = create_container(user=self.user)
+        container.tags.add(Tag.objects.create(user=self.user, name='Damaged'))
+
+        payload = {'tags': [{'name': 'Repaired'}]}
+        res = self.client.patch(
+            detail_url(container.id),
+            payload,
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['name'] for t in res.data['tags']], ['Repaired'])
+        self.assertEqual(
+            [tag.name for tag in container.tags.all()],
+            ['Repaired'],
+        )
+
+    def test_clear_container_tags(self):
+        """Test sending an empty list removes every tag."""
+        container = create_container(user=self.user)
+        container.tags.add(Tag.objects.create(user=self.user, name='Damaged'))
+
+        res = self.client.patch(
+            detail_url(container.id),
+            {'tags': []},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(container.tags.count(), 0)
+        self.assertTrue(Tag.objects.filter(name='Damaged').exists())
+
+    def test_list_tags_constant_queries(self):
+        """Test listing 1,000 tagged containers uses a fixed query count."""
+        tags = Tag.objects.bulk_create([
+            Tag(user=self.user, name=name) for name in ('A', 'B', 'C')
+        ])
+        containers = Container.objects.bulk_create([
+            Container(
+                user=self.user,
+                bin_id=str(i),
+                bin_size='32m',
+                bin_type='Open Skip',
+            )
+            for i in range(1000)
+        ])
+        Through = Container.tags.through
+        Through.objects.bulk_create([
+            Through(container_id=container.id, tag_id=tag.id)
+            for container in containers
+            for tag in tags
+        ])
+
+        # Two aggregates for the ETag, the page and the tag prefetch.
+        with self.assertNumQueries(4):
+            res = self.client.get(CONTAINER_URL, {'page_size': 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1000)
+        self.assertEqual(len(res.data['results'][0]['tags']), 3)
+
+    def test_filter_by_tags(self):
+        """Test returning containers with any of the given tags."""
+        c1 = create_container(user=self.user, bin_id='1')
+        c2 = create_container(user=self.user, bin_id='2')
+        c3 = create_container(user=self.user, bin_id='3')
+        tag1 = Tag.objects.create(user=self.user, name='Damaged')
+        tag2 = Tag.objects.create(user=self.user, name='Repaired')
+        c1.tags.add(tag1, tag2)
+        c2.tags.add(tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(CONTAINER_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [c['id'] for c in res.data['results']]
+        self.assertEqual(ids, [c2.id, c1.id])
+        self.assertNotIn(c3.id, ids)
+
+    def test_filter_by_invalid_tags(self):
+        """Test non-numeric tag IDs return an error."""
+        res = self.client.get(CONTAINER_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_filter_by_bin_type_and_size(self):
+        """Test filtering containers by bin type and bin size."""
+        c1 = create_container(
+            user=self.user, bin_id='1', bin_type='Compactor', bin_size='15m',
+        )
+        create_container(
+            user=self.user, bin_id='2', bin_type='Compactor', bin_size='32m',
+        )
+        create_container(
+            user=self.user, bin_id='3', bin_type='Unipack', bin_size='15m',
+        )
+
+        res = self.client.get(
+            CONTAINER_URL,
+            {'bin_type': 'Compactor', 'bin_size': '15m'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in res.data['results']], [c1.id])
+
+    def test_filtered_list_paginates(self):
+        """Test paging through a filtered list returns every match once."""
+        expected = []
+        for i in range(6):
+            bin_type = 'Compactor' if i % 2 else 'Unipack'
+            container = create_container(
+                user=self.user,
+                bin_id=str(i),
+                bin_type=bin_type,
+            )
+            if bin_type == 'Compactor':
+                expected.insert(0, container.id)
+
+        seen = []
+        url = f'{CONTAINER_URL}?bin_type=Compactor&page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(c['id'] for c in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_search_description_words(self):
+        """Test searching matches stemmed words in the description."""
+        c1 = create_container(
+            user=self.user,
+            bin_id='1',
+            description='Lid damaged during collection',
+        )
+        create_container(user=self.user, bin_id='2', description='Clean')
+
+        res = self.client.get(CONTAINER_URL, {'search': 'damage'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in res.data['results']], [c1.id])
+
+    def test_search_partial_bin_id(self):
+        """Test searching matches part of a bin ID."""
+        c1 = create_container(user=self.user, bin_id='SKIP-00412')
+        create_container(user=self.user, bin_id='SKIP-00999')
+
+        res = self.client.get(CONTAINER_URL, {'search': '0041'})
+
+        self.assertEqual([c['id'] for c in res.data['results']], [c1.id])
+
+    def test_search_ranks_bin_id_first(self):
+        """Test a bin ID match ranks above a description match."""
+        in_description = create_container(
+            user=self.user,
+            bin_id='1',
+            description='Swapped with 8607 last week',
+        )
+        by_bin_id = create_container(user=self.user, bin_id='8607')
+
+        res = self.client.get(CONTAINER_URL, {'search': '8607'})
+
+        self.assertEqual(
+            [c['id'] for c in res.data['results']],
+            [by_bin_id.id, in_description.id],
+        )
+
+    def test_search_vector_updated_on_save(self):
+        """Test editing a description updates search results."""
+        container = create_container(user=self.user, description='Clean')
+
+        res = self.client.patch(
+            detail_url(container.id),
+            {'description': 'Wheel broken'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(CONTAINER_URL, {'search': 'broken'})
+
+        self.assertEqual(
+            [c['id'] for c in res.data['results']],
+            [container.id],
+        )
+
+    def test_search_vector_set_by_bulk_create(self):
+        """Test containers created in bulk are searchable."""
+        Container.objects.bulk_create([
+            Container(
+                user=self.user,
+                bin_id=str(i),
+                bin_size='32m',
+                bin_type='Skip',
+                description='Needs repainting',
+            )
+            for i in range(3)
+        ])
+
+        res = self.client.get(CONTAINER_URL, {'search': 'repaint'})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_search_paginates(self):
+        """Test paging through ranked results returns every match once."""
+        for i in range(5):
+            create_container(
+                user=self.user,
+                bin_id=str(i),
+                description=' '.join(['rust'] * (i + 1)),
+            )
+        expected = list(
+            Container.objects.order_by('-id').values_list('id', flat=True)
+        )
+
+        seen = []
+        url = f'{CONTAINER_URL}?search=rust&page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(c['id'] for c in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, expected)
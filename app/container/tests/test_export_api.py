@@ -0,0 +1,195 @@
+"""
+Tests for the container export API.
+"""
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.db import connections
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app.asgi import application
+
+from core.models import (
+    Container,
+    Tag,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+from container.export import iter_export_rows
+
+
+EXPORT_URL = reverse('container:container-export')
+
+
+def read_stream(res):
+    """Return the body of a streaming response as text."""
+    return b''.join(res.streaming_content).decode()
+
+
+class PublicExportApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to export containers."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(TestCase):
+    """Test authenticated export API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+        self.container = create_container(
+            user=self.user,
+            bin_id='100',
+            description='Behind the depot',
+        )
+        tag1 = Tag.objects.create(user=self.user, name='Damaged')
+        tag2 = Tag.objects.create(user=self.user, name='Awaiting Pickup')
+        self.container.tags.add(tag1, tag2)
+        create_container(user=self.user, bin_id='101')
+        other = create_user(email='other@example.com', password='testp123')
+        create_container(user=other, bin_id='999')
+
+    def test_export_ndjson(self):
+        """Test exporting the user's containers as NDJSON."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in read_stream(res).splitlines()]
+        self.assertEqual([row['bin_id'] for row in rows], ['100', '101'])
+        self.assertEqual(rows[0]['description'], 'Behind the depot')
+        self.assertEqual(rows[0]['tags'], ['Awaiting Pickup', 'Damaged'])
+        self.assertEqual(rows[1]['tags'], [])
+
+    def test_export_csv(self):
+        """Test exporting the user's containers as CSV."""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(read_stream(res))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['id'], str(self.container.id))
+        self.assertEqual(rows[0]['tags'], 'Awaiting Pickup|Damaged')
+
+    def test_export_rows_across_chunks(self):
+        """Test tags are attached correctly when rows span chunks."""
+        queryset = Container.objects.filter(user=self.user)
+
+        rows = list(iter_export_rows(queryset, chunk_size=1))
+
+        self.assertEqual([row['bin_id'] for row in rows], ['100', '101'])
+        self.assertEqual(len(rows[0]['tags']), 2)
+
+    def test_export_reads_in_batches(self):
+        """Test each batch is a separate bounded query."""
+        queryset = Container.objects.filter(user=self.user)
+
+        # One query for the containers and one for the tags per batch,
+        # then one finding nothing after the last ID.
+        with self.assertNumQueries(5):
+            rows = list(iter_export_rows(queryset, chunk_size=1))
+
+        self.assertEqual(len(rows), 2)
+
+
+class AsgiExportApiTests(TransactionTestCase):
+    """Test exporting through the ASGI application.
+
+    Django 3.2 reads streaming responses on the event loop, where the
+    ORM cannot run. The request is served on other threads, so the data
+    has to be committed.
+    """
+
+    def setUp(self):
+        # Let the handler close its connections after the request, so the
+        # test database can be dropped.
+        for alias in connections:
+            patcher = patch.dict(
+                connections[alias].settings_dict,
+                {'CONN_MAX_AGE': 0},
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.token = Token.objects.create(user=self.user)
+        for i in range(3):
+            create_container(user=self.user, bin_id=str(i))
+
+    def get(self, accept):
+        """Serve an export with `app.asgi` and return the response."""
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': EXPORT_URL,
+            'raw_path': EXPORT_URL.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'accept', accept.encode()),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+            ],
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(application)(scope, receive, send)
+
+        status_code = messages[0]['status']
+        body = b''.join(
+            message.get('body', b'') for message in messages[1:]
+        )
+        return status_code, body.decode()
+
+    def test_export_ndjson(self):
+        """Test the whole export is sent under ASGI."""
+        status_code, body = self.get('application/x-ndjson')
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(json.loads(line)['bin_id'] for line in body.splitlines()),
+            ['0', '1', '2'],
+        )
+
+    def test_export_csv(self):
+        """Test the CSV export is sent under ASGI."""
+        status_code, body = self.get('text/csv')
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(len(list(csv.reader(io.StringIO(body)))), 4)
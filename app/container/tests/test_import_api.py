@@ -0,0 +1,176 @@
+"""
+Tests for importing containers.
+"""
+import io
+import json
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Container,
+    Tag,
+)
+
+from container.importer import (
+    ContainerImporter,
+    read_csv,
+)
+
+
+IMPORT_URL = reverse('container:container-import')
+
+CSV_BODY = (
+    'bin_id,bin_size,bin_type,description,tags\n'
+    '100,32m,Open Skip,"Tab\tand\\\\slash",Damaged|Awaiting Pickup\n'
+    '101,15m,Compactor,,Damaged\n'
+    '102,,Compactor,,\n'
+)
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class PublicImportApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to import containers."""
+        res = self.client.post(IMPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateImportApiTests(TestCase):
+    """Test authenticated import API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def test_import_csv(self):
+        """Test importing containers and tags from a CSV upload."""
+        Tag.objects.create(user=self.user, name='Damaged')
+        upload = SimpleUploadedFile('bins.csv', CSV_BODY.encode())
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['rows'], 3)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['error_count'], 1)
+        self.assertEqual(res.data['errors'][0]['line'], 4)
+        self.assertIn('bin_size', res.data['errors'][0]['errors'])
+
+        container = Container.objects.get(user=self.user, bin_id='100')
+        self.assertEqual(container.description, 'Tab\tand\\\\slash')
+        self.assertEqual(
+            sorted(container.tags.values_list('name', flat=True)),
+            ['Awaiting Pickup', 'Damaged'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_ndjson(self):
+        """Test importing containers from an NDJSON upload."""
+        lines = [
+            json.dumps({'bin_id': '1', 'bin_size': '8m', 'bin_type': 'Skip'}),
+            'not json',
+            json.dumps({'bin_id': '2', 'bin_size': '8m', 'bin_type': 'Skip',
+                        'tags': ['Damaged']}),
+        ]
+        upload = SimpleUploadedFile(
+            'bins.ndjson',
+            '\n'.join(lines).encode(),
+        )
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['errors'][0]['line'], 2)
+        container = Container.objects.get(user=self.user, bin_id='2')
+        self.assertEqual(container.tags.get().name, 'Damaged')
+
+    def test_import_unknown_format(self):
+        """Test an upload with an unknown format is rejected."""
+        upload = SimpleUploadedFile('bins.txt', b'')
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ContainerImporterTests(TestCase):
+    """Test the container importer."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='testp123')
+
+    def test_import_chunks_without_copy(self):
+        """Test importing in chunks with bulk_create."""
+        importer = ContainerImporter(self.user, chunk_size=1, use_copy=False)
+        seen = []
+        importer.progress = lambda result: seen.append(result.created)
+
+        result = importer.run(read_csv(io.StringIO(CSV_BODY)))
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(seen, [1, 2])
+        container = Container.objects.get(user=self.user, bin_id='100')
+        self.assertEqual(container.tags.count(), 2)
+
+    def test_import_skips_existing_bin_ids(self):
+        """Test rows with a bin ID that is already used are reported."""
+        Container.objects.create(
+            user=self.user,
+            bin_id='101',
+            bin_size='8m',
+            bin_type='Skip',
+        )
+        body = CSV_BODY + '100,8m,Skip,,\n'
+        importer = ContainerImporter(self.user)
+
+        result = importer.run(read_csv(io.StringIO(body)))
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            sorted(error['line'] for error in result.errors),
+            [3, 4, 5],
+        )
+        self.assertEqual(Container.objects.filter(user=self.user).count(), 2)
+
+
+class ImportCommandTests(TestCase):
+    """Test the import_containers command."""
+
+    def test_import_containers_command(self):
+        """Test importing a file from the command line."""
+        user = create_user(email='user@example.com', password='testp123')
+        out = io.StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write(CSV_BODY)
+            f.flush()
+
+            call_command(
+                'import_containers',
+                f.name,
+                user=user.email,
+                stdout=out,
+                stderr=io.StringIO(),
+            )
+
+        self.assertIn('Imported 2 of 3 rows', out.getvalue())
+        self.assertEqual(Container.objects.filter(user=user).count(), 2)
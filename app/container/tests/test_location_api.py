@@ -0,0 +1,247 @@
+"""
+Tests for container locations and the near and bbox filters.
+"""
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.geo import (
+    radius_boxes,
+    split_box,
+)
+from core.models import Container
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+CONTAINER_URL = reverse('container:container-list')
+IMPORT_URL = reverse('container:container-import')
+
+
+def detail_url(container_id):
+    """Create and return a container detail URL."""
+    return reverse('container:container-detail', args=[container_id])
+
+
+def bin_ids(res):
+    """Return the bin IDs of a list response, in order."""
+    return [container['bin_id'] for container in res.data['results']]
+
+
+class BoxTests(TestCase):
+    """Test the boxes that bound radius and bounding box filters."""
+
+    def test_split_box_across_antimeridian(self):
+        """Test a box crossing 180 degrees is split in two."""
+        self.assertEqual(
+            split_box(170, -10, -170, 10),
+            [(170, -10, 180.0, 10), (-180.0, -10, -170, 10)],
+        )
+        self.assertEqual(
+            split_box(175, -10, 185, 10),
+            [(175, -10, 180.0, 10), (-180.0, -10, -175, 10)],
+        )
+
+    def test_radius_box_covers_circle(self):
+        """Test the box is as wide as the circle at its widest."""
+        [(west, south, east, north)] = radius_boxes(60, 10, 1000)
+
+        self.assertAlmostEqual(north - 60, 0.008993, places=5)
+        self.assertAlmostEqual(east - 10, 0.017986, places=5)
+        self.assertAlmostEqual(10 - west, east - 10)
+
+    def test_radius_box_around_pole(self):
+        """Test a circle around a pole covers every longitude."""
+        [(west, south, east, north)] = radius_boxes(89.999, 0, 5000)
+
+        self.assertEqual((west, east, north), (-180.0, 180.0, 90.0))
+        self.assertAlmostEqual(south, 89.954, places=3)
+
+
+class LocationApiTests(TestCase):
+    """Test authenticated location requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def test_create_with_location(self):
+        """Test a location is saved and returned."""
+        payload = {
+            'bin_id': '1',
+            'bin_size': '6m',
+            'bin_type': 'Skip',
+            'latitude': 51.5074,
+            'longitude': -0.1278,
+        }
+
+        res = self.client.post(CONTAINER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        container = Container.objects.get(id=res.data['id'])
+        self.assertEqual(container.latitude, 51.5074)
+        self.assertEqual(container.longitude, -0.1278)
+
+    def test_location_set_together(self):
+        """Test latitude and longitude are given or cleared together."""
+        container = create_container(
+            self.user, latitude=51.5074, longitude=-0.1278,
+        )
+
+        res = self.client.patch(detail_url(container.id), {'latitude': ''})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.patch(
+            detail_url(container.id),
+            {'latitude': None, 'longitude': None},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        container.refresh_from_db()
+        self.assertIsNone(container.latitude)
+
+    def test_location_out_of_range(self):
+        """Test latitudes past the poles are rejected."""
+        payload = {
+            'bin_id': '1',
+            'bin_size': '6m',
+            'bin_type': 'Skip',
+            'latitude': 91,
+            'longitude': 0,
+        }
+
+        res = self.client.post(CONTAINER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('latitude', res.data)
+
+    def test_import_locations(self):
+        """Test CSV imports read locations and empty cells as none."""
+        upload = SimpleUploadedFile('bins.csv', (
+            'bin_id,bin_size,bin_type,description,latitude,longitude,tags\n'
+            '1,32m,Open Skip,,51.5074,-0.1278,\n'
+            '2,15m,Compactor,,,,\n'
+        ).encode())
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(
+            list(Container.objects.order_by('bin_id')
+                 .values_list('latitude', 'longitude')),
+            [(51.5074, -0.1278), (None, None)],
+        )
+
+    def test_near(self):
+        """Test containers within the radius are returned nearest first."""
+        # About 110 m, 330 m and 1.1 km north of the point.
+        create_container(self.user, bin_id='far', latitude=51.5174,
+                         longitude=-0.1278)
+        create_container(self.user, bin_id='near', latitude=51.5084,
+                         longitude=-0.1278)
+        create_container(self.user, bin_id='mid', latitude=51.5104,
+                         longitude=-0.1278)
+        create_container(self.user, bin_id='nowhere')
+        other = create_user(email='other@example.com', password='testp123')
+        create_container(other, bin_id='other', latitude=51.5074,
+                         longitude=-0.1278)
+
+        res = self.client.get(
+            CONTAINER_URL, {'near': '51.5074,-0.1278', 'radius': '500'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(bin_ids(res), ['near', 'mid'])
+
+    def test_near_uses_exact_distance(self):
+        """Test containers in the corner of the bounding box are left out."""
+        # Inside the box around a 500 m circle, but 700 m away.
+        create_container(self.user, bin_id='corner', latitude=51.5114,
+                         longitude=-0.1213)
+
+        res = self.client.get(
+            CONTAINER_URL, {'near': '51.5074,-0.1278', 'radius': '500'},
+        )
+
+        self.assertEqual(bin_ids(res), [])
+
+    def test_near_across_antimeridian(self):
+        """Test a radius crossing 180 degrees finds both sides."""
+        create_container(self.user, bin_id='east', latitude=0,
+                         longitude=179.999)
+        create_container(self.user, bin_id='west', latitude=0,
+                         longitude=-179.998)
+
+        res = self.client.get(
+            CONTAINER_URL, {'near': '0,179.9995', 'radius': '500'},
+        )
+
+        self.assertEqual(bin_ids(res), ['east', 'west'])
+
+    def test_near_pages_by_distance(self):
+        """Test following the next link continues by distance."""
+        for i in range(5):
+            create_container(self.user, bin_id=str(i),
+                             latitude=51.5074 + 0.0005 * (4 - i),
+                             longitude=-0.1278)
+
+        res = self.client.get(CONTAINER_URL, {
+            'near': '51.5074,-0.1278',
+            'radius': '1000',
+            'page_size': 2,
+        })
+        ids = bin_ids(res)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(bin_ids(res))
+
+        self.assertEqual(ids, ['4', '3', '2', '1', '0'])
+
+    def test_bbox(self):
+        """Test only containers inside the box are returned."""
+        create_container(self.user, bin_id='inside', latitude=51.5,
+                         longitude=-0.1)
+        create_container(self.user, bin_id='outside', latitude=52.5,
+                         longitude=-0.1)
+
+        res = self.client.get(CONTAINER_URL, {'bbox': '-0.2,51.4,0,51.6'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(bin_ids(res), ['inside'])
+
+    def test_bbox_across_antimeridian(self):
+        """Test a box whose west edge is east of its east edge."""
+        create_container(self.user, bin_id='fiji', latitude=-17.7,
+                         longitude=178.1)
+        create_container(self.user, bin_id='samoa', latitude=-13.8,
+                         longitude=-171.8)
+        create_container(self.user, bin_id='perth', latitude=-31.9,
+                         longitude=115.9)
+
+        res = self.client.get(CONTAINER_URL, {'bbox': '170,-20,-170,-10'})
+
+        self.assertEqual(bin_ids(res), ['samoa', 'fiji'])
+
+    def test_invalid_params(self):
+        """Test malformed locations are rejected."""
+        for params, field in [
+            ({'near': '51.5', 'radius': '500'}, 'near'),
+            ({'near': '91,0', 'radius': '500'}, 'near'),
+            ({'near': '51.5,0'}, 'radius'),
+            ({'near': '51.5,0', 'radius': '0'}, 'radius'),
+            ({'near': '51.5,0', 'radius': '1000000'}, 'radius'),
+            ({'near': '51.5,0', 'radius': 'nan'}, 'radius'),
+            ({'bbox': '0,0,1'}, 'bbox'),
+            ({'bbox': '0,10,1,5'}, 'bbox'),
+        ]:
+            with self.subTest(params=params):
+                res = self.client.get(CONTAINER_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(field, res.data)
@@ -0,0 +1,532 @@
+"""
+Tests for the sensor readings ingestion API.
+"""
+import datetime
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import (
+    IntegrityError,
+    connection,
+    transaction,
+)
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from container.readings import reading_partitions
+from core.models import (
+    Container,
+    Reading,
+    ReadingRollup,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+READINGS_URL = reverse('container:container-ingest')
+
+
+def series_url(container_id):
+    """Create and return a container readings URL."""
+    return reverse('container:container-readings', args=[container_id])
+
+
+def reading(bin_id, minutes_ago=0, fill_level=50, **params):
+    """Return a reading payload taken `minutes_ago`."""
+    recorded_at = timezone.now() - datetime.timedelta(minutes=minutes_ago)
+    return dict(
+        bin_id=bin_id,
+        recorded_at=recorded_at.isoformat(),
+        fill_level=fill_level,
+        **params,
+    )
+
+
+def partitions():
+    """Return the names of the readings partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = 'core_reading'::regclass ORDER BY 1"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PublicReadingsApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to send readings."""
+        res = self.client.post(READINGS_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateReadingsApiTests(TestCase):
+    """Test authenticated readings requests."""
+
+    def setUp(self):
+        reading_partitions.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def ingest(self, payload):
+        res = self.client.post(READINGS_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_store_readings(self):
+        """Test readings are stored against their containers."""
+        container = create_container(self.user, bin_id='1')
+        create_container(self.user, bin_id='2')
+        payload = [
+            reading('1', minutes_ago=10, fill_level=20, temperature=11.5),
+            reading(1, minutes_ago=5, fill_level=30),
+            reading('2', fill_level=95.5),
+        ]
+
+        data = self.ingest(payload)
+
+        self.assertEqual(data, {
+            'received': 3,
+            'created': 3,
+            'duplicates': 0,
+            'error_count': 0,
+            'errors': [],
+        })
+        self.assertEqual(
+            list(container.readings.order_by('recorded_at')
+                 .values_list('fill_level', 'temperature')),
+            [(20.0, 11.5), (30.0, None)],
+        )
+
+    def test_unknown_bin_ids(self):
+        """Test readings for missing or other users' bins are rejected."""
+        create_container(self.user, bin_id='1')
+        other = create_user(email='other@example.com', password='testp123')
+        create_container(other, bin_id='2')
+
+        data = self.ingest([reading('1'), reading('2'), reading('3')])
+
+        self.assertEqual(data['created'], 1)
+        self.assertEqual(data['error_count'], 2)
+        self.assertEqual(
+            [error['index'] for error in data['errors']], [1, 2],
+        )
+        self.assertEqual(
+            data['errors'][0]['errors'], {'bin_id': ['Container not found.']},
+        )
+        self.assertFalse(Reading.objects.filter(container__user=other))
+
+    def test_retried_after_integrity_error(self):
+        """Test a batch is tried again once after a foreign key error."""
+        create_container(self.user, bin_id='1')
+        self.ingest([reading('1', minutes_ago=5)])
+
+        with patch.object(
+            reading_partitions,
+            'ensure',
+            side_effect=[IntegrityError, None],
+        ):
+            data = self.ingest([reading('1')])
+
+        self.assertEqual(data['created'], 1)
+
+    def test_invalid_readings(self):
+        """Test invalid readings are reported by index and others kept."""
+        create_container(self.user, bin_id='1')
+        year_ago = timezone.now() - datetime.timedelta(days=400)
+        payload = [
+            reading('1', minutes_ago=1),
+            reading('1', fill_level=101),
+            reading('1', fill_level='full'),
+            {'bin_id': '1', 'recorded_at': 'yesterday', 'fill_level': 5},
+            {'bin_id': '1', 'recorded_at': year_ago.isoformat(),
+             'fill_level': 5},
+            {'recorded_at': timezone.now().isoformat()},
+            reading('1', temperature=True),
+            'reading',
+        ]
+
+        data = self.ingest(payload)
+
+        self.assertEqual(data['created'], 1)
+        self.assertEqual(data['error_count'], 7)
+        errors = {error['index']: error['errors'] for error in data['errors']}
+        self.assertEqual(
+            errors[1], {'fill_level': ['Must be between 0 and 100.']},
+        )
+        self.assertEqual(errors[2], {'fill_level': ['Expected a number.']})
+        self.assertIn('recorded_at', errors[3])
+        self.assertIn('recorded_at', errors[4])
+        self.assertEqual(set(errors[5]), {'bin_id', 'fill_level'})
+        self.assertIn('temperature', errors[6])
+        self.assertIn('non_field_errors', errors[7])
+
+    def test_naive_times_are_utc(self):
+        """Test a time without an offset is stored as UTC."""
+        container = create_container(self.user, bin_id='1')
+        recorded_at = timezone.now().replace(microsecond=0)
+
+        self.ingest([{
+            'bin_id': '1',
+            'recorded_at': recorded_at.strftime('%Y-%m-%dT%H:%M:%S'),
+            'fill_level': 10,
+        }])
+
+        self.assertEqual(container.readings.get().recorded_at, recorded_at)
+
+    def test_duplicates_ignored(self):
+        """Test sending a batch again stores nothing new."""
+        container = create_container(self.user, bin_id='1')
+        payload = [reading('1', minutes_ago=i) for i in range(3)]
+        self.ingest(payload)
+
+        data = self.ingest(payload + [reading('1', minutes_ago=10)])
+
+        self.assertEqual(data['created'], 1)
+        self.assertEqual(data['duplicates'], 3)
+        self.assertEqual(container.readings.count(), 4)
+
+    def test_expected_list(self):
+        """Test a body that is not a list is rejected."""
+        res = self.client.post(READINGS_URL, reading('1'), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_too_many_readings(self):
+        """Test a batch over the limit is rejected."""
+        payload = [reading('1')] * 5001
+
+        res = self.client.post(READINGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reading.objects.exists())
+
+    def test_ndjson_body(self):
+        """Test readings can be sent as newline delimited JSON."""
+        container = create_container(self.user, bin_id='1')
+        body = '\n'.join(
+            json.dumps(reading('1', minutes_ago=i)) for i in range(3)
+        )
+
+        res = self.client.post(
+            READINGS_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(container.readings.count(), 3)
+
+    def test_partition_per_month(self):
+        """Test readings are stored in a partition per month."""
+        create_container(self.user, bin_id='1')
+        now = timezone.now()
+        last_month = now.replace(day=1) - datetime.timedelta(days=1)
+
+        self.ingest([
+            reading('1'),
+            {'bin_id': '1', 'recorded_at': last_month.isoformat(),
+             'fill_level': 5},
+        ])
+
+        self.assertEqual(partitions(), [
+            f'core_reading_p{last_month:%Y_%m}',
+            f'core_reading_p{now:%Y_%m}',
+        ])
+
+    def test_delete_container_deletes_readings(self):
+        """Test a container's readings go with it."""
+        container = create_container(self.user, bin_id='1')
+        self.ingest([reading('1')])
+
+        container.delete()
+
+        self.assertFalse(Reading.objects.exists())
+
+
+class ReadingSeriesApiTests(TestCase):
+    """Test charting a container's readings."""
+
+    def setUp(self):
+        reading_partitions.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+        self.container = create_container(self.user, bin_id='1')
+        # 10:00 UTC two days ago, so the readings below share a day.
+        self.base = timezone.now().replace(
+            hour=10, minute=0, second=0, microsecond=0,
+        ) - datetime.timedelta(days=2)
+
+    def at(self, minutes):
+        return (self.base + datetime.timedelta(minutes=minutes)).isoformat()
+
+    def ingest(self, payload):
+        res = self.client.post(READINGS_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def ingest_sample(self):
+        self.ingest([
+            {'bin_id': '1', 'recorded_at': self.at(0), 'fill_level': 10,
+             'temperature': 10},
+            {'bin_id': '1', 'recorded_at': self.at(10), 'fill_level': 30},
+            {'bin_id': '1', 'recorded_at': self.at(70), 'fill_level': 50,
+             'temperature': 20},
+        ])
+
+    def series(self, **params):
+        res = self.client.get(series_url(self.container.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_hourly_buckets(self):
+        """Test readings are summarised per hour."""
+        self.ingest_sample()
+
+        data = self.series(**{
+            'from': self.at(0), 'to': self.at(180), 'bucket': '1h',
+        })
+
+        self.assertEqual(data['bucket'], '1h')
+        self.assertEqual(data['results'], [
+            {
+                'time': self.base,
+                'count': 2,
+                'fill_level_avg': 20.0,
+                'fill_level_min': 10.0,
+                'fill_level_max': 30.0,
+                'temperature_avg': 10.0,
+                'temperature_min': 10.0,
+                'temperature_max': 10.0,
+            },
+            {
+                'time': self.base + datetime.timedelta(hours=1),
+                'count': 1,
+                'fill_level_avg': 50.0,
+                'fill_level_min': 50.0,
+                'fill_level_max': 50.0,
+                'temperature_avg': 20.0,
+                'temperature_min': 20.0,
+                'temperature_max': 20.0,
+            },
+        ])
+
+    def test_rollups_add_up_across_batches(self):
+        """Test later batches and resent readings update the buckets."""
+        self.ingest_sample()
+        self.ingest_sample()
+        self.ingest([
+            {'bin_id': '1', 'recorded_at': self.at(2), 'fill_level': 90},
+        ])
+
+        five_minutes = self.series(**{
+            'from': self.at(0), 'to': self.at(180), 'bucket': '5m',
+        })['results']
+        days = self.series(**{
+            'from': self.at(0), 'to': self.at(180), 'bucket': '1d',
+        })['results']
+
+        self.assertEqual(
+            [(point['count'], point['fill_level_max'])
+             for point in five_minutes],
+            [(2, 90.0), (1, 30.0), (1, 50.0)],
+        )
+        self.assertEqual(len(days), 1)
+        self.assertEqual(days[0]['count'], 4)
+        self.assertEqual(days[0]['fill_level_avg'], 45.0)
+        self.assertEqual(days[0]['temperature_avg'], 15.0)
+
+    def test_first_bucket_is_whole(self):
+        """Test the bucket holding `from` covers all of its readings."""
+        self.ingest_sample()
+
+        data = self.series(**{
+            'from': self.at(30), 'to': self.at(180), 'bucket': '1h',
+        })
+
+        self.assertEqual(data['results'][0]['time'], self.base)
+        self.assertEqual(data['results'][0]['count'], 2)
+
+    def test_raw_readings(self):
+        """Test raw readings are one point each."""
+        self.ingest_sample()
+
+        data = self.series(**{
+            'from': self.at(5), 'to': self.at(180), 'bucket': 'raw',
+        })
+
+        self.assertEqual(
+            [(point['count'], point['fill_level_avg'],
+              point['temperature_avg']) for point in data['results']],
+            [(1, 30.0, None), (1, 50.0, 20.0)],
+        )
+
+    def test_default_bucket(self):
+        """Test the bucket is picked from the span when not given."""
+        for hours, bucket in [
+            (1, 'raw'), (12, '5m'), (72, '1h'), (24 * 365, '1d'),
+        ]:
+            with self.subTest(hours=hours):
+                end = timezone.now()
+                start = end - datetime.timedelta(hours=hours)
+
+                data = self.series(**{
+                    'from': start.isoformat(), 'to': end.isoformat(),
+                })
+
+                self.assertEqual(data['bucket'], bucket)
+
+    def test_year_of_daily_points(self):
+        """Test a year long chart returns a point per day with readings."""
+        now = timezone.now()
+        self.ingest([
+            {'bin_id': '1', 'fill_level': 10, 'recorded_at': (
+                now - datetime.timedelta(days=days)
+            ).isoformat()}
+            for days in (1, 100, 300)
+        ])
+
+        with self.assertNumQueries(2):
+            data = self.series(**{
+                'from': (now - datetime.timedelta(days=365)).isoformat(),
+            })
+
+        self.assertEqual(data['bucket'], '1d')
+        self.assertEqual(len(data['results']), 3)
+
+    def test_other_users_container(self):
+        """Test another user's container is not found."""
+        other = create_user(email='other@example.com', password='testp123')
+        container = create_container(other, bin_id='2')
+
+        res = self.client.get(series_url(container.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_params(self):
+        """Test malformed ranges and buckets are rejected."""
+        for params, field in [
+            ({'from': 'yesterday'}, 'from'),
+            ({'to': '2026-13-01T00:00:00'}, 'to'),
+            ({'from': self.at(60), 'to': self.at(0)}, 'from'),
+            ({'bucket': '1w'}, 'bucket'),
+            ({'from': self.at(0), 'to': self.at(60 * 48),
+              'bucket': 'raw'}, 'bucket'),
+            ({'from': self.at(0), 'to': self.at(60 * 24 * 30),
+              'bucket': '5m'}, 'bucket'),
+        ]:
+            with self.subTest(params=params):
+                res = self.client.get(series_url(self.container.id), params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(field, res.data)
+
+    def test_delete_container_deletes_rollups(self):
+        """Test a container's rollups go with it."""
+        self.ingest_sample()
+
+        self.container.delete()
+
+        self.assertFalse(ReadingRollup.objects.exists())
+
+
+class ReadingsCacheTests(TransactionTestCase):
+    """Test partitions are remembered and bins looked up per batch.
+
+    Partitions are only remembered once committed, so these tests commit
+    as they go.
+    """
+
+    def setUp(self):
+        reading_partitions.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            for name in partitions():
+                cursor.execute(f'DROP TABLE {name}')
+        reading_partitions.clear()
+
+    def test_batch_is_one_query(self):
+        """Test a batch for known bins only runs the insert."""
+        create_container(self.user, bin_id='1')
+        self.client.post(READINGS_URL, [reading('1', 5)], format='json')
+
+        with self.assertNumQueries(1):
+            res = self.client.post(
+                READINGS_URL, [reading('1', i) for i in range(3)],
+                format='json',
+            )
+
+        self.assertEqual(res.data['created'], 3)
+
+    def test_new_container_is_found(self):
+        """Test a container created elsewhere is found by the next batch."""
+        res = self.client.post(READINGS_URL, [reading('1')], format='json')
+        self.assertEqual(res.data['error_count'], 1)
+
+        # bulk_create sends no signals, like a write by another process.
+        container, = Container.objects.bulk_create([Container(
+            user=self.user,
+            bin_id='1',
+            bin_size='32m',
+            bin_type='Open Skip',
+        )])
+        res = self.client.post(READINGS_URL, [reading('1')], format='json')
+
+        self.assertEqual(res.data['created'], 1)
+        with transaction.atomic():
+            self.assertEqual(container.readings.count(), 1)
+
+    def test_deleted_container_not_found(self):
+        """Test a container deleted elsewhere is reported, not a 500."""
+        container = create_container(self.user, bin_id='1')
+        self.client.post(READINGS_URL, [reading('1', 5)], format='json')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM core_container WHERE id = %s', [container.id],
+            )
+
+        res = self.client.post(READINGS_URL, [reading('1')], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 0)
+        self.assertEqual(
+            res.data['errors'],
+            [{'index': 0, 'errors': {'bin_id': ['Container not found.']}}],
+        )
+
+
+class CreatePartitionsCommandTests(TestCase):
+    """Test the create_reading_partitions command."""
+
+    def test_creates_upcoming_partitions(self):
+        """Test partitions are created for this month and those ahead."""
+        out = StringIO()
+
+        call_command('create_reading_partitions', '--months', '2', stdout=out)
+        call_command('create_reading_partitions', '--months', '2', stdout=out)
+
+        self.assertEqual(len(partitions()), 3)
+        self.assertIn('Created 3 reading partitions', out.getvalue())
+        self.assertIn('Created 0 reading partitions', out.getvalue())
@@ -0,0 +1,233 @@
+"""
+Tests for caching the container and tag lists.
+"""
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from prometheus_client import REGISTRY
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import response_cache
+from core.models import Tag
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+CONTAINERS_URL = reverse('container:container-list')
+TAGS_URL = reverse('container:tag-list')
+BULK_URL = reverse('container:container-bulk')
+
+# Cache in process, even right after writes as replicas are not in play.
+RESPONSE_CACHE = {
+    **settings.RESPONSE_CACHE,
+    'BACKEND': 'local',
+    'MIN_AGE': 0,
+}
+
+
+def detail_url(container_id):
+    """Create and return a container detail URL."""
+    return reverse('container:container-detail', args=[container_id])
+
+
+def tag_detail_url(tag_id):
+    """Create and return a tag detail URL."""
+    return reverse('container:tag-detail', args=[tag_id])
+
+
+def sample(name, **labels):
+    """Return the current value of a metric sample, or 0."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def bin_ids(res):
+    """Return the bin IDs of a container list response."""
+    return [container['bin_id'] for container in res.data['results']]
+
+
+@override_settings(RESPONSE_CACHE=RESPONSE_CACHE)
+class ResponseCacheTests(TestCase):
+    """Test serving lists from the response cache."""
+
+    def setUp(self):
+        # Versions are only trusted in a cache shared by every process.
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        shared = self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location.name,
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+        cache.clear()
+        response_cache.clear()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list runs no queries."""
+        create_container(self.user)
+        res = self.client.get(CONTAINERS_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(CONTAINERS_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_cached_list_not_modified(self):
+        """Test a cached list still answers If-None-Match."""
+        create_container(self.user)
+        etag = self.client.get(CONTAINERS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(CONTAINERS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_query_params_cached_separately(self):
+        """Test filters and their order are part of the key."""
+        create_container(self.user)
+        create_container(self.user, bin_id='8608', bin_type='Compactor')
+        self.client.get(CONTAINERS_URL)
+
+        res = self.client.get(CONTAINERS_URL, {'bin_type': 'Compactor'})
+
+        self.assertEqual(bin_ids(res), ['8608'])
+        with self.assertNumQueries(0):
+            self.client.get(f'{CONTAINERS_URL}?bin_type=Compactor')
+
+    def test_users_cached_separately(self):
+        """Test one user's list is never served to another."""
+        create_container(self.user)
+        self.client.get(CONTAINERS_URL)
+        other = create_user(email='other@example.com', password='test123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(CONTAINERS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_writes_invalidate(self):
+        """Test creating, updating and deleting change the list."""
+        self.client.get(CONTAINERS_URL)
+        payload = {'bin_id': '8607', 'bin_size': '32m', 'bin_type': 'Skip'}
+        container_id = self.client.post(CONTAINERS_URL, payload).data['id']
+        self.assertEqual(bin_ids(self.client.get(CONTAINERS_URL)), ['8607'])
+
+        self.client.patch(detail_url(container_id), {'bin_id': '8608'})
+        self.assertEqual(bin_ids(self.client.get(CONTAINERS_URL)), ['8608'])
+
+        self.client.delete(detail_url(container_id))
+        self.assertEqual(bin_ids(self.client.get(CONTAINERS_URL)), [])
+
+    def test_bulk_write_invalidates(self):
+        """Test the bulk endpoint, which sends no signals, changes the list."""
+        self.client.get(CONTAINERS_URL)
+
+        res = self.client.post(BULK_URL, [
+            {'bin_id': '8607', 'bin_size': '32m', 'bin_type': 'Skip'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(bin_ids(self.client.get(CONTAINERS_URL)), ['8607'])
+
+    def test_tag_write_invalidates_containers(self):
+        """Test renaming a tag changes the container list it is nested in."""
+        container = create_container(self.user)
+        tag = Tag.objects.create(user=self.user, name='Blue')
+        container.tags.add(tag)
+        self.client.get(CONTAINERS_URL)
+        self.client.get(TAGS_URL)
+
+        self.client.patch(tag_detail_url(tag.id), {'name': 'Green'})
+
+        res = self.client.get(CONTAINERS_URL)
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Green')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data[0]['name'], 'Green')
+
+    def test_one_commit_callback_per_transaction(self):
+        """Test many writes in one transaction bump once on commit."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            for bin_id in ['8607', '8608', '8609']:
+                create_container(self.user, bin_id=bin_id)
+
+        bumps = [c for c in callbacks if hasattr(c, 'response_cache_user')]
+        self.assertEqual(len(bumps), 1)
+
+    def test_hits_and_misses_counted(self):
+        """Test lookups are counted by view and result."""
+        hits = sample(
+            'response_cache_lookups_total',
+            view='TagViewSet',
+            result='hit',
+        )
+        misses = sample(
+            'response_cache_lookups_total',
+            view='TagViewSet',
+            result='miss',
+        )
+
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(sample(
+            'response_cache_lookups_total',
+            view='TagViewSet',
+            result='hit',
+        ), hits + 1)
+        self.assertEqual(sample(
+            'response_cache_lookups_total',
+            view='TagViewSet',
+            result='miss',
+        ), misses + 1)
+
+    @override_settings(
+        RESPONSE_CACHE={**RESPONSE_CACHE, 'BACKEND': 'shared'},
+    )
+    def test_shared_backend(self):
+        """Test lists can be cached in the shared Django cache."""
+        create_container(self.user)
+        res = self.client.get(CONTAINERS_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(CONTAINERS_URL)
+
+        self.assertEqual(cached.content, res.content)
+
+    @override_settings(
+        RESPONSE_CACHE={**RESPONSE_CACHE, 'MIN_AGE': 60},
+    )
+    def test_recent_write_not_cached(self):
+        """Test lists are not cached right after a write."""
+        create_container(self.user)
+        self.client.get(CONTAINERS_URL)
+
+        with self.assertNumQueries(4):
+            self.client.get(CONTAINERS_URL)
+
+    def test_process_local_versions_not_cached(self):
+        """Test nothing is cached when versions are not shared."""
+        create_container(self.user)
+
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            self.assertFalse(response_cache.enabled)
+            self.client.get(CONTAINERS_URL)
+            with self.assertNumQueries(4):
+                self.client.get(CONTAINERS_URL)
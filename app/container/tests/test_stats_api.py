@@ -0,0 +1,272 @@
+"""
+Tests for the container stats API.
+"""
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    BinSize,
+    BinType,
+    Container,
+    ContainerStat,
+    Tag,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+STATS_URL = reverse('container:container-stats')
+CONTAINERS_URL = reverse('container:container-list')
+BULK_URL = reverse('container:container-bulk')
+IMPORT_URL = reverse('container:container-import')
+
+
+def detail_url(container_id):
+    """Create and return a container detail URL."""
+    return reverse('container:container-detail', args=[container_id])
+
+
+def lookup_id(model, name):
+    """Return the lookup ID of a bin type or size as counted in the stats."""
+    return str(model.objects.get(name=name).id)
+
+
+def counts(entries):
+    """Return the value to count mapping of a stats list."""
+    return {entry['value']: entry['count'] for entry in entries}
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to retrieve stats."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test authenticated stats API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def test_empty(self):
+        """Test a user without containers has zero counts."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'total': 0,
+            'bin_types': [],
+            'bin_sizes': [],
+            'tags': [],
+        })
+
+    def test_counts_by_type_size_and_tag(self):
+        """Test containers are counted by each field, largest first."""
+        blue = Tag.objects.create(user=self.user, name='Blue')
+        green = Tag.objects.create(user=self.user, name='Green')
+        first = create_container(self.user, bin_id='1')
+        second = create_container(self.user, bin_id='2', bin_size='15m')
+        create_container(self.user, bin_id='3', bin_type='Compactor')
+        first.tags.add(blue, green)
+        second.tags.add(green)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total'], 3)
+        self.assertEqual(res.data['bin_types'], [
+            {'value': 'Open Skip', 'count': 2},
+            {'value': 'Compactor', 'count': 1},
+        ])
+        self.assertEqual(counts(res.data['bin_sizes']), {'32m': 2, '15m': 1})
+        self.assertEqual(res.data['tags'], [
+            {'id': green.id, 'name': 'Green', 'count': 2},
+            {'id': blue.id, 'name': 'Blue', 'count': 1},
+        ])
+
+    def test_constant_queries(self):
+        """Test the stats are read without touching the containers."""
+        tag = Tag.objects.create(user=self.user, name='Blue')
+        containers = Container.objects.bulk_create([
+            Container(user=self.user, bin_id=str(i), bin_size='6m',
+                      bin_type='Skip')
+            for i in range(50)
+        ])
+        tag.container_set.add(*containers)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['total'], 50)
+
+    def test_limited_to_user(self):
+        """Test other users' containers are not counted."""
+        other = create_user(email='other@example.com', password='testp123')
+        create_container(other)
+        create_container(self.user, bin_type='Compactor')
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['total'], 1)
+        self.assertEqual(counts(res.data['bin_types']), {'Compactor': 1})
+
+    def test_api_writes_update_counts(self):
+        """Test creating, updating and deleting through the API."""
+        payload = {'bin_id': '1', 'bin_size': '6m', 'bin_type': 'Skip'}
+        container_id = self.client.post(CONTAINERS_URL, payload).data['id']
+        self.client.patch(detail_url(container_id), {'bin_type': 'Compactor'})
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['total'], 1)
+        self.assertEqual(counts(res.data['bin_types']), {'Compactor': 1})
+
+        self.client.delete(detail_url(container_id))
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['total'], 0)
+        self.assertEqual(res.data['bin_types'], [])
+
+    def test_bulk_writes_update_counts(self):
+        """Test the bulk endpoint, which sends no signals, updates counts."""
+        existing = create_container(self.user, bin_id='100')
+        doomed = create_container(self.user, bin_id='200')
+        payload = [
+            {'bin_id': '300', 'bin_size': '15m', 'bin_type': 'Compactor'},
+            {'bin_id': '100', 'bin_size': '40m'},
+            {'op': 'delete', 'id': doomed.id},
+        ]
+
+        self.client.post(BULK_URL, payload, format='json')
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['total'], 2)
+        self.assertEqual(
+            counts(res.data['bin_types']),
+            {'Open Skip': 1, 'Compactor': 1},
+        )
+        self.assertEqual(counts(res.data['bin_sizes']), {'40m': 1, '15m': 1})
+        existing.refresh_from_db()
+        self.assertEqual(existing.bin_size, '40m')
+
+    def test_import_updates_counts(self):
+        """Test containers and tags written by COPY are counted."""
+        upload = SimpleUploadedFile('bins.csv', (
+            'bin_id,bin_size,bin_type,description,tags\n'
+            '1,32m,Open Skip,,Damaged\n'
+            '2,15m,Compactor,,Damaged\n'
+        ).encode())
+
+        self.client.post(IMPORT_URL, {'file': upload})
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['total'], 2)
+        self.assertEqual(res.data['tags'][0]['name'], 'Damaged')
+        self.assertEqual(res.data['tags'][0]['count'], 2)
+
+    def test_tag_changes_update_counts(self):
+        """Test untagging, renaming and deleting tags."""
+        blue = Tag.objects.create(user=self.user, name='Blue')
+        green = Tag.objects.create(user=self.user, name='Green')
+        first = create_container(self.user, bin_id='1')
+        second = create_container(self.user, bin_id='2')
+        first.tags.add(blue, green)
+        second.tags.add(blue)
+
+        first.tags.remove(blue)
+        green.name = 'Teal'
+        green.save()
+        second.delete()
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['tags'], [
+            {'id': green.id, 'name': 'Teal', 'count': 1},
+        ])
+
+        green.delete()
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['tags'], [])
+
+
+class RebuildStatsCommandTests(TestCase):
+    """Test the rebuild_container_stats command."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='testp123')
+
+    def rebuild(self, *args):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command('rebuild_container_stats', *args, stdout=out)
+        return out.getvalue()
+
+    def stats(self, user):
+        """Return the user's non-zero counts."""
+        return set(
+            ContainerStat.objects.filter(user_id=user.id, count__gt=0)
+            .values_list('dimension', 'value', 'count')
+        )
+
+    def test_corrects_drift(self):
+        """Test wrong, missing and orphaned counts are fixed."""
+        tag = Tag.objects.create(user=self.user, name='Blue')
+        create_container(self.user).tags.add(tag)
+        expected = self.stats(self.user)
+        ContainerStat.objects.filter(dimension=ContainerStat.TOTAL) \
+            .update(count=7)
+        ContainerStat.objects.filter(dimension=ContainerStat.TAG).delete()
+        ContainerStat.objects.create(
+            user_id=self.user.id + 1000,
+            dimension=ContainerStat.TOTAL,
+            value='',
+            count=1,
+        )
+
+        output = self.rebuild()
+
+        self.assertIn('1 corrected', output)
+        self.assertIn('1 orphaned counts deleted', output)
+        self.assertEqual(self.stats(self.user), expected)
+        self.assertEqual(expected, {
+            (ContainerStat.TOTAL, '', 1),
+            (ContainerStat.BIN_TYPE, lookup_id(BinType, 'Open Skip'), 1),
+            (ContainerStat.BIN_SIZE, lookup_id(BinSize, '32m'), 1),
+            (ContainerStat.TAG, str(tag.id), 1),
+        })
+
+    def test_single_user(self):
+        """Test rebuilding only the given users."""
+        other = create_user(email='other@example.com', password='testp123')
+        create_container(self.user)
+        create_container(other)
+        ContainerStat.objects.update(count=5)
+
+        output = self.rebuild('--user', self.user.email)
+
+        self.assertIn('for 1 users, 1 corrected', output)
+        self.assertIn((ContainerStat.TOTAL, '', 1), self.stats(self.user))
+        self.assertIn((ContainerStat.TOTAL, '', 5), self.stats(other))
+
+    def test_unknown_user(self):
+        """Test an unknown email is an error."""
+        with self.assertRaises(CommandError):
+            self.rebuild('--user', 'nobody@example.com')
@@ -0,0 +1,243 @@
+"""
+Tests for the delta sync API.
+"""
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from container.sync import (
+    encode_token,
+    retention,
+)
+from core.models import (
+    Tag,
+    Tombstone,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+SYNC_URL = reverse('container:sync')
+
+
+class PublicSyncApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to sync."""
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTests(TransactionTestCase):
+    """Test authenticated sync requests.
+
+    Changes only become visible to a sync once the transaction that made
+    them has finished, so these tests commit as they go.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='testp123')
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_full_sync(self):
+        """Test a sync without a token returns everything."""
+        container = create_container(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Damaged')
+        container.tags.add(tag)
+
+        data = self.sync()
+
+        self.assertFalse(data['has_more'])
+        self.assertIsNone(data['next'])
+        self.assertEqual([c['id'] for c in data['containers']], [container.id])
+        self.assertEqual(data['containers'][0]['tags'][0]['name'], 'Damaged')
+        self.assertEqual([t['id'] for t in data['tags']], [tag.id])
+
+    def test_delta_sync_returns_changes_only(self):
+        """Test a token returns only what changed after it."""
+        changed = create_container(user=self.user, bin_id='1')
+        create_container(user=self.user, bin_id='2')
+        token = self.sync()['token']
+
+        changed.bin_size = '40m'
+        changed.save()
+        created = create_container(user=self.user, bin_id='3')
+        data = self.sync(token)
+
+        self.assertEqual(
+            [c['id'] for c in data['containers']],
+            [changed.id, created.id],
+        )
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(self.sync(data['token'])['containers'], [])
+
+    def test_deletes_returned_as_tombstones(self):
+        """Test deleted containers and tags are reported by ID."""
+        container = create_container(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Damaged')
+        container_id, tag_id = container.id, tag.id
+        token = self.sync()['token']
+
+        container.delete()
+        tag.delete()
+        data = self.sync(token)
+
+        self.assertEqual(data['containers'], [])
+        self.assertEqual(data['deleted']['containers'], [container_id])
+        self.assertEqual(data['deleted']['tags'], [tag_id])
+
+    def test_tagging_returns_container(self):
+        """Test changing a container's tags counts as a change to it."""
+        container = create_container(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Damaged')
+        token = self.sync()['token']
+
+        container.tags.add(tag)
+        data = self.sync(token)
+
+        self.assertEqual([c['id'] for c in data['containers']], [container.id])
+
+    def test_paginated_in_change_order(self):
+        """Test paging follows the order the changes were made in."""
+        first = create_container(user=self.user, bin_id='1')
+        tag = Tag.objects.create(user=self.user, name='Damaged')
+        second = create_container(user=self.user, bin_id='2')
+        token = self.sync()['token']
+        second.save()
+        first.save()
+        tag.save()
+
+        data = self.sync(token, page_size=2)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(
+            [c['id'] for c in data['containers']],
+            [second.id, first.id],
+        )
+        self.assertEqual(data['tags'], [])
+
+        res = self.client.get(data['next'])
+        self.assertFalse(res.data['has_more'])
+        self.assertEqual([t['id'] for t in res.data['tags']], [tag.id])
+
+    def test_other_users_changes_excluded(self):
+        """Test a sync only returns the user's own changes."""
+        other = create_user(email='other@example.com', password='testp123')
+        other_container = create_container(user=other)
+        create_container(user=self.user)
+        other_container.delete()
+
+        data = self.sync()
+
+        self.assertEqual(len(data['containers']), 1)
+        self.assertEqual(data['deleted']['containers'], [])
+
+    def test_invalid_token(self):
+        """Test an invalid token returns an error."""
+        res = self.client.get(SYNC_URL, {'since': 'not-a-token'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', res.data)
+
+    def test_expired_token_requires_resync(self):
+        """Test tokens older than the tombstones kept get 410 Gone."""
+        token = self.sync()['token']
+        expired = encode_token(0, 0, issued=int(time.time() - retention()))
+        unaged = 'eyJ4IjowLCJzIjowfQ=='
+
+        for since in [expired, unaged]:
+            res = self.client.get(SYNC_URL, {'since': since})
+
+            self.assertEqual(res.status_code, status.HTTP_410_GONE)
+            self.assertEqual(res.data['detail'].code, 'resync_required')
+        self.sync(token)
+
+    def open_transaction(self, **params):
+        """Start a writing transaction on a new connection, left open."""
+        params = {**connection.get_connection_params(), **params}
+        other = connection.get_new_connection(params)
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute('SELECT txid_current()')
+
+    def test_other_database_transactions_ignored(self):
+        """Test transactions in other databases do not hold syncs back."""
+        self.open_transaction(database='postgres')
+        container = create_container(user=self.user)
+
+        data = self.sync()
+
+        self.assertEqual([c['id'] for c in data['containers']], [container.id])
+
+    def test_running_transaction_holds_sync_back(self):
+        """Test changes wait for older transactions in the database."""
+        self.open_transaction()
+        create_container(user=self.user)
+
+        self.assertEqual(self.sync()['containers'], [])
+
+    @override_settings(SYNC_MAX_LAG=0)
+    def test_stale_transaction_passed(self):
+        """Test transactions open too long are passed with a warning."""
+        self.open_transaction()
+        container = create_container(user=self.user)
+
+        with self.assertLogs('container.sync', 'WARNING'):
+            data = self.sync()
+
+        self.assertEqual([c['id'] for c in data['containers']], [container.id])
+
+
+class PruneTombstonesCommandTests(TestCase):
+    """Test the prune_tombstones command."""
+
+    def test_prune_tombstones(self):
+        """Test only tombstones past the retention window are deleted."""
+        user = create_user(email='user@example.com', password='testp123')
+        old, recent = [
+            create_container(user=user, bin_id=str(i)) for i in range(2)
+        ]
+        old_id, recent_id = old.id, recent.id
+        old.delete()
+        recent.delete()
+        Tombstone.objects.filter(object_id=old_id).update(
+            deleted_at=timezone.now() - timedelta(
+                seconds=retention() + 3600,
+            ),
+        )
+        out = StringIO()
+
+        call_command('prune_tombstones', '--batch-size', '1', stdout=out)
+
+        self.assertEqual(
+            list(Tombstone.objects.values_list('object_id', flat=True)),
+            [recent_id],
+        )
+        self.assertIn('Deleted 1 tombstones.', out.getvalue())
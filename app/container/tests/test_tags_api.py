@@ -94,3 +94,14 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         tags = Tag.objects.filter(user=self.user)
         self.assertFalse(tags.exists())
+
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag to a name already used fails."""
+        Tag.objects.create(user=self.user, name='Damaged')
+        tag = Tag.objects.create(user=self.user, name='Tag Name')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Damaged'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Tag Name')
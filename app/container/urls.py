@@ -8,6 +8,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
+from core.async_views import async_patterns
 from container import views
 
 
@@ -18,5 +19,9 @@ router.register('tags', views.TagViewSet)
 app_name = 'container'
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('', include(async_patterns(
+        router.urls,
+        {'container-list', 'container-detail', 'tag-list'},
+    ))),
 ]
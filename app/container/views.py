@@ -1,30 +1,348 @@
 """
 Views for the container API.
 """
+import codecs
+import datetime
+import math
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+)
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import (
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+)
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+from drf_spectacular.utils import (
+    extend_schema_view,
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+
 from rest_framework import (
     viewsets,
     mixins,
+    status,
 )
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import (
+    APIException,
+    ValidationError,
+)
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
+from core.authentication import CachedTokenAuthentication
+from core.geo import (
+    distance_to,
+    in_boxes,
+    radius_boxes,
+    split_box,
+)
 from core.models import (
     Container,
     Tag,
 )
+from core.parsers import ORJSONParser
 from container import serializers
+from container.bulk import BulkContainerWriter
+from container.export import (
+    iter_export_rows,
+    spool,
+    stream_csv,
+    stream_ndjson,
+)
+from container.importer import (
+    FORMATS,
+    ContainerImporter,
+    guess_format,
+)
+from container.mixins import (
+    CachedListMixin,
+    ConditionalRequestMixin,
+    aggregate_validators,
+)
+from container.pagination import KeysetCursorPagination
+from container.parsers import NDJSONParser
+from container.readings import (
+    BUCKET_RAW,
+    BUCKET_SECONDS,
+    BUCKETS,
+    RAW_MAX_SPAN,
+    ReadingWriter,
+    default_bucket,
+    reading_series,
+)
+from container.renderers import (
+    CSVRenderer,
+    NDJSONRenderer,
+)
+from container.stats import container_stats
+from container.sync import (
+    ChangeFeed,
+    InvalidToken,
+    TokenExpired,
+)
 
 
-class ContainerViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Search bin IDs and descriptions, '
+                            'results are ranked by relevance',
+            ),
+            OpenApiParameter(
+                'tags',
+                OpenApiTypes.STR,
+                description='Comma separated list of tag IDs to filter',
+            ),
+            OpenApiParameter(
+                'bin_type',
+                OpenApiTypes.STR,
+                description='Only return containers of this bin type',
+            ),
+            OpenApiParameter(
+                'bin_size',
+                OpenApiTypes.STR,
+                description='Only return containers of this bin size',
+            ),
+            OpenApiParameter(
+                'near',
+                OpenApiTypes.STR,
+                description='Latitude and longitude, comma separated. '
+                            'Only return containers within `radius` '
+                            'metres of it, nearest first',
+            ),
+            OpenApiParameter(
+                'radius',
+                OpenApiTypes.NUMBER,
+                description='Distance from `near` in metres '
+                            '(max 100000)',
+            ),
+            OpenApiParameter(
+                'bbox',
+                OpenApiTypes.STR,
+                description='West, south, east and north edges in '
+                            'degrees, comma separated. Only return '
+                            'containers inside the box',
+            ),
+        ]
+    )
+)
+class ContainerViewSet(CachedListMixin,
+                       ConditionalRequestMixin,
+                       viewsets.ModelViewSet):
     """View for manage container APIs."""
     serializer_class = serializers.ContainerDetailSerializer
     queryset = Container.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    ordering = '-id'
+    ordering_fields = ['id', 'bin_id', 'bin_size', 'bin_type']
+    keyset_prefix = ['user_id']
+    filter_actions = ['list', 'export']
+    filter_fields = ['bin_type', 'bin_size']
+    search_config = 'english'
+    bulk_max_items = 1000
+    readings_max_items = 5000
+    readings_max_points = 1500
+    near_max_radius = 100000
+
+    def _params_to_ints(self, name, qs):
+        """Convert a comma separated list of strings to integers."""
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError({name: [
+                'Expected a comma separated list of IDs.'
+            ]})
+
+    def _params_to_floats(self, name, qs, count):
+        """Convert a comma separated list of `count` numbers to floats."""
+        try:
+            values = [float(value) for value in qs.split(',')]
+        except ValueError:
+            values = []
+        if len(values) != count or not all(map(math.isfinite, values)):
+            raise ValidationError({name: [
+                f'Expected {count} comma separated numbers.'
+            ]})
+
+        return values
 
     def get_queryset(self):
         """Retrieve bins for the authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        # A range instead of an equality keeps user_id a real sort key, so
+        # keyset pages seek into the (user, id) index rather than letting
+        # the planner walk the primary key and filter out other users. The
+        # same goes for the bin_type and bin_size filters below.
+        user_id = self.request.user.id
+        queryset = self.queryset.filter(
+            user_id__gte=user_id,
+            user_id__lte=user_id,
+        )
+        if self.action in self.filter_actions:
+            queryset = self._filter_queryset(queryset)
+
+        return queryset.defer('search_vector').prefetch_related(
+            'tags',
+        ).order_by('-id')
+
+    def _filter_queryset(self, queryset):
+        """Apply the search, tags, bin_type and bin_size query filters."""
+        params = self.request.query_params
+        search = params.get('search')
+        if search:
+            query = SearchQuery(
+                search,
+                config=self.search_config,
+                search_type='websearch',
+            )
+            # ts_rank returns a real; cast it so cursor positions survive
+            # the round trip through JSON exactly.
+            queryset = queryset.annotate(rank=Cast(
+                SearchRank(F('search_vector'), query),
+                FloatField(),
+            )).filter(Q(search_vector=query) | Q(bin_id__icontains=search))
+        tags = params.get('tags')
+        if tags:
+            tag_ids = self._params_to_ints('tags', tags)
+            Through = Container.tags.through
+            queryset = queryset.filter(Exists(Through.objects.filter(
+                container_id=OuterRef('pk'),
+                tag_id__in=tag_ids,
+            )))
+        for field in self.filter_fields:
+            value = params.get(field)
+            if value:
+                queryset = queryset.filter(**{
+                    f'{field}__gte': value,
+                    f'{field}__lte': value,
+                })
+
+        return self._filter_location(queryset)
+
+    def _filter_location(self, queryset):
+        """Apply the bbox and near query filters.
+
+        Both first match locations inside one or two boxes, which the
+        location index answers, so only the containers in those boxes are
+        read. `near` then checks the exact distance of each.
+        """
+        params = self.request.query_params
+        bbox = params.get('bbox')
+        if bbox:
+            west, south, east, north = self._params_to_floats('bbox', bbox, 4)
+            if not (-180 <= west <= 180 and -180 <= east <= 180 and
+                    -90 <= south <= north <= 90):
+                raise ValidationError({'bbox': [
+                    'Expected west, south, east and north edges in degrees.'
+                ]})
+            queryset = queryset.filter(
+                in_boxes(split_box(west, south, east, north)),
+            )
+        if self._is_near():
+            latitude, longitude = self._params_to_floats(
+                'near', params['near'], 2,
+            )
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise ValidationError({'near': [
+                    'Expected a latitude and longitude in degrees.'
+                ]})
+            try:
+                radius = float(params.get('radius', ''))
+            except ValueError:
+                radius = math.nan
+            if not 0 < radius <= self.near_max_radius:
+                raise ValidationError({'radius': [
+                    'Expected a distance in metres up to '
+                    f'{self.near_max_radius}.'
+                ]})
+            queryset = queryset.filter(
+                in_boxes(radius_boxes(latitude, longitude, radius)),
+            ).annotate(
+                distance=distance_to(latitude, longitude),
+            ).filter(distance__lte=radius)
+
+        return queryset
+
+    def _param_to_datetime(self, name, default):
+        """Parse an ISO 8601 query parameter, taking naive times as UTC."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: [
+                'Expected an ISO 8601 date and time.'
+            ]})
+        if timezone.is_naive(parsed):
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+
+        return parsed.astimezone(datetime.timezone.utc)
+
+    def _is_search(self):
+        return self.action in self.filter_actions and \
+            bool(self.request.query_params.get('search'))
+
+    def _is_near(self):
+        return self.action in self.filter_actions and \
+            bool(self.request.query_params.get('near'))
+
+    def get_ordering(self):
+        """Order search results by rank and nearby ones by distance."""
+        if self._is_search():
+            return '-rank'
+        if self._is_near():
+            return 'distance'
+        return self.ordering
+
+    def get_ordering_fields(self):
+        """Return the fields a list may be ordered by."""
+        fields = list(self.ordering_fields)
+        if self._is_search():
+            fields.append('rank')
+        if self._is_near():
+            fields.append('distance')
+        return fields
+
+    def get_keyset_prefix(self):
+        """Lead the keyset with the first filtered field that is indexed."""
+        if self._is_search() or self._is_near():
+            # Matches come from the search or location indexes and are
+            # sorted by rank or distance, leading with user_id would only
+            # tempt the planner into walking every container the user has.
+            return []
+
+        prefix = list(self.keyset_prefix)
+        for field in self.filter_fields:
+            if self.request.query_params.get(field):
+                prefix.append(field)
+                break
+
+        return prefix
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -33,21 +351,305 @@ class ContainerViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def get_list_validators(self, queryset):
+        """Include the user's tags, which are nested in every container."""
+        tags = Tag.objects.filter(user=self.request.user)
+        return aggregate_validators(queryset) + aggregate_validators(tags)
+
+    def get_object_validators(self, instance):
+        """Include the container's tags, read from the prefetch cache."""
+        tags = instance.tags.all()
+        return (
+            instance.pk,
+            instance.updated_at,
+            max((tag.updated_at for tag in tags), default=None),
+            len(tags),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            self.get_object_validators(instance),
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
     def perform_create(self, serializer):
         """Create a new container."""
         serializer.save(user=self.request.user)
 
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='bulk',
+        parser_classes=[ORJSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """Create, update or delete a batch of containers."""
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of containers.')
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                f'A batch may contain at most {self.bulk_max_items} items.'
+            )
+
+        writer = BulkContainerWriter(request.user, items)
+        results = writer.run()
+        if not writer.valid:
+            return Response(
+                {'results': results},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='readings',
+        url_name='ingest',
+        parser_classes=[ORJSONParser, NDJSONParser],
+    )
+    def ingest(self, request):
+        """Store a batch of sensor readings, matched to bins by bin ID."""
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of readings.')
+        if len(items) > self.readings_max_items:
+            raise ValidationError(
+                'A batch may contain at most '
+                f'{self.readings_max_items} readings.'
+            )
+
+        result = ReadingWriter(request.user).run(items)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'from',
+                OpenApiTypes.DATETIME,
+                description='Start of the range, defaults to a day '
+                            'before `to`',
+            ),
+            OpenApiParameter(
+                'to',
+                OpenApiTypes.DATETIME,
+                description='End of the range, defaults to now',
+            ),
+            OpenApiParameter(
+                'bucket',
+                OpenApiTypes.STR,
+                enum=BUCKETS,
+                description='Summarise readings over 5 minutes, an hour '
+                            'or a day, or return them raw (spans of up to '
+                            'a day). Picked from the span if not given',
+            ),
+        ],
+        responses=serializers.ReadingSeriesSerializer,
+    )
+    @action(
+        methods=['GET'],
+        detail=True,
+        url_path='readings',
+        url_name='readings',
+        pagination_class=None,
+    )
+    def readings(self, request, pk=None):
+        """Chart a container's readings, summarised per bucket."""
+        container = get_object_or_404(
+            self.get_queryset().only('id').prefetch_related(None),
+            pk=pk,
+        )
+        end = self._param_to_datetime('to', timezone.now())
+        start = self._param_to_datetime(
+            'from', end - datetime.timedelta(days=1),
+        )
+        if start >= end:
+            raise ValidationError({'from': ['Must be before `to`.']})
+        bucket = request.query_params.get('bucket') or \
+            default_bucket(start, end)
+        if bucket not in BUCKETS:
+            raise ValidationError({'bucket': [
+                f'Expected one of: {", ".join(BUCKETS)}.'
+            ]})
+        if bucket == BUCKET_RAW:
+            if end - start > RAW_MAX_SPAN:
+                raise ValidationError({'bucket': [
+                    'Raw readings are only returned for up to a day.'
+                ]})
+        elif (end - start).total_seconds() / BUCKET_SECONDS[bucket] > \
+                self.readings_max_points:
+            raise ValidationError({'bucket': [
+                f'The range holds more than {self.readings_max_points} '
+                'buckets, use a larger one.'
+            ]})
+
+        # The points are plain dicts, which render as they are, so a long
+        # series does not go through a serializer field by field.
+        return Response({
+            'bucket': bucket,
+            'start': start,
+            'end': end,
+            'results': reading_series(container.id, start, end, bucket),
+        })
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None,
+    )
+    def export(self, request):
+        """Stream every container as NDJSON or CSV.
+
+        Under ASGI the export is spooled first, see `spool`.
+        """
+        rows = iter_export_rows(self.get_queryset())
+        renderer = request.accepted_renderer
+        if renderer.format == CSVRenderer.format:
+            content = stream_csv(rows)
+        else:
+            content = stream_ndjson(rows)
+        if isinstance(request._request, ASGIRequest):
+            content = spool(content)
+
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="containers.{renderer.format}"'
+        )
+        return response
 
-class TagViewSet(mixins.DestroyModelMixin,
+    @extend_schema(responses=serializers.ContainerStatsSerializer)
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='stats',
+        pagination_class=None,
+    )
+    def stats(self, request):
+        """Count the user's containers by bin type, bin size and tag."""
+        serializer = serializers.ContainerStatsSerializer(
+            container_stats(request.user),
+        )
+        return Response(serializer.data)
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='import',
+        url_name='import',
+        parser_classes=[MultiPartParser],
+    )
+    def import_file(self, request):
+        """Import containers from an uploaded CSV or NDJSON file."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['No file was submitted.']})
+        file_format = request.data.get('file_format') or \
+            guess_format(upload.name)
+        if file_format not in FORMATS:
+            raise ValidationError({'file_format': [
+                f'Expected one of: {", ".join(FORMATS)}.'
+            ]})
+
+        importer = ContainerImporter(request.user)
+        try:
+            result = importer.import_file(
+                codecs.iterdecode(upload, 'utf-8'),
+                file_format,
+            )
+        except UnicodeDecodeError:
+            raise ValidationError({'file': ['File must be UTF-8 encoded.']})
+
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class TagViewSet(CachedListMixin,
+                 ConditionalRequestMixin,
+                 mixins.DestroyModelMixin,
                  mixins.UpdateModelMixin,
                  mixins.ListModelMixin,
                  viewsets.GenericViewSet):
     """Manage Tags in the database."""
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
         return self.queryset.filter(user=self.request.user).order_by('-name')
+
+
+class ResyncRequired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = _(
+        'The sync token has expired, sync again without `since`.'
+    )
+    default_code = 'resync_required'
+
+
+class SyncView(APIView):
+    """Changes to the user's containers and tags since a sync token."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    page_size = 500
+    max_page_size = 1000
+
+    def get_page_size(self):
+        """Return the requested page size, capped at `max_page_size`."""
+        try:
+            size = int(self.request.query_params['page_size'])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'since',
+                OpenApiTypes.STR,
+                description='Token from the previous sync, omit for a '
+                            'full sync',
+            ),
+            OpenApiParameter(
+                'page_size',
+                OpenApiTypes.INT,
+                description='Number of changes to return per page '
+                            f'(max {max_page_size}).',
+            ),
+        ],
+        responses=serializers.SyncSerializer,
+    )
+    def get(self, request):
+        """Return the next page of changes.
+
+        Keep requesting `next` until `has_more` is false, then store
+        `token` and pass it as `since` on the next sync. A token older
+        than `TOMBSTONE_RETENTION_DAYS` gets 410 Gone, and the client has
+        to drop its copy and sync in full.
+        """
+        feed = ChangeFeed(request.user, self.get_page_size())
+        try:
+            page = feed.page(request.query_params.get('since'))
+        except TokenExpired:
+            raise ResyncRequired()
+        except InvalidToken:
+            raise ValidationError({'since': ['Invalid sync token.']})
+
+        page['next'] = None
+        if page['has_more']:
+            page['next'] = replace_query_param(
+                request.build_absolute_uri(),
+                'since',
+                page['token'],
+            )
+        serializer = serializers.SyncSerializer(page)
+        return Response(serializer.data)
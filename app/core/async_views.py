@@ -0,0 +1,86 @@
+"""
+Async adapters for serving the API under ASGI.
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+VIEWS = 'views'
+HASHING = 'hashing'
+
+_executors = {}
+
+
+def get_executor(name=VIEWS):
+    """Return the thread pool called `name` that runs offloaded views.
+
+    `views` serves the read endpoints with ASYNC_VIEWS_THREADS threads.
+    `hashing` serves the endpoints that hash passwords with
+    PASSWORD_HASHING_THREADS, so a burst of logins cannot take every
+    thread from the reads. Each thread keeps its own database connection,
+    so the pool sizes also cap the connections one ASGI worker opens.
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        sizes = {
+            VIEWS: settings.ASYNC_VIEWS_THREADS,
+            HASHING: settings.PASSWORD_HASHING_THREADS,
+        }
+        executor = _executors[name] = ThreadPoolExecutor(
+            max_workers=sizes[name],
+            thread_name_prefix=f'async-{name}',
+        )
+    return executor
+
+
+def _call_view(view, request, *args, **kwargs):
+    # Mirror what request_started and request_finished do for the thread
+    # that serves a synchronous request.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view, executor=VIEWS):
+    """Return an async view that runs the synchronous `view` in a thread.
+
+    Django 3.2 has no async ORM and runs every synchronous view of an ASGI
+    worker on one shared thread, so requests are handled one at a time.
+    The returned view awaits `view` on a thread pool instead, letting the
+    event loop serve other requests while it waits on Postgres or hashes
+    a password. `executor` names the pool, see `get_executor`. The
+    response is rendered in the same thread.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await sync_to_async(
+            _call_view,
+            thread_sensitive=False,
+            executor=get_executor(executor),
+        )(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_patterns(patterns, names, executor=VIEWS):
+    """Serve the URL patterns called one of `names` with `async_view`.
+
+    Patterns are returned unchanged unless `settings.ASYNC_VIEWS` is set,
+    which `app.asgi` does by default.
+    """
+    if not settings.ASYNC_VIEWS:
+        return patterns
+
+    for pattern in patterns:
+        if pattern.name in names:
+            pattern.callback = async_view(pattern.callback, executor)
+    return patterns
@@ -0,0 +1,125 @@
+"""
+Authentication classes for the APIs.
+"""
+import copy
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import (
+    LocalTTLCache,
+    is_shared_cache,
+)
+
+
+class TokenCache:
+    """Two level cache of token key to user.
+
+    Lookups go to a bounded in-process LRU of users first, and then to
+    the Django cache named in `settings.TOKEN_AUTH_CACHE['CACHE']`, which
+    only holds user IDs. A user found there is read again from the
+    database, so it is never stale and no password hash leaves the
+    process. The second level is skipped unless that cache is shared by
+    every process, since evictions could not reach the others. Keys are
+    hashed so raw tokens never reach a shared cache server. The LRU keeps
+    a private instance and hands each request a copy, so a request that
+    changes its user does not change it for others.
+    """
+
+    def __init__(self):
+        self.local = None
+
+    def _settings(self):
+        return settings.TOKEN_AUTH_CACHE
+
+    def _local(self):
+        if self.local is None:
+            options = self._settings()
+            self.local = LocalTTLCache(
+                maxsize=options['LOCAL_MAXSIZE'],
+                ttl=options['LOCAL_TIMEOUT'],
+            )
+        return self.local
+
+    def _shared(self):
+        """Return the shared cache, or None if there is none."""
+        alias = self._settings()['CACHE']
+        if not is_shared_cache(alias):
+            return None
+        return caches[alias]
+
+    @staticmethod
+    def make_key(key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f'auth:token:{digest}'
+
+    def get(self, key):
+        """Return the cached user for a token key, or None."""
+        cache_key = self.make_key(key)
+        user = self._local().get(cache_key)
+        if user is not None:
+            return copy.copy(user)
+
+        shared = self._shared()
+        user_id = shared.get(cache_key) if shared is not None else None
+        if user_id is None:
+            return None
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            self._local().set(cache_key, copy.copy(user))
+        return user
+
+    def set(self, key, user):
+        """Cache `user` for a token key."""
+        cache_key = self.make_key(key)
+        shared = self._shared()
+        if shared is not None:
+            shared.set(cache_key, user.pk, self._settings()['TIMEOUT'])
+        self._local().set(cache_key, copy.copy(user))
+
+    def delete(self, *keys):
+        """Forget the given token keys."""
+        cache_keys = [self.make_key(key) for key in keys]
+        shared = self._shared()
+        if shared is not None:
+            shared.delete_many(cache_keys)
+        for cache_key in cache_keys:
+            self._local().delete(cache_key)
+
+    def clear(self):
+        """Forget every cached token in this process."""
+        self._local().clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token's user.
+
+    A cache hit authenticates the request without querying the database.
+    Entries are evicted when the token is deleted or its user is saved,
+    see `core.signals`. Other processes keep their in-process copy for at
+    most `LOCAL_TIMEOUT` seconds, after which they read the user again.
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return user, Token(key=key, user=user)
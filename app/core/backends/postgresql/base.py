@@ -0,0 +1,93 @@
+"""
+PostgreSQL backend with connection health checks and pooling.
+"""
+import functools
+
+from django.db.backends.postgresql import base
+
+from core.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection that is health checked once per request.
+
+    With `CONN_MAX_AGE` a connection outlives the request that opened it,
+    so Postgres restarting or a proxy dropping idle connections only shows
+    up as an error on the next request. When `CONN_HEALTH_CHECKS` is set,
+    the first use of a reused connection in each request runs `SELECT 1`
+    and reconnects if that fails, like Django 4.1 does.
+
+    When `POOL` is set, connections are checked out of a per-process
+    `core.pool.ConnectionPool` and returned to it on close, so the
+    threads of a worker share at most `POOL['MAX_SIZE']` connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool_options(self):
+        return self.settings_dict.get('POOL')
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_options:
+            return super().get_new_connection(conn_params)
+
+        self.pool = get_pool(
+            self.alias,
+            functools.partial(super().get_new_connection, conn_params),
+            self.pool_options,
+            check=self.health_check_enabled,
+        )
+        connection = self.pool.getconn()
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level',
+            connection.isolation_level,
+        )
+        return connection
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+
+        pool, self.pool = self.pool, None
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def connect(self):
+        # A new connection does not need checking before it is used, and
+        # the pool checks the ones it hands out.
+        self.health_check_done = True
+        super().connect()
+
+    def close_if_unusable_or_obsolete(self):
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it fails its health check."""
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+        ):
+            return
+
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def set_autocommit(self, autocommit, *args, **kwargs):
+        self.close_if_health_check_failed()
+        super().set_autocommit(autocommit, *args, **kwargs)
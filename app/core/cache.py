@@ -0,0 +1,191 @@
+"""
+In-process caching helpers and the API response cache.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    connections,
+    transaction,
+)
+
+
+# Django cache backends that keep entries in the process, or nowhere.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias):
+    """Return True if the Django cache `alias` is seen by every process."""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+class LocalTTLCache:
+    """Bounded, thread-safe LRU cache whose entries expire after a TTL.
+
+    Meant as a small first layer in front of a shared Django cache. It is
+    local to the process, so entries changed by another process are only
+    seen once they expire.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for `key`, or `default` if missing or expired."""
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return default
+            if expires <= self.timer():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store `value` under `key`, evicting the oldest entry if full."""
+        expires = self.timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove `key` if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """Cache of API responses, keyed by a version per user.
+
+    Every write to a user's containers or tags moves their version to the
+    current time (see `core.signals` and the bulk writers), so entries
+    cached before the write can no longer be looked up and nothing has to
+    be deleted. The versions live in the Django cache named in
+    `settings.RESPONSE_CACHE['CACHE']`, which every process must share,
+    or nothing is cached. Entries go to a bounded in-process LRU with the `local` backend, or to
+    that same cache with `shared`, and `none` turns caching off.
+
+    Responses are not stored until the version is `MIN_AGE` seconds old,
+    so a read from a replica that has not caught up with the write is not
+    kept.
+    """
+
+    def __init__(self):
+        self.local = None
+
+    def _settings(self):
+        return settings.RESPONSE_CACHE
+
+    @property
+    def enabled(self):
+        """Return True if responses are cached.
+
+        A version only hides other processes' entries when it is kept in
+        a cache they share, so caching is off without one.
+        """
+        options = self._settings()
+        return options['BACKEND'] != 'none' and \
+            is_shared_cache(options['CACHE'])
+
+    def _shared(self):
+        return caches[self._settings()['CACHE']]
+
+    def _store(self):
+        options = self._settings()
+        if options['BACKEND'] == 'shared':
+            return self._shared()
+        if self.local is None:
+            self.local = LocalTTLCache(
+                maxsize=options['LOCAL_MAXSIZE'],
+                ttl=options['TIMEOUT'],
+            )
+        return self.local
+
+    @staticmethod
+    def version_key(user_id):
+        return f'response:version:{user_id}'
+
+    def get_version(self, user_id):
+        """Return the current version of a user's data."""
+        key = self.version_key(user_id)
+        version = self._shared().get(key)
+        if version is None:
+            # An evicted version restarts from the clock, so it never
+            # matches older entries.
+            self._shared().add(key, time.time_ns(), None)
+            version = self._shared().get(key)
+        return version
+
+    def bump(self, user_id):
+        """Invalidate every cached response of a user.
+
+        Inside a transaction the version is bumped again on commit, so a
+        read that raced the write cannot cache the old data under the new
+        version. That happens once per transaction however many rows it
+        writes.
+        """
+        self._set_version(user_id)
+        connection = connections[DEFAULT_DB_ALIAS]
+        if not connection.in_atomic_block:
+            return
+        for _, func in connection.run_on_commit:
+            if getattr(func, 'response_cache_user', None) == user_id:
+                return
+        callback = functools.partial(self._set_version, user_id)
+        callback.response_cache_user = user_id
+        transaction.on_commit(callback)
+
+    def _set_version(self, user_id):
+        self._shared().set(self.version_key(user_id), time.time_ns(), None)
+
+    def make_key(self, name, user_id, *parts):
+        """Return `(key, version)` for a response of the user's data."""
+        digest = hashlib.sha256(
+            '|'.join(str(part) for part in parts).encode(),
+        ).hexdigest()
+        version = self.get_version(user_id)
+        return f'response:{name}:{user_id}:{version}:{digest}', version
+
+    def get(self, key):
+        """Return the cached value for `key`, or None."""
+        return self._store().get(key)
+
+    def set(self, key, value, version):
+        """Cache `value` under `key` once `version` is old enough."""
+        options = self._settings()
+        if time.time_ns() - version < options['MIN_AGE'] * 1e9:
+            return
+        self._store().set(key, value, options['TIMEOUT'])
+
+    def clear(self):
+        """Forget every locally cached response in this process."""
+        if self.local is not None:
+            self.local.clear()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,190 @@
+"""
+Custom model fields.
+"""
+import functools
+
+from django import forms
+from django.apps import apps
+from django.db import (
+    connections,
+    models,
+    router,
+    transaction,
+)
+
+
+# IDs start at 1, so filtering by this matches nothing.
+UNKNOWN_ID = 0
+
+
+class LookupCache:
+    """In-process mapping between the names and IDs of a lookup table.
+
+    Lookup rows are only ever added, so an ID always stands for the same
+    name and is cached as soon as it is read. A name is only cached once
+    its row is committed. Until then its ID is kept on a commit callback
+    of the transaction that added the row, which Django drops if that
+    transaction or savepoint rolls back.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.ids = {}
+        self.names = {}
+
+    @functools.cached_property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def get_name(self, pk):
+        """Return the name of the row with ID `pk`."""
+        name = self.names.get(pk)
+        if name is None:
+            self.names.update(self.model.objects.values_list('id', 'name'))
+            name = self.names[pk]
+        return name
+
+    def get_id(self, name, create=False):
+        """Return the ID for `name`, adding a row if `create` is set.
+
+        Returns `UNKNOWN_ID`, which no row has, for an unknown name when
+        not creating.
+        """
+        pk = self.ids.get(name)
+        if pk is None:
+            pk = self._get_pending(name)
+        if pk is None:
+            pk = self._fetch(name, create)
+        if pk is None:
+            return UNKNOWN_ID
+        return pk
+
+    def _get_pending(self, name):
+        """Return the ID of a row this transaction added but not committed."""
+        connection = connections[router.db_for_write(self.model)]
+        if not connection.in_atomic_block:
+            return None
+        for _, func in connection.run_on_commit:
+            if getattr(func, 'lookup_cache', None) is self and \
+                    func.lookup_name == name:
+                return func.lookup_id
+        return None
+
+    def _fetch(self, name, create):
+        if create:
+            alias = router.db_for_write(self.model)
+            table = connections[alias].ops.quote_name(
+                self.model._meta.db_table,
+            )
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (name) VALUES (%s) '
+                    f'ON CONFLICT (name) DO NOTHING RETURNING id',
+                    [name],
+                )
+                row = cursor.fetchone()
+            if row is not None:
+                self.names[row[0]] = name
+                callback = functools.partial(self._remember, name, row[0])
+                callback.lookup_cache = self
+                callback.lookup_name = name
+                callback.lookup_id = row[0]
+                transaction.on_commit(callback, using=alias)
+                return row[0]
+            queryset = self.model.objects.using(alias)
+        else:
+            queryset = self.model.objects.all()
+
+        # Rows this transaction added are pending, so any row found here
+        # was committed by someone.
+        pk = queryset.filter(name=name).values_list('id', flat=True).first()
+        if pk is not None:
+            self._remember(name, pk)
+        return pk
+
+    def _remember(self, name, pk):
+        self.names[pk] = name
+        self.ids[name] = pk
+
+    def clear(self):
+        """Forget every cached name and ID."""
+        self.ids.clear()
+        self.names.clear()
+
+
+_caches = {}
+
+
+def get_lookup_cache(label):
+    """Return the shared cache for the lookup model `label`."""
+    if label not in _caches:
+        _caches[label] = LookupCache(label)
+    return _caches[label]
+
+
+def clear_lookup_caches():
+    """Forget the names and IDs of every lookup table."""
+    for cache in _caches.values():
+        cache.clear()
+
+
+class LookupField(models.Field):
+    """A string stored as the small integer ID of a lookup table row.
+
+    Reads, writes and filters use the string, like a `CharField`, while
+    the column holds the ID of the row in `to`, a model with a unique
+    `name`, that has that string. Saving a new string adds a row, and
+    filtering by an unknown one matches nothing. Names and IDs are cached
+    in process, so writes only query the lookup table for a new string.
+    Ordering follows the IDs: equal values sort together, but not
+    alphabetically.
+    """
+    description = 'String stored in a lookup table'
+
+    def __init__(self, to, *args, **kwargs):
+        self.to = to
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['to'] = self.to
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return 'SmallIntegerField'
+
+    @property
+    def lookup_cache(self):
+        label = self.to
+        if '.' not in label:
+            label = f'{self.model._meta.app_label}.{label}'
+        return get_lookup_cache(label)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return str(value)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.lookup_cache.get_name(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return self.lookup_cache.get_id(str(value))
+
+    def get_db_prep_save(self, value, connection):
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return self.lookup_cache.get_id(str(value), create=True)
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{
+            'form_class': forms.CharField,
+            'max_length': 255,
+            **kwargs,
+        })
+
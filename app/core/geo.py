@@ -0,0 +1,123 @@
+"""
+Geographic expressions for container locations.
+
+Locations are indexed as the built-in `point(longitude, latitude)` with a
+GiST index, so no PostGIS or contrib extension is needed. Radius and
+bounding box filters first match points inside one or two boxes, which
+the index answers, then check the exact distance.
+"""
+import math
+import operator
+from functools import reduce
+
+from django.db.models import (
+    BooleanField,
+    F,
+    Field,
+    FloatField,
+    Func,
+    Value,
+)
+from django.db.models.functions import (
+    ASin,
+    Cos,
+    Least,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
+
+
+# Mean radius, in metres.
+EARTH_RADIUS = 6371008.8
+
+
+class Point(Func):
+    """A `point(x, y)`, with longitude as x and latitude as y."""
+    function = 'point'
+    output_field = Field()
+
+
+class Box(Func):
+    """A `box` from its south-west to its north-east corner."""
+    function = 'box'
+    output_field = Field()
+
+    def __init__(self, west, south, east, north):
+        super().__init__(
+            Point(Value(float(west)), Value(float(south))),
+            Point(Value(float(east)), Value(float(north))),
+        )
+
+
+def location():
+    """Return the expression the container location index is built on."""
+    return Point(F('longitude'), F('latitude'))
+
+
+class InBox(Func):
+    """Whether a point lies inside a box, including its edges."""
+    template = '%(expressions)s'
+    arg_joiner = ' <@ '
+    conditional = True
+    output_field = BooleanField()
+
+
+def in_boxes(boxes):
+    """Return a filter for locations inside any of `boxes`."""
+    return reduce(operator.or_, [
+        InBox(location(), Box(*box)) for box in boxes
+    ])
+
+
+def distance_to(latitude, longitude):
+    """Return the great circle distance in metres from a location.
+
+    Uses the haversine formula, which stays accurate for short distances.
+    """
+    half_lat = Radians(F('latitude') - Value(float(latitude))) / 2
+    half_lng = Radians(F('longitude') - Value(float(longitude))) / 2
+    a = Power(Sin(half_lat), 2) + (
+        Cos(Radians('latitude')) * math.cos(math.radians(latitude)) *
+        Power(Sin(half_lng), 2)
+    )
+    # Rounding can push the square root just past 1 for antipodes.
+    return Value(2 * EARTH_RADIUS) * ASin(Least(Sqrt(a), Value(1.0)),
+                                         output_field=FloatField())
+
+
+def split_box(west, south, east, north):
+    """Return `(west, south, east, north)` boxes within -180 to 180.
+
+    A box that crosses the antimeridian, either with `west` greater than
+    `east` or with a side past 180 degrees, is split in two.
+    """
+    if east - west >= 360:
+        return [(-180.0, south, 180.0, north)]
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    if west > east:
+        return [(west, south, 180.0, north), (-180.0, south, east, north)]
+    return [(west, south, east, north)]
+
+
+def radius_boxes(latitude, longitude, radius):
+    """Return boxes that together hold every point within `radius` metres.
+
+    The longitude span is the widest the circle gets, not its width at
+    `latitude`, so the boxes hold the whole circle.
+    """
+    angle = radius / EARTH_RADIUS
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        # The circle covers a pole, and so every longitude near it.
+        return [(-180.0, max(south, -90.0), 180.0, min(north, 90.0))]
+
+    span = math.degrees(math.asin(min(
+        math.sin(angle) / math.cos(math.radians(latitude)), 1.0,
+    )))
+    return split_box(longitude - span, south, longitude + span, north)
@@ -0,0 +1,34 @@
+"""
+Password hashers with their cost taken from the settings.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 with the cost set by the ARGON2_* settings.
+
+    Django's hasher asks for 100 MiB and 8 lanes per hash, which limits
+    how many logins a worker can run at once. A password hashed with
+    other parameters is rehashed on the next successful login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with the work factor set by the BCRYPT_ROUNDS setting."""
+
+    @property
+    def rounds(self):
+        return settings.BCRYPT_ROUNDS
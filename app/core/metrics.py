@@ -0,0 +1,167 @@
+"""
+Request and SQL metrics in Prometheus format.
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Time spent serving a request.',
+    ['route', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_sql_queries',
+    'SQL queries run while serving a request.',
+    ['route'],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128),
+)
+REQUEST_SQL_DURATION = Histogram(
+    'http_request_sql_duration_seconds',
+    'Time spent in SQL queries while serving a request.',
+    ['route'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'response_cache_lookups_total',
+    'Response cache lookups, see core.cache.ResponseCache.',
+    ['view', 'result'],
+)
+
+_recorder = ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    """Count and time the SQL queries of one request.
+
+    Used as a `connection.execute_wrapper` via `record_query`, which looks
+    the recorder up in a context variable rather than being installed per
+    request. That way queries run on other threads for the request, such
+    as those of `core.async_views`, are counted too, so updates are made
+    under a lock. Only the `keep` slowest queries are kept for logging.
+    """
+
+    def __init__(self, keep=0):
+        self.count = 0
+        self.duration = 0.0
+        self.keep = keep
+        self._slowest = []
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(time.perf_counter() - started, sql)
+
+    def add(self, duration, sql):
+        """Record a query that took `duration` seconds."""
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, (duration, sql))
+            elif self._slowest and duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (duration, sql))
+
+    def slowest(self, limit):
+        """Return up to `limit` of the slowest `(duration, sql)` pairs."""
+        with self._lock:
+            return heapq.nlargest(limit, self._slowest)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper that reports to the current `QueryRecorder`."""
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """Add `record_query` to the execute wrappers of `connection`."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def record_queries(keep=0):
+    """Record the SQL queries run in the block and yield the recorder.
+
+    The `keep` slowest queries are kept, see `QueryRecorder`.
+    """
+    recorder = QueryRecorder(keep)
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def route_name(view_func, method):
+    """Return a label such as `ContainerViewSet.list` for a view."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        action = actions.get(method.lower(), method.lower())
+    else:
+        action = method.lower()
+    return f'{cls.__name__}.{action}'
+
+
+def observe_request(route, method, status, duration, recorder):
+    """Record the metrics of a finished request."""
+    REQUEST_DURATION.labels(route, method, f'{status // 100}xx').observe(
+        duration,
+    )
+    REQUEST_QUERIES.labels(route).observe(recorder.count)
+    REQUEST_SQL_DURATION.labels(route).observe(recorder.duration)
+
+
+def log_slow_request(request, route, duration, recorder, limit):
+    """Log a slow request with its slowest SQL queries."""
+    lines = [
+        f'Slow request {request.method} {request.path} ({route}): '
+        f'{duration * 1000:.1f} ms, {recorder.count} queries in '
+        f'{recorder.duration * 1000:.1f} ms'
+    ]
+    for query_duration, sql in recorder.slowest(limit):
+        lines.append(f'  {query_duration * 1000:8.1f} ms  {sql[:1000]}')
+    logger.warning('\n'.join(lines))
+
+
+def render_latest():
+    """Return the current metrics in the Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics to
+    files in that directory and any worker can report all of them, see
+    gunicorn.conf.py.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,191 @@
+"""
+Middleware for the core app.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.decorators import sync_and_async_middleware
+
+from core.cache import is_shared_cache
+
+from core.metrics import (
+    log_slow_request,
+    observe_request,
+    record_queries,
+    route_name,
+)
+from core.routers import routing_scope
+
+
+logger = logging.getLogger(__name__)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class HybridMiddleware:
+    """Base for middleware that runs in sync and async handlers alike.
+
+    Under ASGI, Django runs sync-only middleware on its one shared sync
+    thread for the whole of the request, so concurrent requests would be
+    served one at a time. Subclasses implement `call` and `acall`, and
+    the matching one is used for the handler they are loaded into.
+    Subclasses are marked with `sync_and_async_middleware`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django calls return a coroutine, as MiddlewareMixin
+            # does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def acall(self, request):
+        raise NotImplementedError
+
+
+@sync_and_async_middleware
+class MetricsMiddleware(HybridMiddleware):
+    """Record latency and SQL metrics for every request, see core.metrics.
+
+    Metrics are labelled by view, such as `ContainerViewSet.list`. A
+    request that takes `SLOW_REQUEST_THRESHOLD_MS` or longer logs its
+    slowest SQL queries. Streaming responses are timed until their
+    headers are ready.
+    """
+
+    def call(self, request):
+        started = time.perf_counter()
+        with record_queries(settings.SLOW_REQUEST_QUERIES) as recorder:
+            response = self.get_response(request)
+        self.observe(request, response, started, recorder)
+        return response
+
+    async def acall(self, request):
+        started = time.perf_counter()
+        with record_queries(settings.SLOW_REQUEST_QUERIES) as recorder:
+            response = await self.get_response(request)
+        self.observe(request, response, started, recorder)
+        return response
+
+    def observe(self, request, response, started, recorder):
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            route = 'unmatched'
+        else:
+            route = route_name(match.func, request.method)
+
+        method = request.method if request.method in METHODS else 'other'
+        observe_request(
+            route,
+            method,
+            response.status_code,
+            duration,
+            recorder,
+        )
+        if duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            log_slow_request(
+                request,
+                route,
+                duration,
+                recorder,
+                settings.SLOW_REQUEST_QUERIES,
+            )
+
+
+@sync_and_async_middleware
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Route each request's reads to one replica or to the primary.
+
+    Requests with unsafe methods may write, so they read from the primary
+    throughout, and so do the client's requests for the next
+    `REPLICA_PIN_SECONDS`, letting it see its own writes while the
+    replicas catch up. Clients are told apart by their `Authorization`
+    header or session cookie.
+
+    Pins are kept in the default cache, which must be shared by every
+    process for a pin to be seen by the next request. When it is not, or
+    cannot be reached, every read goes to the primary.
+    """
+    pin_cache = 'default'
+
+    def call(self, request):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            return self.get_response(request)
+
+        key = self.get_pin_key(request)
+        writes = request.method not in SAFE_METHODS
+        with routing_scope(pinned=writes or self.is_pinned(key)):
+            response = self.get_response(request)
+
+        if writes:
+            self.pin(key)
+        return response
+
+    async def acall(self, request):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            return await self.get_response(request)
+
+        # Cache calls may block, so they run off the event loop but not
+        # on the shared sync thread.
+        key = self.get_pin_key(request)
+        writes = request.method not in SAFE_METHODS
+        pinned = writes or await sync_to_async(
+            self.is_pinned,
+            thread_sensitive=False,
+        )(key)
+        with routing_scope(pinned=pinned):
+            response = await self.get_response(request)
+
+        if writes:
+            await sync_to_async(self.pin, thread_sensitive=False)(key)
+        return response
+
+    def is_pinned(self, key):
+        """Return True if the client's reads must go to the primary."""
+        if not is_shared_cache(self.pin_cache):
+            return True
+        if key is None:
+            return False
+        try:
+            return caches[self.pin_cache].get(key) is not None
+        except Exception:
+            logger.warning('Could not read replica pin', exc_info=True)
+            return True
+
+    def pin(self, key):
+        """Send the client's reads to the primary for a while."""
+        if key is None or not is_shared_cache(self.pin_cache):
+            return
+        try:
+            caches[self.pin_cache].set(
+                key, 1, settings.REPLICA_PIN_SECONDS,
+            )
+        except Exception:
+            logger.warning('Could not store replica pin', exc_info=True)
+
+    @staticmethod
+    def get_pin_key(request):
+        """Return the cache key pinning this client, or None."""
+        credentials = request.META.get('HTTP_AUTHORIZATION') or \
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credentials:
+            return None
+        digest = hashlib.sha256(credentials.encode()).hexdigest()
+        return f'replica:pin:{digest}'
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:39
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+def add_unique_concurrently(model_name, table, name, columns, fields):
+    """Build a unique constraint from an index built without locking.
+
+    The index is created with CREATE UNIQUE INDEX CONCURRENTLY and then
+    attached as a constraint, which only needs a brief lock on the table.
+    """
+    return migrations.SeparateDatabaseAndState(
+        database_operations=[
+            migrations.RunSQL(
+                sql=f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+                    f'ON "{table}" ({columns});',
+                reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS "{name}";',
+            ),
+            migrations.RunSQL(
+                sql=f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" '
+                    f'UNIQUE USING INDEX "{name}";',
+                reverse_sql=f'ALTER TABLE "{table}" DROP CONSTRAINT "{name}";',
+            ),
+        ],
+        state_operations=[
+            migrations.AddConstraint(
+                model_name=model_name,
+                constraint=models.UniqueConstraint(fields=fields, name=name),
+            ),
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_auto_20240105_0828'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='container',
+            index=models.Index(fields=['user', 'id'], name='container_user_id_idx'),
+        ),
+        add_unique_concurrently(
+            'container',
+            'core_container',
+            'container_unique_user_bin_id',
+            '"user_id", "bin_id"',
+            ('user', 'bin_id'),
+        ),
+        add_unique_concurrently(
+            'tag',
+            'core_tag',
+            'tag_unique_user_name',
+            '"user_id", "name"',
+            ('user', 'name'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_container_tag_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='container',
+            index=models.Index(fields=['user', 'bin_type', 'id'], name='container_user_bin_type_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='container',
+            index=models.Index(fields=['user', 'bin_size', 'id'], name='container_user_bin_size_idx'),
+        ),
+    ]
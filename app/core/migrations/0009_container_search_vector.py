@@ -0,0 +1,95 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 10000
+
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION core_container_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.bin_id, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_container_search_vector_update
+    BEFORE INSERT OR UPDATE OF bin_id, description, search_vector
+    ON core_container
+    FOR EACH ROW EXECUTE FUNCTION core_container_search_vector();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS core_container_search_vector_update ON core_container;
+DROP FUNCTION IF EXISTS core_container_search_vector();
+"""
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Fill the search vector in batches so no lock is held for long."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT MIN(id), MAX(id) FROM core_container')
+        low, high = cursor.fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                'UPDATE core_container SET search_vector = NULL '
+                'WHERE id >= %s AND id < %s',
+                [start, start + BACKFILL_BATCH_SIZE],
+            )
+
+
+def add_trigram_index(apps, schema_editor):
+    """Index UPPER(bin_id) with trigrams for partial bin ID matches.
+
+    This is the expression Django uses for `icontains`. pg_trgm ships with
+    the Postgres contrib modules; where it is not available the index is
+    skipped and searches fall back to scanning the user's containers.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS container_bin_id_trgm_idx '
+        'ON core_container USING gin (UPPER(bin_id) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute(
+        'DROP INDEX CONCURRENTLY IF EXISTS container_bin_id_trgm_idx'
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_container_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='container',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='container',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='container_search_idx'),
+        ),
+        migrations.RunPython(add_trigram_index, drop_trigram_index),
+    ]
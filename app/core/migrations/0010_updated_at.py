@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:25
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_container_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='container',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        AddIndexConcurrently(
+            model_name='container',
+            index=models.Index(fields=['user', 'updated_at'], name='container_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 10000
+
+CREATE_TRIGGERS = """
+CREATE SEQUENCE IF NOT EXISTS core_change_seq;
+
+CREATE OR REPLACE FUNCTION core_track_change() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := txid_current();
+    NEW.change_seq := nextval('core_change_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_write_tombstones() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO core_tombstone
+        (user_id, model, object_id, change_xid, change_seq, deleted_at)
+    SELECT user_id, TG_ARGV[0], id, txid_current(),
+           nextval('core_change_seq'), now()
+    FROM deleted_rows
+    ORDER BY id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_touch_tagged_containers() RETURNS trigger AS $$
+BEGIN
+    -- Containers already written by this transaction keep their change.
+    UPDATE core_container SET change_seq = NULL
+    WHERE id IN (SELECT container_id FROM changed_links)
+        AND change_xid IS DISTINCT FROM txid_current();
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_container_track_change
+    BEFORE INSERT OR UPDATE ON core_container
+    FOR EACH ROW EXECUTE FUNCTION core_track_change();
+
+CREATE TRIGGER core_tag_track_change
+    BEFORE INSERT OR UPDATE ON core_tag
+    FOR EACH ROW EXECUTE FUNCTION core_track_change();
+
+CREATE TRIGGER core_container_tombstone
+    AFTER DELETE ON core_container
+    REFERENCING OLD TABLE AS deleted_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_write_tombstones('container');
+
+CREATE TRIGGER core_tag_tombstone
+    AFTER DELETE ON core_tag
+    REFERENCING OLD TABLE AS deleted_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_write_tombstones('tag');
+
+CREATE TRIGGER core_container_tags_insert
+    AFTER INSERT ON core_container_tags
+    REFERENCING NEW TABLE AS changed_links
+    FOR EACH STATEMENT EXECUTE FUNCTION core_touch_tagged_containers();
+
+CREATE TRIGGER core_container_tags_delete
+    AFTER DELETE ON core_container_tags
+    REFERENCING OLD TABLE AS changed_links
+    FOR EACH STATEMENT EXECUTE FUNCTION core_touch_tagged_containers();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS core_container_tags_delete ON core_container_tags;
+DROP TRIGGER IF EXISTS core_container_tags_insert ON core_container_tags;
+DROP TRIGGER IF EXISTS core_tag_tombstone ON core_tag;
+DROP TRIGGER IF EXISTS core_container_tombstone ON core_container;
+DROP TRIGGER IF EXISTS core_tag_track_change ON core_tag;
+DROP TRIGGER IF EXISTS core_container_track_change ON core_container;
+DROP FUNCTION IF EXISTS core_touch_tagged_containers();
+DROP FUNCTION IF EXISTS core_write_tombstones();
+DROP FUNCTION IF EXISTS core_track_change();
+DROP SEQUENCE IF EXISTS core_change_seq;
+"""
+
+
+def backfill_changes(apps, schema_editor):
+    """Give existing rows a change in batches so no lock is held for long."""
+    with schema_editor.connection.cursor() as cursor:
+        for table in ('core_container', 'core_tag'):
+            cursor.execute(f'SELECT MIN(id), MAX(id) FROM {table}')
+            low, high = cursor.fetchone()
+            if low is None:
+                continue
+            for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+                cursor.execute(
+                    f'UPDATE {table} SET change_seq = NULL '
+                    f'WHERE id >= %s AND id < %s',
+                    [start, start + BACKFILL_BATCH_SIZE],
+                )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('change_xid', models.BigIntegerField()),
+                ('change_seq', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'change_xid', 'change_seq'], name='tombstone_user_change_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='container',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='container',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='container',
+            index=models.Index(fields=['user', 'change_xid', 'change_seq'], name='container_user_change_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(fields=['user', 'change_xid', 'change_seq'], name='tag_user_change_idx'),
+        ),
+    ]
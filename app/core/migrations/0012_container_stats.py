@@ -0,0 +1,192 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION core_add_container_stats(
+    user_ids bigint[], dimensions text[], vals text[], deltas bigint[]
+) RETURNS void AS $$
+    -- Sorted so concurrent writers lock a user's counts in one order.
+    INSERT INTO core_containerstat AS s (user_id, dimension, value, count)
+    SELECT user_id, dimension, value, delta
+    FROM unnest(user_ids, dimensions, vals, deltas)
+        AS d(user_id, dimension, value, delta)
+    WHERE delta <> 0
+    ORDER BY user_id, dimension, value
+    ON CONFLICT (user_id, dimension, value)
+    DO UPDATE SET count = s.count + EXCLUDED.count;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION core_count_containers() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, count(*) AS delta
+            FROM new_rows c, LATERAL (VALUES
+                ('total', ''),
+                ('bin_type', c.bin_type),
+                ('bin_size', c.bin_size)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+        ) AS changes;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, -count(*) AS delta
+            FROM old_rows c, LATERAL (VALUES
+                ('total', ''),
+                ('bin_type', c.bin_type),
+                ('bin_size', c.bin_size)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+        ) AS changes;
+    ELSE
+        -- Most updates leave both fields alone and net out to nothing.
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, sum(c.delta) AS delta
+            FROM (
+                SELECT user_id, bin_type, bin_size, 1 AS delta
+                FROM new_rows
+                UNION ALL
+                SELECT user_id, bin_type, bin_size, -1
+                FROM old_rows
+            ) AS c, LATERAL (VALUES
+                ('bin_type', c.bin_type),
+                ('bin_size', c.bin_size)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+            HAVING sum(c.delta) <> 0
+        ) AS changes;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_count_tagged_containers() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg('tag'::text),
+            array_agg(tag_id::text), array_agg(delta))
+        FROM (
+            SELECT t.user_id, l.tag_id, count(*) AS delta
+            FROM new_rows l JOIN core_tag t ON t.id = l.tag_id
+            GROUP BY 1, 2
+        ) AS changes;
+    ELSE
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg('tag'::text),
+            array_agg(tag_id::text), array_agg(delta))
+        FROM (
+            SELECT t.user_id, l.tag_id, -count(*) AS delta
+            FROM old_rows l JOIN core_tag t ON t.id = l.tag_id
+            GROUP BY 1, 2
+        ) AS changes;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_rebuild_container_stats(user_ids bigint[])
+RETURNS void AS $$
+BEGIN
+    -- Writers wait for the rebuild, and the rebuild for open writers, so
+    -- no change is counted twice or lost. Plain reads carry on.
+    LOCK TABLE core_containerstat IN EXCLUSIVE MODE;
+    DELETE FROM core_containerstat
+    WHERE user_ids IS NULL OR user_id = ANY(user_ids);
+    INSERT INTO core_containerstat (user_id, dimension, value, count)
+    SELECT c.user_id, d.dimension, d.value, count(*)
+    FROM core_container c, LATERAL (VALUES
+        ('total', ''),
+        ('bin_type', c.bin_type),
+        ('bin_size', c.bin_size)
+    ) AS d(dimension, value)
+    WHERE user_ids IS NULL OR c.user_id = ANY(user_ids)
+    GROUP BY 1, 2, 3
+    UNION ALL
+    SELECT t.user_id, 'tag', l.tag_id::text, count(*)
+    FROM core_container_tags l JOIN core_tag t ON t.id = l.tag_id
+    WHERE user_ids IS NULL OR t.user_id = ANY(user_ids)
+    GROUP BY 1, 3;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_container_stats_insert
+    AFTER INSERT ON core_container
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_count_containers();
+
+CREATE TRIGGER core_container_stats_update
+    AFTER UPDATE ON core_container
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_count_containers();
+
+CREATE TRIGGER core_container_stats_delete
+    AFTER DELETE ON core_container
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_count_containers();
+
+CREATE TRIGGER core_container_tags_stats_insert
+    AFTER INSERT ON core_container_tags
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_count_tagged_containers();
+
+CREATE TRIGGER core_container_tags_stats_delete
+    AFTER DELETE ON core_container_tags
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_count_tagged_containers();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS core_container_tags_stats_delete ON core_container_tags;
+DROP TRIGGER IF EXISTS core_container_tags_stats_insert ON core_container_tags;
+DROP TRIGGER IF EXISTS core_container_stats_delete ON core_container;
+DROP TRIGGER IF EXISTS core_container_stats_update ON core_container;
+DROP TRIGGER IF EXISTS core_container_stats_insert ON core_container;
+DROP FUNCTION IF EXISTS core_rebuild_container_stats(bigint[]);
+DROP FUNCTION IF EXISTS core_count_tagged_containers();
+DROP FUNCTION IF EXISTS core_count_containers();
+DROP FUNCTION IF EXISTS core_add_container_stats(
+    bigint[], text[], text[], bigint[]);
+"""
+
+
+def backfill_stats(apps, schema_editor):
+    """Count the containers that exist before the triggers."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT core_rebuild_container_stats(NULL)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContainerStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('dimension', models.CharField(max_length=16)),
+                ('value', models.CharField(max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='containerstat',
+            constraint=models.UniqueConstraint(fields=('user_id', 'dimension', 'value'), name='containerstat_unique_user_value'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:39
+
+import core.fields
+from django.db import migrations, models
+
+# Backfills that leave what clients see unchanged set this so the rows
+# are not sent to every client again on their next sync.
+SKIP_CHANGE_TRACKING = """
+CREATE OR REPLACE FUNCTION core_track_change() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('core.skip_change_tracking', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    NEW.change_xid := txid_current();
+    NEW.change_seq := nextval('core_change_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRACK_EVERY_CHANGE = """
+CREATE OR REPLACE FUNCTION core_track_change() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := txid_current();
+    NEW.change_seq := nextval('core_change_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_container_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BinSize',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BinType',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='container',
+            name='bin_size_ref',
+            field=core.fields.LookupField(db_column='bin_size_id', null=True, to='BinSize'),
+        ),
+        migrations.AddField(
+            model_name='container',
+            name='bin_type_ref',
+            field=core.fields.LookupField(db_column='bin_type_id', null=True, to='BinType'),
+        ),
+        migrations.RunSQL(SKIP_CHANGE_TRACKING, TRACK_EVERY_CHANGE),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:45
+
+from django.db import migrations, transaction
+
+BACKFILL_BATCH_SIZE = 10000
+
+ADD_LOOKUPS = """
+INSERT INTO {table} (name)
+SELECT DISTINCT {column} FROM core_container
+ORDER BY 1
+ON CONFLICT (name) DO NOTHING
+"""
+
+SET_LOOKUP_IDS = """
+UPDATE core_container c
+SET bin_type_id = t.id, bin_size_id = s.id
+FROM core_bintype t, core_binsize s
+WHERE t.name = c.bin_type AND s.name = c.bin_size
+    AND c.id >= %s AND c.id < %s
+    AND (c.bin_type_id IS NULL OR c.bin_size_id IS NULL)
+"""
+
+
+def backfill_lookups(apps, schema_editor):
+    """Point containers at their lookup rows, one committed batch at a time.
+
+    Only rows without IDs are written, so running it again after an
+    interruption carries on where it stopped.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        # Sorted, so existing values keep sorting alphabetically by ID.
+        for table, column in (
+            ('core_bintype', 'bin_type'),
+            ('core_binsize', 'bin_size'),
+        ):
+            cursor.execute(ADD_LOOKUPS.format(table=table, column=column))
+
+        cursor.execute('SELECT MIN(id), MAX(id) FROM core_container')
+        low, high = cursor.fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+            with transaction.atomic(using=connection.alias):
+                cursor.execute("SET LOCAL core.skip_change_tracking = 'on'")
+                cursor.execute(
+                    SET_LOOKUP_IDS,
+                    [start, start + BACKFILL_BATCH_SIZE],
+                )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_bin_lookups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lookups, migrations.RunPython.noop),
+    ]
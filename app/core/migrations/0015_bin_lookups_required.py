@@ -0,0 +1,361 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:50
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models, transaction
+
+import core.fields
+
+CATCH_UP = """
+INSERT INTO {table} (name)
+SELECT DISTINCT {column} FROM core_container
+WHERE bin_type_id IS NULL OR bin_size_id IS NULL
+ORDER BY 1
+ON CONFLICT (name) DO NOTHING
+"""
+
+SET_LOOKUP_IDS = """
+UPDATE core_container c
+SET bin_type_id = t.id, bin_size_id = s.id
+FROM core_bintype t, core_binsize s
+WHERE t.name = c.bin_type AND s.name = c.bin_size
+    AND (c.bin_type_id IS NULL OR c.bin_size_id IS NULL)
+"""
+
+# Bin types and sizes are counted by lookup ID from here on.
+COUNT_BY_ID = """
+CREATE OR REPLACE FUNCTION core_count_containers() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, count(*) AS delta
+            FROM new_rows c, LATERAL (VALUES
+                ('total', ''),
+                ('bin_type', c.bin_type_id::text),
+                ('bin_size', c.bin_size_id::text)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+        ) AS changes;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, -count(*) AS delta
+            FROM old_rows c, LATERAL (VALUES
+                ('total', ''),
+                ('bin_type', c.bin_type_id::text),
+                ('bin_size', c.bin_size_id::text)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+        ) AS changes;
+    ELSE
+        -- Most updates leave both fields alone and net out to nothing.
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, sum(c.delta) AS delta
+            FROM (
+                SELECT user_id, bin_type_id, bin_size_id, 1 AS delta
+                FROM new_rows
+                UNION ALL
+                SELECT user_id, bin_type_id, bin_size_id, -1
+                FROM old_rows
+            ) AS c, LATERAL (VALUES
+                ('bin_type', c.bin_type_id::text),
+                ('bin_size', c.bin_size_id::text)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+            HAVING sum(c.delta) <> 0
+        ) AS changes;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_rebuild_container_stats(user_ids bigint[])
+RETURNS void AS $$
+BEGIN
+    -- Writers wait for the rebuild, and the rebuild for open writers, so
+    -- no change is counted twice or lost. Plain reads carry on.
+    LOCK TABLE core_containerstat IN EXCLUSIVE MODE;
+    DELETE FROM core_containerstat
+    WHERE user_ids IS NULL OR user_id = ANY(user_ids);
+    INSERT INTO core_containerstat (user_id, dimension, value, count)
+    SELECT c.user_id, d.dimension, d.value, count(*)
+    FROM core_container c, LATERAL (VALUES
+        ('total', ''),
+        ('bin_type', c.bin_type_id::text),
+        ('bin_size', c.bin_size_id::text)
+    ) AS d(dimension, value)
+    WHERE user_ids IS NULL OR c.user_id = ANY(user_ids)
+    GROUP BY 1, 2, 3
+    UNION ALL
+    SELECT t.user_id, 'tag', l.tag_id::text, count(*)
+    FROM core_container_tags l JOIN core_tag t ON t.id = l.tag_id
+    WHERE user_ids IS NULL OR t.user_id = ANY(user_ids)
+    GROUP BY 1, 3;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+COUNT_BY_NAME = """
+CREATE OR REPLACE FUNCTION core_count_containers() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, count(*) AS delta
+            FROM new_rows c, LATERAL (VALUES
+                ('total', ''),
+                ('bin_type', c.bin_type),
+                ('bin_size', c.bin_size)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+        ) AS changes;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, -count(*) AS delta
+            FROM old_rows c, LATERAL (VALUES
+                ('total', ''),
+                ('bin_type', c.bin_type),
+                ('bin_size', c.bin_size)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+        ) AS changes;
+    ELSE
+        -- Most updates leave both fields alone and net out to nothing.
+        PERFORM core_add_container_stats(
+            array_agg(user_id), array_agg(dimension),
+            array_agg(value), array_agg(delta))
+        FROM (
+            SELECT c.user_id, d.dimension, d.value, sum(c.delta) AS delta
+            FROM (
+                SELECT user_id, bin_type, bin_size, 1 AS delta
+                FROM new_rows
+                UNION ALL
+                SELECT user_id, bin_type, bin_size, -1
+                FROM old_rows
+            ) AS c, LATERAL (VALUES
+                ('bin_type', c.bin_type),
+                ('bin_size', c.bin_size)
+            ) AS d(dimension, value)
+            GROUP BY 1, 2, 3
+            HAVING sum(c.delta) <> 0
+        ) AS changes;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_rebuild_container_stats(user_ids bigint[])
+RETURNS void AS $$
+BEGIN
+    -- Writers wait for the rebuild, and the rebuild for open writers, so
+    -- no change is counted twice or lost. Plain reads carry on.
+    LOCK TABLE core_containerstat IN EXCLUSIVE MODE;
+    DELETE FROM core_containerstat
+    WHERE user_ids IS NULL OR user_id = ANY(user_ids);
+    INSERT INTO core_containerstat (user_id, dimension, value, count)
+    SELECT c.user_id, d.dimension, d.value, count(*)
+    FROM core_container c, LATERAL (VALUES
+        ('total', ''),
+        ('bin_type', c.bin_type),
+        ('bin_size', c.bin_size)
+    ) AS d(dimension, value)
+    WHERE user_ids IS NULL OR c.user_id = ANY(user_ids)
+    GROUP BY 1, 2, 3
+    UNION ALL
+    SELECT t.user_id, 'tag', l.tag_id::text, count(*)
+    FROM core_container_tags l JOIN core_tag t ON t.id = l.tag_id
+    WHERE user_ids IS NULL OR t.user_id = ANY(user_ids)
+    GROUP BY 1, 3;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+# Until 0019 drops the old columns, code that only knows the old columns
+# and code that only knows the lookup IDs can run side by side during a
+# deploy. Whichever side a write leaves unset or stale is filled in.
+SYNC_LOOKUPS = """
+CREATE FUNCTION core_sync_bin_lookups() RETURNS trigger AS $$
+BEGIN
+    IF NEW.bin_type IS NOT NULL AND (NEW.bin_type_id IS NULL OR (
+        TG_OP = 'UPDATE' AND NEW.bin_type IS DISTINCT FROM OLD.bin_type
+        AND NEW.bin_type_id IS NOT DISTINCT FROM OLD.bin_type_id
+    )) THEN
+        INSERT INTO core_bintype (name) VALUES (NEW.bin_type)
+        ON CONFLICT (name) DO NOTHING;
+        SELECT id INTO NEW.bin_type_id
+        FROM core_bintype WHERE name = NEW.bin_type;
+    ELSIF NEW.bin_type_id IS NOT NULL THEN
+        SELECT name INTO NEW.bin_type
+        FROM core_bintype WHERE id = NEW.bin_type_id;
+    END IF;
+    IF NEW.bin_size IS NOT NULL AND (NEW.bin_size_id IS NULL OR (
+        TG_OP = 'UPDATE' AND NEW.bin_size IS DISTINCT FROM OLD.bin_size
+        AND NEW.bin_size_id IS NOT DISTINCT FROM OLD.bin_size_id
+    )) THEN
+        INSERT INTO core_binsize (name) VALUES (NEW.bin_size)
+        ON CONFLICT (name) DO NOTHING;
+        SELECT id INTO NEW.bin_size_id
+        FROM core_binsize WHERE name = NEW.bin_size;
+    ELSIF NEW.bin_size_id IS NOT NULL THEN
+        SELECT name INTO NEW.bin_size
+        FROM core_binsize WHERE id = NEW.bin_size_id;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_container_sync_bin_lookups
+BEFORE INSERT OR UPDATE ON core_container
+FOR EACH ROW EXECUTE FUNCTION core_sync_bin_lookups();
+"""
+
+DROP_SYNC_LOOKUPS = """
+DROP TRIGGER core_container_sync_bin_lookups ON core_container;
+DROP FUNCTION core_sync_bin_lookups();
+"""
+
+REQUIRE_LOOKUPS = [
+    'ALTER TABLE core_container ADD CONSTRAINT {column}_not_null '
+    'CHECK ({column} IS NOT NULL) NOT VALID',
+    'ALTER TABLE core_container VALIDATE CONSTRAINT {column}_not_null',
+    # Uses the validated check instead of scanning under an exclusive lock.
+    'ALTER TABLE core_container ALTER COLUMN {column} SET NOT NULL',
+    'ALTER TABLE core_container DROP CONSTRAINT {column}_not_null',
+    'ALTER TABLE core_container ADD CONSTRAINT core_container_{column}_fk '
+    'FOREIGN KEY ({column}) REFERENCES {table} (id) NOT VALID',
+    'ALTER TABLE core_container '
+    'VALIDATE CONSTRAINT core_container_{column}_fk',
+]
+
+RELAX_LOOKUPS = [
+    'ALTER TABLE core_container DROP CONSTRAINT core_container_{column}_fk',
+    'ALTER TABLE core_container ALTER COLUMN {column} DROP NOT NULL',
+]
+
+
+def lookup_sql(statements):
+    return [
+        statement.format(column=column, table=table)
+        for column, table in (
+            ('bin_type_id', 'core_bintype'),
+            ('bin_size_id', 'core_binsize'),
+        )
+        for statement in statements
+    ]
+
+
+def catch_up(apps, schema_editor):
+    """Point containers written since the backfill at their lookup rows."""
+    connection = schema_editor.connection
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        cursor.execute("SET LOCAL core.skip_change_tracking = 'on'")
+        for table, column in (
+            ('core_bintype', 'bin_type'),
+            ('core_binsize', 'bin_size'),
+        ):
+            cursor.execute(CATCH_UP.format(table=table, column=column))
+        cursor.execute(SET_LOOKUP_IDS)
+
+
+def count_by(sql):
+    """Replace the stats functions with `sql` and recount in one go."""
+    def forwards(apps, schema_editor):
+        connection = schema_editor.connection
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.execute('SELECT core_rebuild_container_stats(NULL)')
+    return forwards
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_backfill_bin_lookups'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SYNC_LOOKUPS, DROP_SYNC_LOOKUPS),
+        migrations.RunPython(catch_up, migrations.RunPython.noop),
+        migrations.RunPython(
+            count_by(COUNT_BY_ID),
+            count_by(COUNT_BY_NAME),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    lookup_sql(REQUIRE_LOOKUPS),
+                    lookup_sql(RELAX_LOOKUPS),
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='container',
+                    name='bin_size_ref',
+                    field=core.fields.LookupField(db_column='bin_size_id', to='BinSize'),
+                ),
+                migrations.AlterField(
+                    model_name='container',
+                    name='bin_type_ref',
+                    field=core.fields.LookupField(db_column='bin_type_id', to='BinType'),
+                ),
+            ],
+        ),
+        RemoveIndexConcurrently(
+            model_name='container',
+            name='container_user_bin_type_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='container',
+            name='container_user_bin_size_idx',
+        ),
+        # The old columns stay until 0019, for code still writing them.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='container',
+                    name='bin_size',
+                ),
+                migrations.RemoveField(
+                    model_name='container',
+                    name='bin_type',
+                ),
+            ],
+        ),
+        migrations.RenameField(
+            model_name='container',
+            old_name='bin_size_ref',
+            new_name='bin_size',
+        ),
+        migrations.RenameField(
+            model_name='container',
+            old_name='bin_type_ref',
+            new_name='bin_type',
+        ),
+        AddIndexConcurrently(
+            model_name='container',
+            index=models.Index(fields=['user', 'bin_type', 'id'], name='container_user_bin_type_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='container',
+            index=models.Index(fields=['user', 'bin_size', 'id'], name='container_user_bin_size_idx'),
+        ),
+    ]
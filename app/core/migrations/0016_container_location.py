@@ -0,0 +1,58 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:51
+
+from django.contrib.postgres.indexes import GistIndex
+from django.contrib.postgres.operations import AddIndexConcurrently
+import django.core.validators
+from django.db import migrations, models
+
+import core.geo
+
+# Validated separately, so writes are only blocked while it is added.
+ADD_LOCATION_CHECK = [
+    'ALTER TABLE core_container ADD CONSTRAINT container_valid_location '
+    'CHECK ((latitude IS NULL AND longitude IS NULL) OR '
+    '(latitude >= -90 AND latitude <= 90 AND '
+    'longitude >= -180 AND longitude <= 180)) NOT VALID',
+    'ALTER TABLE core_container VALIDATE CONSTRAINT container_valid_location',
+]
+
+DROP_LOCATION_CHECK = (
+    'ALTER TABLE core_container DROP CONSTRAINT container_valid_location'
+)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0015_bin_lookups_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='container',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='container',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(ADD_LOCATION_CHECK, DROP_LOCATION_CHECK),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='container',
+                    constraint=models.CheckConstraint(check=models.Q(models.Q(('latitude__isnull', True), ('longitude__isnull', True)), models.Q(('latitude__gte', -90), ('latitude__lte', 90), ('longitude__gte', -180), ('longitude__lte', 180)), _connector='OR'), name='container_valid_location'),
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='container',
+            index=GistIndex(core.geo.Point(models.F('longitude'), models.F('latitude')), name='container_location_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:10
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Django cannot create a partitioned table or a composite primary key,
+# so the table is created here and the model only describes it.
+CREATE_READINGS = """
+CREATE TABLE core_reading (
+    container_id bigint NOT NULL,
+    recorded_at timestamp with time zone NOT NULL,
+    fill_level double precision NOT NULL,
+    temperature double precision NULL,
+    CONSTRAINT core_reading_pkey PRIMARY KEY (container_id, recorded_at),
+    CONSTRAINT reading_valid_fill_level
+        CHECK (fill_level >= 0 AND fill_level <= 100),
+    CONSTRAINT core_reading_container_id_fk
+        FOREIGN KEY (container_id) REFERENCES core_container (id)
+        ON DELETE CASCADE
+) PARTITION BY RANGE (recorded_at);
+
+-- Adds the partition for the month holding `month`, if it is missing.
+-- The partition is created on its own and then attached, which unlike
+-- CREATE TABLE ... PARTITION OF does not block reads and writes of the
+-- other months.
+CREATE FUNCTION core_create_reading_partition(month date)
+RETURNS boolean AS $$
+DECLARE
+    first_day date := date_trunc('month', month::timestamp)::date;
+    partition text := 'core_reading_p' || to_char(first_day, 'YYYY_MM');
+    starts timestamptz := first_day::timestamp AT TIME ZONE 'UTC';
+    ends timestamptz :=
+        (first_day + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+BEGIN
+    -- Two workers may see the month missing at the same time.
+    PERFORM pg_advisory_xact_lock(hashtext('core_reading_partitions'));
+    IF to_regclass(partition) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE core_reading INCLUDING ALL)', partition
+    );
+    EXECUTE format(
+        'ALTER TABLE core_reading ATTACH PARTITION %I '
+        'FOR VALUES FROM (%L) TO (%L)', partition, starts, ends
+    );
+    RETURN true;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_READINGS = """
+DROP TABLE core_reading;
+DROP FUNCTION core_create_reading_partition(date);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_container_location'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_READINGS, DROP_READINGS),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='Reading',
+                    fields=[
+                        ('recorded_at', models.DateTimeField(primary_key=True, serialize=False)),
+                        ('fill_level', models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                        ('temperature', models.FloatField(blank=True, null=True)),
+                        ('container', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='readings', to='core.container')),
+                    ],
+                ),
+                migrations.AddConstraint(
+                    model_name='reading',
+                    constraint=models.CheckConstraint(check=models.Q(('fill_level__gte', 0), ('fill_level__lte', 100)), name='reading_valid_fill_level'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Each bucket is found by its start, the UTC epoch rounded down to the
+# period, so the buckets do not depend on the session time zone. Hours
+# and days are summed from the 5 minute buckets of the same rows.
+ROLL_UP = """
+WITH five_minutes AS (
+    SELECT
+        container_id,
+        to_timestamp(floor(extract(epoch FROM recorded_at) / 300) * 300)
+            AS starts_at,
+        count(*) AS count,
+        sum(fill_level) AS fill_level_sum,
+        min(fill_level) AS fill_level_min,
+        max(fill_level) AS fill_level_max,
+        count(temperature) AS temperature_count,
+        coalesce(sum(temperature), 0) AS temperature_sum,
+        min(temperature) AS temperature_min,
+        max(temperature) AS temperature_max
+    FROM {source}
+    GROUP BY 1, 2
+), buckets AS (
+    SELECT container_id, '5m' AS period, starts_at, count,
+        fill_level_sum, fill_level_min, fill_level_max, temperature_count,
+        temperature_sum, temperature_min, temperature_max
+    FROM five_minutes
+    UNION ALL
+    SELECT container_id, p.period,
+        to_timestamp(floor(extract(epoch FROM starts_at) / p.seconds)
+            * p.seconds),
+        sum(count), sum(fill_level_sum), min(fill_level_min),
+        max(fill_level_max), sum(temperature_count), sum(temperature_sum),
+        min(temperature_min), max(temperature_max)
+    FROM five_minutes, (VALUES ('1h', 3600), ('1d', 86400))
+        AS p(period, seconds)
+    GROUP BY 1, 2, 3
+)
+INSERT INTO core_readingrollup AS r (
+    container_id, period, starts_at, count, fill_level_sum,
+    fill_level_min, fill_level_max, temperature_count, temperature_sum,
+    temperature_min, temperature_max
+)
+-- Sorted so concurrent batches lock shared buckets in one order.
+SELECT * FROM buckets
+ORDER BY container_id, period, starts_at
+ON CONFLICT (container_id, period, starts_at) DO UPDATE SET
+    count = r.count + EXCLUDED.count,
+    fill_level_sum = r.fill_level_sum + EXCLUDED.fill_level_sum,
+    fill_level_min = least(r.fill_level_min, EXCLUDED.fill_level_min),
+    fill_level_max = greatest(r.fill_level_max, EXCLUDED.fill_level_max),
+    temperature_count = r.temperature_count + EXCLUDED.temperature_count,
+    temperature_sum = r.temperature_sum + EXCLUDED.temperature_sum,
+    temperature_min = least(r.temperature_min, EXCLUDED.temperature_min),
+    temperature_max = greatest(r.temperature_max, EXCLUDED.temperature_max)
+"""
+
+CREATE_ROLLUPS = """
+CREATE TABLE core_readingrollup (
+    container_id bigint NOT NULL,
+    period varchar(2) NOT NULL,
+    starts_at timestamp with time zone NOT NULL,
+    count integer NOT NULL,
+    fill_level_sum double precision NOT NULL,
+    fill_level_min double precision NOT NULL,
+    fill_level_max double precision NOT NULL,
+    temperature_count integer NOT NULL,
+    temperature_sum double precision NOT NULL,
+    temperature_min double precision NULL,
+    temperature_max double precision NULL,
+    CONSTRAINT core_readingrollup_pkey
+        PRIMARY KEY (container_id, period, starts_at),
+    CONSTRAINT core_readingrollup_container_id_fk
+        FOREIGN KEY (container_id) REFERENCES core_container (id)
+        ON DELETE CASCADE
+) WITH (fillfactor = 70);
+
+-- Rows skipped by ON CONFLICT DO NOTHING are not in new_rows, so a
+-- resent batch is not counted twice.
+CREATE FUNCTION core_roll_up_readings() RETURNS trigger AS $$
+BEGIN
+    %(roll_up_new_rows)s;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_reading_rollups
+    AFTER INSERT ON core_reading
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_roll_up_readings();
+
+-- Creating the trigger locks out writers until the migration commits,
+-- so no reading is missed or counted twice.
+%(roll_up_readings)s;
+""" % {
+    'roll_up_new_rows': ROLL_UP.format(source='new_rows').strip(),
+    'roll_up_readings': ROLL_UP.format(source='core_reading').strip(),
+}
+
+DROP_ROLLUPS = """
+DROP TRIGGER core_reading_rollups ON core_reading;
+DROP FUNCTION core_roll_up_readings();
+DROP TABLE core_readingrollup;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_readings'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_ROLLUPS, DROP_ROLLUPS),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='ReadingRollup',
+                    fields=[
+                        ('period', models.CharField(choices=[('5m', '5 minutes'), ('1h', 'Hour'), ('1d', 'Day')], max_length=2)),
+                        ('starts_at', models.DateTimeField(primary_key=True, serialize=False)),
+                        ('count', models.IntegerField()),
+                        ('fill_level_sum', models.FloatField()),
+                        ('fill_level_min', models.FloatField()),
+                        ('fill_level_max', models.FloatField()),
+                        ('temperature_count', models.IntegerField()),
+                        ('temperature_sum', models.FloatField()),
+                        ('temperature_min', models.FloatField(null=True)),
+                        ('temperature_max', models.FloatField(null=True)),
+                        ('container', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reading_rollups', to='core.container')),
+                    ],
+                ),
+            ],
+        ),
+    ]
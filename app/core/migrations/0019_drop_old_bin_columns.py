@@ -0,0 +1,72 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:05
+
+from django.db import migrations
+
+DROP_OLD_COLUMNS = """
+DROP TRIGGER core_container_sync_bin_lookups ON core_container;
+DROP FUNCTION core_sync_bin_lookups();
+ALTER TABLE core_container DROP COLUMN bin_type, DROP COLUMN bin_size;
+"""
+
+# Puts back the old columns and the trigger that keeps them in step, as
+# 0015 left them.
+RESTORE_OLD_COLUMNS = """
+ALTER TABLE core_container
+    ADD COLUMN bin_type varchar(255),
+    ADD COLUMN bin_size varchar(255);
+
+SET LOCAL core.skip_change_tracking = 'on';
+UPDATE core_container c
+SET bin_type = t.name, bin_size = s.name
+FROM core_bintype t, core_binsize s
+WHERE t.id = c.bin_type_id AND s.id = c.bin_size_id;
+
+ALTER TABLE core_container
+    ALTER COLUMN bin_type SET NOT NULL,
+    ALTER COLUMN bin_size SET NOT NULL;
+
+CREATE FUNCTION core_sync_bin_lookups() RETURNS trigger AS $$
+BEGIN
+    IF NEW.bin_type IS NOT NULL AND (NEW.bin_type_id IS NULL OR (
+        TG_OP = 'UPDATE' AND NEW.bin_type IS DISTINCT FROM OLD.bin_type
+        AND NEW.bin_type_id IS NOT DISTINCT FROM OLD.bin_type_id
+    )) THEN
+        INSERT INTO core_bintype (name) VALUES (NEW.bin_type)
+        ON CONFLICT (name) DO NOTHING;
+        SELECT id INTO NEW.bin_type_id
+        FROM core_bintype WHERE name = NEW.bin_type;
+    ELSIF NEW.bin_type_id IS NOT NULL THEN
+        SELECT name INTO NEW.bin_type
+        FROM core_bintype WHERE id = NEW.bin_type_id;
+    END IF;
+    IF NEW.bin_size IS NOT NULL AND (NEW.bin_size_id IS NULL OR (
+        TG_OP = 'UPDATE' AND NEW.bin_size IS DISTINCT FROM OLD.bin_size
+        AND NEW.bin_size_id IS NOT DISTINCT FROM OLD.bin_size_id
+    )) THEN
+        INSERT INTO core_binsize (name) VALUES (NEW.bin_size)
+        ON CONFLICT (name) DO NOTHING;
+        SELECT id INTO NEW.bin_size_id
+        FROM core_binsize WHERE name = NEW.bin_size;
+    ELSIF NEW.bin_size_id IS NOT NULL THEN
+        SELECT name INTO NEW.bin_size
+        FROM core_binsize WHERE id = NEW.bin_size_id;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_container_sync_bin_lookups
+BEFORE INSERT OR UPDATE ON core_container
+FOR EACH ROW EXECUTE FUNCTION core_sync_bin_lookups();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_reading_rollups'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_OLD_COLUMNS, RESTORE_OLD_COLUMNS),
+    ]
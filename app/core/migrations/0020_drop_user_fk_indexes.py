@@ -0,0 +1,51 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def drop_user_index(model_name, table, name):
+    """Drop the index Django made for a `user` foreign key, without locking.
+
+    The state only records `db_index=False`, since AlterField would drop
+    the index with a plain DROP INDEX.
+    """
+    return migrations.SeparateDatabaseAndState(
+        database_operations=[
+            migrations.RunSQL(
+                sql=f'DROP INDEX CONCURRENTLY IF EXISTS "{name}";',
+                reverse_sql=f'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+                            f'"{name}" ON "{table}" ("user_id");',
+            ),
+        ],
+        state_operations=[
+            migrations.AlterField(
+                model_name=model_name,
+                name='user',
+                field=models.ForeignKey(
+                    db_index=False,
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to=settings.AUTH_USER_MODEL,
+                ),
+            ),
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0019_drop_old_bin_columns'),
+    ]
+
+    operations = [
+        drop_user_index(
+            'container',
+            'core_container',
+            'core_container_user_id_fb8fc2c1',
+        ),
+        drop_user_index('tag', 'core_tag', 'core_tag_user_id_1b670500'),
+    ]
@@ -2,12 +2,24 @@
 Database models.
 """
 from django.conf import settings
+from django.core.validators import (
+    MaxValueValidator,
+    MinValueValidator,
+)
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
+from django.contrib.postgres.indexes import (
+    GinIndex,
+    GistIndex,
+)
+from django.contrib.postgres.search import SearchVectorField
+
+from core.fields import LookupField
+from core.geo import location
 
 
 class UserManager(BaseUserManager):
@@ -45,17 +57,98 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class BinType(models.Model):
+    """Distinct bin type, shared by every user's containers."""
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class BinSize(models.Model):
+    """Distinct bin size, shared by every user's containers."""
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Container(models.Model):
     """Bin Object."""
+    # Indexes and constraints below lead with the user, so the foreign key
+    # needs no index of its own.
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
     )
     bin_id = models.CharField(max_length=255)
-    bin_size = models.CharField(max_length=255)
-    bin_type = models.CharField(max_length=255)
+    # Strings in Python, small integer foreign keys in the database.
+    bin_size = LookupField('BinSize', db_column='bin_size_id')
+    bin_type = LookupField('BinType', db_column='bin_type_id')
     description = models.TextField(blank=True)
+    # WGS 84 degrees, either both set or both empty.
+    latitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
     tags = models.ManyToManyField('Tag')
+    # Maintained by a database trigger from bin_id and description, so
+    # bulk_create, bulk_update and COPY keep it current too.
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Set by a database trigger on every write, see Tombstone.
+    change_xid = models.BigIntegerField(null=True, editable=False)
+    change_seq = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='container_user_id_idx'),
+            models.Index(
+                fields=['user', 'bin_type', 'id'],
+                name='container_user_bin_type_idx',
+            ),
+            models.Index(
+                fields=['user', 'bin_size', 'id'],
+                name='container_user_bin_size_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='container_search_idx'),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='container_user_updated_idx',
+            ),
+            models.Index(
+                fields=['user', 'change_xid', 'change_seq'],
+                name='container_user_change_idx',
+            ),
+            GistIndex(location(), name='container_location_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'bin_id'],
+                name='container_unique_user_bin_id',
+            ),
+            models.CheckConstraint(
+                check=models.Q(
+                    latitude__isnull=True,
+                    longitude__isnull=True,
+                ) | models.Q(
+                    latitude__gte=-90,
+                    latitude__lte=90,
+                    longitude__gte=-180,
+                    longitude__lte=180,
+                ),
+                name='container_valid_location',
+            ),
+        ]
 
     def __str__(self):
         return self.bin_id
@@ -64,10 +157,168 @@ class Container(models.Model):
 class Tag(models.Model):
     """Tag for filtering bins."""
     name = models.CharField(max_length=255)
+    # Served by the (user, name) constraint, as for containers.
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    change_xid = models.BigIntegerField(null=True, editable=False)
+    change_seq = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'change_xid', 'change_seq'],
+                name='tag_user_change_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='tag_unique_user_name',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class Tombstone(models.Model):
+    """Record of a deleted container or tag, kept for delta syncs.
+
+    Containers and tags carry the ID of the transaction that last wrote
+    them and a value from a shared sequence, both set by database
+    triggers. Deleting either writes a tombstone with the same pair, so
+    clients can fetch every change after a point in one ordered stream.
+    """
+    CONTAINER = 'container'
+    TAG = 'tag'
+
+    # Not a foreign key: tombstones are written while a user's containers
+    # are being deleted, possibly along with the user.
+    user_id = models.BigIntegerField()
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    change_xid = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user_id', 'change_xid', 'change_seq'],
+                name='tombstone_user_change_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+
+class ContainerStat(models.Model):
+    """Number of a user's containers with one bin type, bin size or tag.
+
+    Kept current by statement-level database triggers on containers and
+    their tag links, so every write path, including bulk writes and COPY,
+    adjusts the counts. Tag counts are keyed by tag ID and survive
+    renames. Counts that drop to zero are left in place until the next
+    rebuild.
+    """
+    TOTAL = 'total'
+    BIN_TYPE = 'bin_type'
+    BIN_SIZE = 'bin_size'
+    TAG = 'tag'
+
+    # Not a foreign key, like tombstones: counts are adjusted while a
+    # user's containers are being deleted, possibly along with the user.
+    user_id = models.BigIntegerField()
+    dimension = models.CharField(max_length=16)
+    value = models.CharField(max_length=255)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_id', 'dimension', 'value'],
+                name='containerstat_unique_user_value',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension} {self.value}: {self.count}'
+
+
+class Reading(models.Model):
+    """Fill level and temperature reported by a container's sensor.
+
+    Stored in `core_reading`, partitioned by month of `recorded_at`, whose
+    primary key is `(container_id, recorded_at)`. Django has no composite
+    primary keys, so `recorded_at` stands in for it here: readings are
+    written and deleted with queries, never with `save()` or `delete()`.
+    The database deletes a container's readings along with it.
+    """
+    # The primary key index leads with container_id.
+    container = models.ForeignKey(
+        Container,
+        on_delete=models.DO_NOTHING,
+        related_name='readings',
+        db_index=False,
+    )
+    recorded_at = models.DateTimeField(primary_key=True)
+    fill_level = models.FloatField(
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+    )
+    temperature = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(fill_level__gte=0, fill_level__lte=100),
+                name='reading_valid_fill_level',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.container_id} at {self.recorded_at}'
+
+
+class ReadingRollup(models.Model):
+    """Readings of a container summed over a 5 minute, hour or day bucket.
+
+    Stored in `core_readingrollup`, whose primary key is `(container_id,
+    period, starts_at)`, so like `Reading` it is only written with
+    queries. A statement-level trigger on `core_reading` adds every batch
+    of new readings to all three periods. Buckets start on UTC boundaries
+    and outlive the raw readings when old partitions are dropped.
+    """
+    FIVE_MINUTES = '5m'
+    HOUR = '1h'
+    DAY = '1d'
+    PERIOD_CHOICES = [
+        (FIVE_MINUTES, '5 minutes'),
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+
+    # The primary key index leads with container_id.
+    container = models.ForeignKey(
+        Container,
+        on_delete=models.DO_NOTHING,
+        related_name='reading_rollups',
+        db_index=False,
+    )
+    period = models.CharField(max_length=2, choices=PERIOD_CHOICES)
+    starts_at = models.DateTimeField(primary_key=True)
+    count = models.IntegerField()
+    fill_level_sum = models.FloatField()
+    fill_level_min = models.FloatField()
+    fill_level_max = models.FloatField()
+    temperature_count = models.IntegerField()
+    temperature_sum = models.FloatField()
+    temperature_min = models.FloatField(null=True)
+    temperature_max = models.FloatField(null=True)
+
+    def __str__(self):
+        return f'{self.container_id} {self.period} from {self.starts_at}'
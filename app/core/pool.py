@@ -0,0 +1,182 @@
+"""
+In-process database connection pool.
+"""
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import (
+    PoolError,
+    ThreadedConnectionPool,
+)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No pooled connection became free in time."""
+
+
+def is_usable(conn):
+    """Return True if `conn` can still run a query."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not conn.autocommit:
+            conn.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class ConnectionPool(ThreadedConnectionPool):
+    """Thread-safe psycopg2 pool that waits for a free connection.
+
+    psycopg2's pool raises as soon as `maxconn` connections are checked
+    out. This one waits up to `timeout` seconds for one to be returned,
+    can check idle connections before handing them out and counts
+    checkouts, waits and timeouts for the saturation metrics. New
+    connections come from `connect`, so they are set up like any other
+    Django connection. `minconn` connections are opened up front, and
+    unlike psycopg2's pool, which closes any returned connection beyond
+    `minconn`, every returned connection is kept for reuse, up to
+    `maxconn`.
+    """
+
+    def __init__(self, minconn, maxconn, connect, timeout=5, check=False):
+        self.connect = connect
+        self.timeout = timeout
+        self.check = check
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.peak_in_use = 0
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._stats_lock = threading.Lock()
+        super().__init__(minconn, maxconn)
+
+    def _connect(self, key=None):
+        conn = self.connect()
+        if key is not None:
+            self._used[key] = conn
+            self._rused[id(conn)] = key
+        else:
+            self._pool.append(conn)
+        return conn
+
+    def _putconn(self, conn, key=None, close=False):
+        # Called by putconn with the pool lock held.
+        if self.closed:
+            raise PoolError('connection pool is closed')
+        if key is None:
+            key = self._rused.get(id(conn))
+            if key is None:
+                raise PoolError('trying to put unkeyed connection')
+
+        if not close and not conn.closed:
+            # Leave the connection in a clean state for the next checkout.
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        if close or len(self._pool) >= self.maxconn:
+            conn.close()
+        else:
+            self._pool.append(conn)
+
+        del self._used[key]
+        del self._rused[id(conn)]
+
+    def _acquire_slot(self):
+        if self._slots.acquire(blocking=False):
+            return
+        started = time.monotonic()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._stats_lock:
+            self.waits += 1
+            self.wait_seconds += time.monotonic() - started
+            if not acquired:
+                self.timeouts += 1
+        if not acquired:
+            raise PoolTimeout(
+                f'No connection became free within {self.timeout} seconds '
+                f'({self.maxconn} in use).'
+            )
+
+    def getconn(self, key=None):
+        """Check out a connection, waiting while all of them are in use."""
+        self._acquire_slot()
+        try:
+            conn = super().getconn(key)
+            if self.check and not is_usable(conn):
+                super().putconn(conn, close=True)
+                conn = super().getconn(key)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._stats_lock:
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, len(self._used))
+        return conn
+
+    def putconn(self, conn=None, key=None, close=False):
+        """Return a connection, rolling back any open transaction."""
+        try:
+            super().putconn(conn, key, close or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """Return the pool size and saturation counters."""
+        with self._lock:
+            in_use = len(self._used)
+            idle = len(self._pool)
+        with self._stats_lock:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'in_use': in_use,
+                'idle': idle,
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_seconds': round(self.wait_seconds, 6),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect, options, check=False):
+    """Return the pool for database `alias`, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(
+                options['MIN_SIZE'],
+                options['MAX_SIZE'],
+                connect,
+                timeout=options['TIMEOUT'],
+                check=check,
+            )
+        return pool
+
+
+def pool_stats():
+    """Return the statistics of every pool in this process by alias."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+def close_pools():
+    """Close every pooled connection in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
@@ -0,0 +1,44 @@
+"""
+JSON renderers for the APIs.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Render JSON with orjson, which is several times faster than `json`.
+
+    The output matches `JSONRenderer` with its compact UTF-8 defaults,
+    except that NaN and infinite floats become null. Values orjson does
+    not handle itself, such as lazy translations and decimals, go through
+    DRF's encoder. Indented output, which the browsable API asks for, is
+    left to `JSONRenderer`, and so is everything when orjson is not
+    installed.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or \
+                not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z,
+        )
+        # Escaped by JSONRenderer too, so the output is valid JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9',
+                b'\\u2029',
+            )
+        return ret
@@ -0,0 +1,132 @@
+"""
+Database routing between the primary and its read replicas.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    connections,
+)
+
+
+_scope = ContextVar('replica_routing_scope', default=None)
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """Route the reads in the block to a single database.
+
+    The first read picks a replica and later reads reuse it, so a request
+    never sees two replicas at different points of replication. With
+    `pinned` every read goes to the primary.
+    """
+    token = _scope.set({'pinned': pinned, 'replica': None})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def pin_to_primary():
+    """Send every read in the block to the primary."""
+    scope = _scope.get()
+    if scope is None:
+        with routing_scope(pinned=True):
+            yield
+        return
+
+    pinned = scope['pinned']
+    scope['pinned'] = True
+    try:
+        yield
+    finally:
+        scope['pinned'] = pinned
+
+
+class ReplicaRouter:
+    """Send reads to the aliases in `settings.DATABASE_REPLICAS`.
+
+    Replicas are picked round-robin, once per `routing_scope`, or per
+    query outside one. Writes always go to the primary, and so do reads
+    inside a transaction on the primary, which may follow a write. A
+    replica that cannot be reached is skipped for
+    `REPLICA_RETRY_SECONDS`, and reads go to the primary while no replica
+    is available.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def get_replicas(self):
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            if scope['pinned']:
+                return DEFAULT_DB_ALIAS
+            if scope['replica'] is not None:
+                return scope['replica']
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        alias = self.choose_replica()
+        if scope is not None:
+            scope['replica'] = alias
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *self.get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self.get_replicas():
+            return False
+        return None
+
+    def choose_replica(self):
+        """Return the next available replica, or the primary."""
+        replicas = self.get_replicas()
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+
+        with self._lock:
+            start = next(self._counter)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if self.is_available(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def is_available(self, alias):
+        """Return False if the replica `alias` cannot be reached."""
+        down_until = self._down_until.get(alias)
+        if down_until is not None and time.monotonic() < down_until:
+            return False
+
+        connection = connections[alias]
+        try:
+            connection.close_if_health_check_failed()
+            connection.ensure_connection()
+        except DatabaseError:
+            self._down_until[alias] = (
+                time.monotonic() + settings.REPLICA_RETRY_SECONDS
+            )
+            return False
+
+        self._down_until.pop(alias, None)
+        return True
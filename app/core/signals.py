@@ -0,0 +1,71 @@
+"""
+Signal handlers for the core app.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+)
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.cache import response_cache
+from core.fields import clear_lookup_caches
+from core.metrics import install_query_recorder
+from core.models import (
+    Container,
+    Tag,
+)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token as soon as it is deleted."""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached copies of a user whenever the user changes."""
+    if created:
+        return
+
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key',
+        flat=True,
+    ))
+    if keys:
+        token_cache.delete(*keys)
+
+
+@receiver(connection_created)
+def record_connection_queries(sender, connection, **kwargs):
+    """Count the queries of every connection towards request metrics."""
+    install_query_recorder(connection)
+
+
+@receiver(post_migrate)
+def forget_lookup_ids(sender, **kwargs):
+    """Drop cached lookup IDs, which a migrate or flush may change."""
+    clear_lookup_caches()
+
+
+@receiver(post_save, sender=Container)
+@receiver(post_delete, sender=Container)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_response_version(sender, instance, **kwargs):
+    """Invalidate the cached lists of the owner of a container or tag."""
+    response_cache.bump(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Container.tags.through)
+def bump_tagged_response_version(sender, instance, action, **kwargs):
+    """Invalidate cached lists when a container's tags change."""
+    if action.startswith('post_'):
+        response_cache.bump(instance.user_id)
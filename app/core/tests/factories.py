@@ -0,0 +1,23 @@
+"""
+Factories for the models, shared by the tests.
+"""
+from django.contrib.auth import get_user_model
+
+from core.models import Container
+
+
+def create_container(user, **params):
+    """Create and return a sample container."""
+    defaults = {
+        'bin_id': '8607',
+        'bin_size': '32m',
+        'bin_type': 'Open Skip',
+    }
+    defaults.update(params)
+
+    return Container.objects.create(user=user, **defaults)
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
@@ -0,0 +1,135 @@
+"""
+Tests for the async view adapters.
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import path
+
+from rest_framework.authtoken.models import Token
+
+from core.async_views import (
+    HASHING,
+    async_patterns,
+    async_view,
+)
+from core.models import Container
+from container.views import ContainerViewSet
+
+
+class AsyncViewTests(SimpleTestCase):
+    """Test running synchronous views from async ones."""
+
+    def test_requests_run_concurrently(self):
+        """Test two requests are served at the same time."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def view(request):
+            barrier.wait()
+            return HttpResponse(threading.current_thread().name)
+
+        wrapped = async_view(view)
+        request = RequestFactory().get('/')
+
+        async def serve_both():
+            return await asyncio.gather(wrapped(request), wrapped(request))
+
+        responses = async_to_sync(serve_both)()
+
+        self.assertEqual([res.status_code for res in responses], [200, 200])
+        self.assertNotEqual(responses[0].content, responses[1].content)
+
+    def test_named_executor(self):
+        """Test a view can run on the password hashing pool."""
+        def view(request):
+            return HttpResponse(threading.current_thread().name)
+
+        wrapped = async_view(view, HASHING)
+
+        res = async_to_sync(wrapped)(RequestFactory().get('/'))
+
+        self.assertTrue(res.content.startswith(b'async-hashing'))
+
+    def test_view_attributes_kept(self):
+        """Test attributes such as csrf_exempt survive wrapping."""
+        view = ContainerViewSet.as_view({'get': 'list'})
+
+        wrapped = async_view(view)
+
+        self.assertTrue(asyncio.iscoroutinefunction(wrapped))
+        self.assertTrue(wrapped.csrf_exempt)
+
+    @override_settings(ASYNC_VIEWS=False)
+    def test_patterns_unchanged_when_disabled(self):
+        """Test patterns are left alone without ASYNC_VIEWS."""
+        view = ContainerViewSet.as_view({'get': 'list'})
+        patterns = [path('a/', view, name='a')]
+
+        async_patterns(patterns, {'a'})
+
+        self.assertIs(patterns[0].callback, view)
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_named_patterns_wrapped(self):
+        """Test only the named patterns are served asynchronously."""
+        view = ContainerViewSet.as_view({'get': 'list'})
+        patterns = [path('a/', view, name='a'), path('b/', view, name='b')]
+
+        async_patterns(patterns, {'a'})
+
+        self.assertTrue(asyncio.iscoroutinefunction(patterns[0].callback))
+        self.assertIs(patterns[1].callback, view)
+
+
+class AsyncContainerListTests(TransactionTestCase):
+    """Test the container list through the async adapter.
+
+    The view runs on another thread with its own database connection, so
+    the data has to be committed.
+    """
+
+    def setUp(self):
+        # Let the pool thread close its connections after the request, so
+        # the test database can be dropped.
+        for alias in connections:
+            patcher = patch.dict(
+                connections[alias].settings_dict,
+                {'CONN_MAX_AGE': 0},
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_list_containers(self):
+        """Test listing containers with token authentication."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        token = Token.objects.create(user=user)
+        Container.objects.create(
+            user=user,
+            bin_id='8607',
+            bin_size='32m',
+            bin_type='Open Skip',
+        )
+        view = async_view(ContainerViewSet.as_view({'get': 'list'}))
+        request = RequestFactory().get(
+            '/api/container/containers/',
+            HTTP_AUTHORIZATION=f'Token {token.key}',
+        )
+
+        res = async_to_sync(view)(request)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'"bin_id":"8607"', res.content)
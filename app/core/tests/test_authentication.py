@@ -0,0 +1,194 @@
+"""
+Tests for cached token authentication.
+"""
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.cache import LocalTTLCache
+
+
+ME_URL = reverse('user:me')
+
+
+class LocalTTLCacheTests(TestCase):
+    """Test the in-process TTL cache."""
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL has passed."""
+        now = [0]
+        cache = LocalTTLCache(maxsize=10, ttl=5, timer=lambda: now[0])
+        cache.set('a', 1)
+
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 5
+        self.assertIsNone(cache.get('a'))
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted when full."""
+        cache = LocalTTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with a cached token."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test User',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_second_request_skips_token_query(self):
+        """Test a cached token is authenticated without a query."""
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_cached_user_copied_per_request(self):
+        """Test changes to one request's user do not reach the next."""
+        token_cache.set(self.token.key, self.user)
+        self.user.name = 'Changed'
+
+        first = token_cache.get(self.token.key)
+        first.name = 'Changed again'
+        second = token_cache.get(self.token.key)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.name, 'Test User')
+
+    def test_process_local_cache_not_shared(self):
+        """Test nothing is kept in a cache other processes cannot see."""
+        self.client.get(ME_URL)
+
+        self.assertIsNone(
+            caches['default'].get(token_cache.make_key(self.token.key)),
+        )
+
+    def shared_cache(self, location):
+        """Keep user IDs in a file cache, which processes can share."""
+        return override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            },
+        }, TOKEN_AUTH_CACHE={
+            **token_cache._settings(),
+            'CACHE': 'shared',
+        })
+
+    def test_shared_cache_used_after_local_miss(self):
+        """Test another process finds the user ID in the shared cache."""
+        with tempfile.TemporaryDirectory() as location, \
+                self.shared_cache(location):
+            self.client.get(ME_URL)
+            token_cache.clear()
+            cached = caches['shared'].get(
+                token_cache.make_key(self.token.key),
+            )
+
+            # The user is read again, but not the token.
+            with self.assertNumQueries(1):
+                res = self.client.get(ME_URL)
+
+        self.assertEqual(cached, self.user.id)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_shared_cache_rereads_user(self):
+        """Test a user deactivated elsewhere is rejected after a local miss."""
+        with tempfile.TemporaryDirectory() as location, \
+                self.shared_cache(location):
+            self.client.get(ME_URL)
+            # As if saved by another process, whose signal cannot reach
+            # this one's local cache.
+            get_user_model().objects.filter(pk=self.user.pk).update(
+                is_active=False,
+            )
+            token_cache.clear()
+
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token evicts it from the cache."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user evicts their tokens."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_refreshes_cached_user(self):
+        """Test updating the profile is visible on the next request."""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'name': 'New Name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    @patch('core.authentication.TokenCache.delete')
+    def test_new_user_does_not_evict(self, patched_delete):
+        """Test creating a user does not touch the token cache."""
+        get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+
+        patched_delete.assert_not_called()
@@ -0,0 +1,73 @@
+"""
+Tests for the database backend.
+"""
+from unittest.mock import patch
+
+from django.db import close_old_connections, connection
+from django.test import TransactionTestCase
+
+
+class HealthCheckTests(TransactionTestCase):
+    """Test health checks of persistent connections."""
+
+    def setUp(self):
+        settings_dict = connection.settings_dict
+        patcher = patch.dict(settings_dict, {
+            'CONN_MAX_AGE': None,
+            'CONN_HEALTH_CHECKS': True,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(connection.close)
+        connection.close()
+
+    def query(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def test_broken_connection_replaced(self):
+        """Test a connection that died between requests is replaced."""
+        self.query()
+        old = connection.connection
+        old.close()
+
+        close_old_connections()
+
+        self.assertEqual(self.query(), 1)
+        self.assertIsNot(connection.connection, old)
+
+    def test_healthy_connection_checked_once_per_request(self):
+        """Test a reused connection is checked on first use only."""
+        self.query()
+        old = connection.connection
+
+        close_old_connections()
+        with patch.object(
+            connection,
+            'is_usable',
+            wraps=connection.is_usable,
+        ) as is_usable:
+            self.query()
+            self.query()
+
+        is_usable.assert_called_once_with()
+        self.assertIs(connection.connection, old)
+
+    def test_new_connection_not_checked(self):
+        """Test a fresh connection is used without a check."""
+        with patch.object(connection, 'is_usable') as is_usable:
+            self.query()
+
+        is_usable.assert_not_called()
+
+    def test_checks_disabled(self):
+        """Test no check runs when health checks are off."""
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = False
+        self.query()
+
+        close_old_connections()
+        with patch.object(connection, 'is_usable') as is_usable:
+            self.query()
+
+        is_usable.assert_not_called()
@@ -0,0 +1,138 @@
+"""
+Tests for the lookup table field.
+"""
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+)
+
+from core.fields import clear_lookup_caches
+from core.models import (
+    BinSize,
+    BinType,
+    Container,
+)
+from core.tests.factories import (
+    create_container,
+    create_user,
+)
+
+
+def column(container, name):
+    """Return the raw value of a container column."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {name} FROM core_container WHERE id = %s',
+            [container.id],
+        )
+        return cursor.fetchone()[0]
+
+
+class LookupFieldTests(TestCase):
+    """Test storing bin types and sizes in lookup tables."""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def test_values_stored_as_ids(self):
+        """Test containers store lookup IDs and read back strings."""
+        container = create_container(self.user)
+        other = create_container(self.user, bin_id='8608')
+
+        bin_type = BinType.objects.get(name='Open Skip')
+        self.assertEqual(column(container, 'bin_type_id'), bin_type.id)
+        self.assertEqual(column(other, 'bin_type_id'), bin_type.id)
+        self.assertEqual(BinSize.objects.filter(name='32m').count(), 1)
+        container = Container.objects.get(id=container.id)
+        self.assertEqual(container.bin_type, 'Open Skip')
+        self.assertEqual(container.bin_size, '32m')
+
+    def test_filter_and_values(self):
+        """Test filters and values() take and return strings."""
+        create_container(self.user, bin_type='Compactor')
+        create_container(self.user, bin_id='8608')
+
+        self.assertEqual(
+            list(Container.objects.filter(bin_type='Compactor')
+                 .values_list('bin_type', flat=True)),
+            ['Compactor'],
+        )
+        self.assertFalse(Container.objects.filter(bin_type='Unknown'))
+        self.assertFalse(BinType.objects.filter(name='Unknown').exists())
+
+    def test_update_and_bulk_update(self):
+        """Test update paths that bypass save() add new values too."""
+        first = create_container(self.user)
+        second = create_container(self.user, bin_id='8608')
+
+        Container.objects.filter(id=first.id).update(bin_type='Unipack')
+        second.bin_size = '6m'
+        Container.objects.bulk_update([second], ['bin_size'])
+
+        self.assertEqual(
+            Container.objects.get(id=first.id).bin_type,
+            'Unipack',
+        )
+        self.assertEqual(Container.objects.get(id=second.id).bin_size, '6m')
+
+    def test_new_value_reused_in_transaction(self):
+        """Test a value added by a transaction is only inserted once."""
+        create_container(self.user, bin_type='Unipack')
+
+        with self.assertNumQueries(1):
+            create_container(self.user, bin_id='8608', bin_type='Unipack')
+
+    def test_rolled_back_value_not_cached(self):
+        """Test a value whose row was rolled back is added again."""
+        try:
+            with transaction.atomic():
+                create_container(self.user, bin_type='Roll On')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        container = create_container(self.user, bin_type='Roll On')
+
+        self.assertTrue(BinType.objects.filter(name='Roll On').exists())
+        self.assertEqual(
+            Container.objects.get(id=container.id).bin_type,
+            'Roll On',
+        )
+
+
+class LookupCacheTests(TransactionTestCase):
+    """Test committed lookup values are cached in process."""
+
+    def setUp(self):
+        clear_lookup_caches()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def test_writes_use_cache(self):
+        """Test writes of known values add no queries."""
+        create_container(self.user)
+
+        with self.assertNumQueries(1):
+            create_container(self.user, bin_id='8608')
+
+    def test_reads_use_cache(self):
+        """Test reading IDs back as strings adds no queries."""
+        create_container(self.user)
+        clear_lookup_caches()
+
+        # Read in a transaction, which the router keeps on the primary.
+        with transaction.atomic():
+            list(Container.objects.all())
+            with self.assertNumQueries(1):
+                containers = list(Container.objects.all())
+
+        self.assertEqual(containers[0].bin_type, 'Open Skip')
@@ -0,0 +1,43 @@
+"""
+Tests for the password hashers.
+"""
+from django.contrib.auth.hashers import (
+    check_password,
+    identify_hasher,
+    make_password,
+)
+from django.test import (
+    SimpleTestCase,
+    override_settings,
+)
+
+
+class PasswordHasherTests(SimpleTestCase):
+    """Test hashing passwords with the configured cost."""
+
+    @override_settings(ARGON2_MEMORY_COST=8192)
+    def test_argon2_cost_from_settings(self):
+        """Test Argon2 hashes use the ARGON2_* settings."""
+        encoded = make_password('testpass123')
+
+        self.assertIn('m=8192,t=2,p=1', encoded)
+
+    def test_changed_cost_rehashed(self):
+        """Test a hash with another cost is updated on a check."""
+        with override_settings(ARGON2_TIME_COST=1):
+            encoded = make_password('testpass123')
+        updated = []
+
+        valid = check_password('testpass123', encoded, updated.append)
+
+        self.assertTrue(valid)
+        self.assertEqual(len(updated), 1)
+
+    @override_settings(BCRYPT_ROUNDS=4)
+    def test_bcrypt_rounds_from_settings(self):
+        """Test bcrypt hashes use BCRYPT_ROUNDS."""
+        encoded = make_password('testpass123', hasher='bcrypt_sha256')
+
+        self.assertEqual(identify_hasher(encoded).algorithm, 'bcrypt_sha256')
+        self.assertIn('$04$', encoded)
+        self.assertTrue(check_password('testpass123', encoded))
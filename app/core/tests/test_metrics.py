@@ -0,0 +1,222 @@
+"""
+Tests for request metrics.
+"""
+import asyncio
+import contextvars
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import (
+    path,
+    reverse,
+)
+
+from prometheus_client import REGISTRY
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.async_views import async_view
+from core.metrics import (
+    QueryRecorder,
+    record_queries,
+)
+from core.models import (
+    Container,
+    Tag,
+)
+
+
+CONTAINERS_URL = reverse('container:container-list')
+METRICS_URL = reverse('metrics')
+
+# Two requests must reach this view at once to get past the barrier.
+barrier = threading.Barrier(2, timeout=5)
+
+
+def barrier_view(request):
+    barrier.wait()
+    return HttpResponse()
+
+
+urlpatterns = [path('barrier/', async_view(barrier_view))]
+
+
+def tag_detail_url(tag_id):
+    """Create and return a tag detail url."""
+    return reverse('container:tag-detail', args=[tag_id])
+
+
+def sample(name, **labels):
+    """Return the current value of a metric sample, or 0."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Test recording metrics for API requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_labelled_by_action(self):
+        """Test a list request is recorded with its queries."""
+        Container.objects.create(
+            user=self.user,
+            bin_id='8607',
+            bin_size='32m',
+            bin_type='Open Skip',
+        )
+        route = 'ContainerViewSet.list'
+        requests = sample(
+            'http_request_duration_seconds_count',
+            route=route,
+            method='GET',
+            status='2xx',
+        )
+        queries = sample('http_request_sql_queries_sum', route=route)
+
+        res = self.client.get(CONTAINERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sample(
+            'http_request_duration_seconds_count',
+            route=route,
+            method='GET',
+            status='2xx',
+        ), requests + 1)
+        self.assertGreater(
+            sample('http_request_sql_queries_sum', route=route),
+            queries,
+        )
+        self.assertGreater(sample(
+            'http_request_sql_duration_seconds_count',
+            route=route,
+        ), 0)
+
+    def test_update_labelled_by_action(self):
+        """Test an update is labelled with the viewset action."""
+        tag = Tag.objects.create(user=self.user, name='Blue')
+        before = sample(
+            'http_request_duration_seconds_count',
+            route='TagViewSet.partial_update',
+            method='PATCH',
+            status='2xx',
+        )
+
+        self.client.patch(tag_detail_url(tag.id), {'name': 'Green'})
+
+        self.assertEqual(sample(
+            'http_request_duration_seconds_count',
+            route='TagViewSet.partial_update',
+            method='PATCH',
+            status='2xx',
+        ), before + 1)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_logs_sql(self):
+        """Test a slow request logs its slowest queries."""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(CONTAINERS_URL)
+
+        self.assertIn('ContainerViewSet.list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @patch('core.metrics.logger')
+    def test_fast_request_not_logged(self, patched_logger):
+        """Test requests under the threshold are not logged."""
+        self.client.get(CONTAINERS_URL)
+
+        patched_logger.warning.assert_not_called()
+
+
+class QueryRecorderTests(TransactionTestCase):
+    """Test counting the queries of a request."""
+
+    def test_queries_on_other_threads_counted(self):
+        """Test queries run for the request on another thread count."""
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.close()
+
+        with record_queries(keep=1) as recorder:
+            query()
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=[query])
+            thread.start()
+            thread.join()
+
+        self.assertEqual(recorder.count, 2)
+        self.assertEqual(len(recorder.slowest(5)), 1)
+
+    def test_only_slowest_kept(self):
+        """Test only the slowest queries are kept."""
+        recorder = QueryRecorder(keep=2)
+
+        for duration in [0.3, 0.1, 0.5, 0.2]:
+            recorder.add(duration, f'SELECT {duration}')
+
+        self.assertEqual(recorder.count, 4)
+        self.assertAlmostEqual(recorder.duration, 1.1)
+        self.assertEqual(
+            recorder.slowest(5),
+            [(0.5, 'SELECT 0.5'), (0.3, 'SELECT 0.3')],
+        )
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncMiddlewareTests(SimpleTestCase):
+    """Test the middleware under an async handler."""
+
+    def test_requests_run_concurrently(self):
+        """Test the middleware does not serve requests one at a time."""
+        client = AsyncClient()
+
+        async def serve_both():
+            return await asyncio.gather(
+                client.get('/barrier/'),
+                client.get('/barrier/'),
+            )
+
+        responses = async_to_sync(serve_both)()
+
+        self.assertEqual([res.status_code for res in responses], [200, 200])
+
+
+class MetricsViewTests(TestCase):
+    """Test serving the metrics."""
+
+    def test_prometheus_format(self):
+        """Test the metrics are served as Prometheus text."""
+        self.client.get(CONTAINERS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'http_request_duration_seconds_bucket', res.content)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required(self):
+        """Test the metrics token is checked when set."""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,244 @@
+"""
+Tests for the database connection pool.
+"""
+import importlib
+import os
+import threading
+from unittest.mock import patch
+
+import psycopg2
+from psycopg2 import extensions
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app import settings as app_settings
+from core.pool import (
+    ConnectionPool,
+    PoolTimeout,
+    close_pools,
+    pool_stats,
+)
+
+
+POOL_URL = reverse('core:pool')
+
+
+def connect():
+    return psycopg2.connect(**connection.get_connection_params())
+
+
+class ConnectionPoolTests(TransactionTestCase):
+    """Test the in-process connection pool."""
+
+    def make_pool(self, minconn=0, maxconn=1, **kwargs):
+        pool = ConnectionPool(minconn, maxconn, connect, **kwargs)
+        self.addCleanup(pool.closeall)
+        return pool
+
+    def test_connection_reused(self):
+        """Test a returned connection is handed out again."""
+        pool = self.make_pool(minconn=1, maxconn=2)
+
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+
+    def test_connection_above_min_reused(self):
+        """Test connections returned beyond `minconn` are kept open."""
+        pool = self.make_pool(minconn=1, maxconn=3)
+        conns = [pool.getconn() for _ in range(3)]
+        for conn in conns:
+            pool.putconn(conn)
+
+        again = [pool.getconn() for _ in range(3)]
+
+        self.assertEqual({id(conn) for conn in again}, set(map(id, conns)))
+        self.assertFalse(any(conn.closed for conn in conns))
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_waits_for_free_connection(self):
+        """Test a checkout waits for a connection to be returned."""
+        pool = self.make_pool(timeout=5)
+        conn = pool.getconn()
+        timer = threading.Timer(0.1, pool.putconn, [conn])
+        timer.start()
+        self.addCleanup(timer.join)
+
+        other = pool.getconn()
+
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(stats['timeouts'], 0)
+        self.assertGreater(stats['wait_seconds'], 0)
+        pool.putconn(other)
+
+    def test_times_out_when_exhausted(self):
+        """Test a checkout fails once the timeout passes."""
+        pool = self.make_pool(timeout=0.05)
+        conn = pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+        stats = pool.stats()
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['peak_in_use'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+        pool.putconn(conn)
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+    def test_broken_idle_connection_replaced(self):
+        """Test a checked pool replaces a connection that died idle."""
+        pool = self.make_pool(minconn=1, check=True)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.close()
+
+        other = pool.getconn()
+
+        self.assertIsNot(other, conn)
+        self.assertFalse(other.closed)
+        pool.putconn(other)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection is returned outside of any transaction."""
+        pool = self.make_pool(minconn=1)
+        conn = pool.getconn()
+        conn.cursor().execute('SELECT 1')
+
+        pool.putconn(conn)
+
+        self.assertEqual(
+            conn.info.transaction_status,
+            extensions.TRANSACTION_STATUS_IDLE,
+        )
+
+
+class PooledBackendTests(TransactionTestCase):
+    """Test the database backend with pooling on."""
+
+    def setUp(self):
+        patcher = patch.dict(connection.settings_dict, {
+            'CONN_MAX_AGE': 0,
+            'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 2, 'TIMEOUT': 1},
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(close_pools)
+        self.addCleanup(connection.close)
+        connection.close()
+
+    def query(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def test_connection_returned_after_request(self):
+        """Test the connection goes back to the pool between requests."""
+        self.query()
+        raw = connection.connection
+
+        close_old_connections()
+
+        self.assertIsNone(connection.connection)
+        self.assertEqual(pool_stats()['default']['idle'], 1)
+        self.assertEqual(self.query(), 1)
+        self.assertIs(connection.connection, raw)
+
+    def test_other_threads_share_pool(self):
+        """Test connections of other threads come from the same pool."""
+        self.query()
+        seen = []
+
+        def use_connection():
+            from django.db import connection as thread_connection
+            with thread_connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            seen.append(pool_stats()['default']['in_use'])
+            thread_connection.close()
+
+        thread = threading.Thread(target=use_connection)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(seen, [2])
+        self.assertEqual(pool_stats()['default']['in_use'], 1)
+
+
+class PoolModeSettingsTests(SimpleTestCase):
+    """Test choosing the pool mode from the environment."""
+
+    def load_settings(self, **env):
+        self.addCleanup(importlib.reload, app_settings)
+        with patch.dict(os.environ, env):
+            return importlib.reload(app_settings)
+
+    def test_local_pool(self):
+        """Test the local mode configures a pool per process."""
+        settings = self.load_settings(
+            DB_POOL_MODE='local',
+            DB_POOL_MAX_SIZE='4',
+        )
+
+        database = settings.DATABASES['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['POOL']['MAX_SIZE'], 4)
+
+    def test_pgbouncer(self):
+        """Test the pgbouncer mode disables server-side cursors."""
+        settings = self.load_settings(DB_POOL_MODE='pgbouncer')
+
+        database = settings.DATABASES['default']
+        self.assertTrue(database['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertNotIn('POOL', database)
+
+    def test_unknown_mode(self):
+        """Test an unknown mode is rejected."""
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(DB_POOL_MODE='bogus')
+
+
+class PoolStatsApiTests(TestCase):
+    """Test the pool statistics endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_admin_sees_stats(self):
+        """Test staff users can read the pool statistics."""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(POOL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['mode'], 'none')
+        self.assertIn('pools', res.data)
+
+    def test_other_users_forbidden(self):
+        """Test regular users cannot read the pool statistics."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(POOL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,105 @@
+"""
+Tests for the orjson renderer and parser.
+"""
+import datetime
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+DATA = {
+    'id': 1,
+    'name': 'Bin   ñ',
+    'label': gettext_lazy('Open Skip'),
+    'weight': Decimal('1.50'),
+    'updated_at': datetime.datetime(
+        2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc,
+    ),
+    'day': datetime.date(2024, 5, 1),
+    'tags': [{'id': 2, 'name': 'Blue'}],
+    'next': None,
+}
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test rendering JSON with orjson."""
+
+    def test_matches_json_renderer(self):
+        """Test the output is the same as DRF's renderer."""
+        self.assertEqual(
+            ORJSONRenderer().render(DATA),
+            JSONRenderer().render(DATA),
+        )
+
+    def test_indent_uses_json_renderer(self):
+        """Test indented output, as for the browsable API, still works."""
+        rendered = ORJSONRenderer().render(
+            DATA,
+            'application/json; indent=4',
+        )
+
+        self.assertEqual(
+            rendered,
+            JSONRenderer().render(DATA, 'application/json; indent=4'),
+        )
+
+    def test_none_renders_empty(self):
+        """Test no data renders as an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    @patch('core.renderers.orjson', None)
+    def test_fallback_without_orjson(self):
+        """Test the stdlib is used when orjson is not installed."""
+        self.assertEqual(
+            ORJSONRenderer().render(DATA),
+            JSONRenderer().render(DATA),
+        )
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test parsing JSON with orjson."""
+
+    def parse(self, content, parser=None, encoding='utf-8'):
+        return (parser or ORJSONParser()).parse(
+            io.BytesIO(content),
+            parser_context={'encoding': encoding},
+        )
+
+    def test_matches_json_parser(self):
+        """Test the result is the same as DRF's parser."""
+        content = JSONRenderer().render(DATA)
+
+        self.assertEqual(
+            self.parse(content),
+            self.parse(content, JSONParser()),
+        )
+
+    def test_other_encoding(self):
+        """Test bodies in another declared charset are decoded first."""
+        content = '{"name": "Bin ñ"}'.encode('latin-1')
+
+        self.assertEqual(
+            self.parse(content, encoding='latin-1'),
+            {'name': 'Bin ñ'},
+        )
+
+    def test_invalid_json(self):
+        """Test invalid JSON raises a parse error."""
+        for content in [b'{"name": ', b'{"weight": NaN}', b'\xff']:
+            with self.assertRaises(ParseError):
+                self.parse(content)
+
+    @patch('core.parsers.orjson', None)
+    def test_fallback_without_orjson(self):
+        """Test the stdlib is used when orjson is not installed."""
+        self.assertEqual(self.parse(b'{"id": 1}'), {'id': 1})
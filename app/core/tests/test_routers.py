@@ -0,0 +1,270 @@
+"""
+Tests for routing reads to replicas.
+"""
+import asyncio
+import tempfile
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Container
+from core.routers import (
+    ReplicaRouter,
+    pin_to_primary,
+    routing_scope,
+)
+
+
+CONTAINERS_URL = reverse('container:container-list')
+
+# Replicas are extra aliases for the test database, plus one that cannot
+# be reached.
+REPLICAS = ['test_replica1', 'test_replica2']
+DOWN = 'test_replica_down'
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class ReplicaTestCase(TransactionTestCase):
+    """Base class that adds the replica aliases.
+
+    They are added after the test case has set up its databases, so they
+    are neither flushed nor blocked.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        primary = connections['default'].settings_dict
+        for alias in [*REPLICAS, DOWN]:
+            connections.databases[alias] = {
+                **primary,
+                'TEST': {'MIRROR': 'default'},
+            }
+        connections.databases[DOWN].update(
+            HOST='/nonexistent',
+            OPTIONS={'connect_timeout': 1},
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in [*REPLICAS, DOWN]:
+            try:
+                connections[alias].close()
+                del connections[alias]
+            except AttributeError:
+                pass
+            del connections.databases[alias]
+        super().tearDownClass()
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(ReplicaTestCase):
+    """Test choosing a database for reads and writes."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_round_robin(self):
+        """Test reads outside a scope rotate over the replicas."""
+        reads = [self.router.db_for_read(Container) for _ in range(4)]
+
+        self.assertEqual(reads, REPLICAS * 2)
+
+    def test_scope_uses_one_replica(self):
+        """Test every read in a scope uses the same replica."""
+        with routing_scope():
+            reads = {self.router.db_for_read(Container) for _ in range(4)}
+
+        self.assertEqual(len(reads), 1)
+
+    def test_pinned_scope(self):
+        """Test every read in a pinned scope goes to the primary."""
+        with routing_scope(pinned=True):
+            read = self.router.db_for_read(Container)
+
+        self.assertEqual(read, 'default')
+        self.assertEqual(self.router.db_for_write(Container), 'default')
+
+    def test_pin_to_primary(self):
+        """Test pinning only lasts for its block."""
+        with routing_scope():
+            with pin_to_primary():
+                pinned = self.router.db_for_read(Container)
+            read = self.router.db_for_read(Container)
+
+        self.assertEqual(pinned, 'default')
+        self.assertIn(read, REPLICAS)
+
+    def test_reads_in_transaction_use_primary(self):
+        """Test reads inside a transaction on the primary stay there."""
+        with transaction.atomic():
+            read = self.router.db_for_read(Container)
+
+        self.assertEqual(read, 'default')
+
+    @override_settings(DATABASE_REPLICAS=[DOWN, REPLICAS[0]])
+    def test_unavailable_replica_skipped(self):
+        """Test a replica that cannot be reached is skipped."""
+        reads = [self.router.db_for_read(Container) for _ in range(2)]
+
+        self.assertEqual(reads, [REPLICAS[0], REPLICAS[0]])
+        self.assertIn(DOWN, self.router._down_until)
+
+    @override_settings(DATABASE_REPLICAS=[DOWN])
+    def test_falls_back_to_primary(self):
+        """Test reads go to the primary when no replica is available."""
+        self.assertEqual(self.router.db_for_read(Container), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test reads go to the primary without replicas."""
+        self.assertEqual(self.router.db_for_read(Container), 'default')
+
+    def test_replicas_not_migrated(self):
+        """Test migrations only run on the primary."""
+        self.assertFalse(self.router.allow_migrate(REPLICAS[0], 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingApiTests(ReplicaTestCase):
+    """Test the database requests read from."""
+
+    def setUp(self):
+        # Pins are only trusted in a cache shared by every process.
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        shared = self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location.name,
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+        cache.clear()
+        token_cache.clear()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def tearDown(self):
+        cache.clear()
+        token_cache.clear()
+
+    def get_containers(self, client=None):
+        """List containers and return the aliases that were queried."""
+        contexts = {
+            alias: CaptureQueriesContext(connections[alias])
+            for alias in ['default', *REPLICAS]
+        }
+        for context in contexts.values():
+            context.__enter__()
+        try:
+            res = (client or self.client).get(CONTAINERS_URL)
+        finally:
+            for context in contexts.values():
+                context.__exit__(None, None, None)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {alias for alias, context in contexts.items() if context}
+
+    def test_list_reads_from_one_replica(self):
+        """Test a GET request reads from a single replica."""
+        Container.objects.create(
+            user=self.user,
+            bin_id='8607',
+            bin_size='32m',
+            bin_type='Open Skip',
+        )
+
+        used = self.get_containers()
+
+        self.assertEqual(len(used), 1)
+        self.assertIn(used.pop(), REPLICAS)
+
+    def test_reads_after_write_use_primary(self):
+        """Test a client reads its own writes from the primary."""
+        payload = {'bin_id': '8607', 'bin_size': '32m', 'bin_type': 'Skip'}
+        res = self.client.post(CONTAINERS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.get_containers(), {'default'})
+
+        other = create_user(email='other@example.com', password='pass1234')
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        self.assertNotIn('default', self.get_containers(other_client))
+
+    def test_pin_expires(self):
+        """Test reads return to the replicas once the pin expires."""
+        self.client.post(
+            CONTAINERS_URL,
+            {'bin_id': '8607', 'bin_size': '32m', 'bin_type': 'Skip'},
+        )
+        cache.clear()
+        self.assertNotIn('default', self.get_containers())
+
+    def test_process_local_cache_reads_primary(self):
+        """Test reads use the primary when pins cannot be shared."""
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            self.assertEqual(self.get_containers(), {'default'})
+
+    def test_cache_error_reads_primary(self):
+        """Test reads use the primary when pins cannot be looked up."""
+        with mock.patch('core.middleware.caches') as caches:
+            caches['default'].get.side_effect = OSError
+            self.assertEqual(self.get_containers(), {'default'})
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class AsyncReplicaRoutingTests(ReplicaTestCase):
+    """Test the middleware under an async handler."""
+
+    def test_async_requests_run_concurrently(self):
+        """Test async requests are not served one at a time."""
+        async def get_response(request):
+            await asyncio.sleep(0.2)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = RequestFactory().get(CONTAINERS_URL)
+
+        async def serve():
+            return await asyncio.gather(
+                *(middleware(request) for _ in range(4))
+            )
+
+        started = time.perf_counter()
+        responses = async_to_sync(serve)()
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertEqual([r.status_code for r in responses], [200] * 4)
+        self.assertLess(elapsed, 0.6)
@@ -0,0 +1,58 @@
+"""
+Views for the core API.
+"""
+import os
+
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+)
+from django.utils.crypto import constant_time_compare
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiTypes,
+)
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.metrics import (
+    CONTENT_TYPE_LATEST,
+    render_latest,
+)
+from core.pool import pool_stats
+
+
+class PoolStatsView(APIView):
+    """Connection pool saturation of the process serving the request.
+
+    Every worker process has its own pool, so scrape each worker or add
+    the numbers up across requests. Behind pgbouncer use its `SHOW POOLS`
+    instead.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response({
+            'mode': settings.DB_POOL_MODE,
+            'pid': os.getpid(),
+            'pools': pool_stats(),
+        })
+
+
+def metrics(request):
+    """Serve the request metrics in the Prometheus text format."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {token}',
+    ):
+        return HttpResponseForbidden()
+
+    return HttpResponse(render_latest(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,84 @@
+"""
+Gunicorn settings for serving the API in production.
+
+Gunicorn reads this file from the working directory, so from `/app`:
+
+    gunicorn app.wsgi:application
+
+Every setting can be overridden from the environment. Set
+GUNICORN_WORKER_CLASS to `uvicorn.workers.UvicornWorker` and the app to
+`app.asgi:application` to serve the async views of `core.async_views`.
+
+Set PROMETHEUS_MULTIPROC_DIR to a writable directory so /metrics reports
+all workers rather than the one that happens to serve the scrape.
+"""
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Each worker is a process with its own copy of the app. Threads let a
+# worker keep serving while another request waits on Postgres, at the cost
+# of one database connection per thread.
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS',
+    multiprocessing.cpu_count() * 2 + 1,
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = os.environ.get(
+    'GUNICORN_WORKER_CLASS',
+    'gthread' if threads > 1 else 'sync',
+)
+
+# Import the app and its URLconf once in the master process, so workers
+# fork warm and share the loaded code pages.
+preload_app = bool(int(os.environ.get('GUNICORN_PRELOAD', 1)))
+
+# Recycle workers now and then to cap slow memory growth.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def on_starting(server):
+    """Drop metrics left behind by a previous run."""
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory:
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith('.db'):
+            os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    """Forget the live metrics of a worker that exited."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    """Finish warming the preloaded app before any worker forks."""
+    if not preload_app:
+        return
+
+    from django.db import connections
+    from django.urls import get_resolver
+
+    from core.pool import close_pools
+
+    # Import every view, serializer and URL pattern now rather than on
+    # each worker's first request.
+    get_resolver().url_patterns
+    # Workers must not inherit a socket opened while loading the app.
+    connections.close_all()
+    close_pools()
@@ -1,13 +1,20 @@
 """
 Tests for the user API.
 """
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.throttling import LoginRateThrottle
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -23,6 +30,7 @@ class PublicUserApiTests(TestCase):
     """Test the public features of the user API."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -100,6 +108,66 @@ class PublicUserApiTests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_token_rehashes_password(self):
+        """Test logging in moves an old hash to the preferred hasher."""
+        user = create_user(email='test@example.com')
+        user.password = make_password('testpass123', hasher='pbkdf2_sha256')
+        user.save()
+
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_create_token_with_token_checks_password(self):
+        """Test presenting a valid token does not skip the password."""
+        user = create_user(email='test@example.com', password='testpass123')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        payload = {'email': 'test@example.com', 'password': 'wrongpass'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('token', res.data)
+
+    @patch.dict(LoginRateThrottle.THROTTLE_RATES, {'login': '2/min'})
+    def test_create_token_throttled_per_account(self):
+        """Test repeated logins for one account are throttled."""
+        create_user(email='test@example.com', password='testpass123')
+        create_user(email='other@example.com', password='testpass123')
+        payload = {'email': 'test@example.com', 'password': 'badpass'}
+
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'other@example.com',
+            'password': 'testpass123',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch.dict(LoginRateThrottle.THROTTLE_RATES, {'login': '2/min'})
+    def test_create_token_throttled_per_address(self):
+        """Test failed logins from one address do not lock out another."""
+        create_user(email='test@example.com', password='testpass123')
+        payload = {'email': 'test@example.com', 'password': 'badpass'}
+
+        for _ in range(3):
+            self.client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.1')
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+        }, REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_retrieve_user_unauthorized(self):
         """Test authentication is required for users."""
         res = self.client.get(ME_URL)
@@ -0,0 +1,31 @@
+"""
+Throttles for the user API.
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """Limit token logins per client address and account to `login`.
+
+    Attempts are counted by the client address together with the
+    submitted email. Guessing one account's password from one address
+    stays slow, while attempts from elsewhere cannot lock its owner out,
+    and a depot whose staff share one address can still log in at shift
+    change. Requests without an email are counted by address alone.
+    Behind a proxy, set `NUM_PROXIES` so the address is read from
+    `X-Forwarded-For`.
+    """
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident(request)
+        email = request.data.get('email') \
+            if hasattr(request.data, 'get') else None
+        if isinstance(email, str) and email.strip():
+            ident = hashlib.sha256(
+                f'{ident}:{email.strip().lower()}'.encode(),
+            ).hexdigest()
+
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -3,13 +3,23 @@ URL mappings for the user API.
 """
 from django.urls import path
 
+from core.async_views import (
+    HASHING,
+    async_patterns,
+)
 from user import views
 
 
 app_name = 'user'
 
 urlpatterns = [
-    path('create/', views.CreateUserView.as_view(), name='create'),
-    path('token/', views.CreateTokenView.as_view(), name='token'),
-    path('me/', views.ManageUserView.as_view(), name='me'),
+    # Creating a user and logging in hash a password, which takes a
+    # core for a while, so under ASGI they get their own thread pool.
+    *async_patterns([
+        path('create/', views.CreateUserView.as_view(), name='create'),
+        path('token/', views.CreateTokenView.as_view(), name='token'),
+    ], {'create', 'token'}, HASHING),
+    *async_patterns([
+        path('me/', views.ManageUserView.as_view(), name='me'),
+    ], {'me'}),
 ]